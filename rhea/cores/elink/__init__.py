@@ -12,6 +12,7 @@ from .elink_intf import ELink
 # modules
 from .emesh_intf import epkt_from_bits
 from .emesh_fifo import emesh_fifo
+from .fifo_cdc import fifo_cdc
 
 # various cores and components
 # from .elink import elink
@@ -1,41 +1,63 @@
-
 from __future__ import division
 
 import myhdl
-from myhdl import always_comb, always
+from myhdl import always_comb
 
-from rhea import cores
-from rhea import Signals
 from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_async
+
+from .emesh_intf import EMeshPacket, epkt_from_bits
 
 
 @myhdl.block
-def fifo_cdc(glbl, emesh_i, emesh_o):
-    """
-    map the packet interfaces to the FIFO interface
+def fifo_cdc(reset, clock_i, epkt_i, clock_o, epkt_o, size=16,
+             sync_stages=2):
+    """ EMesh packet clock domain crossing
+
+    Map the packet interfaces to a first-word-fall-through dual-clock
+    FIFO (`fifo_async`).  The input packets (`epkt_i`) are written to
+    the FIFO in the `clock_i` domain, `epkt_i.wait` is set when the
+    FIFO is full.  The packets are available on `epkt_o` in the
+    `clock_o` domain, a packet is removed from the FIFO the clock
+    `epkt_o.access` is set and `epkt_o.wait` is not set.
+
+    Arguments:
+        reset: system reset
+        clock_i: the input packet clock
+        epkt_i (EMeshPacket): the input packets
+        clock_o: the output packet clock
+        epkt_o (EMeshPacket): the output packets
+
+    Parameters:
+        size: the FIFO depth (packets)
+        sync_stages: the FIFO pointer synchronizer stages
     """
+    fbus = FIFOBus(width=len(epkt_i.bits))
+    fpkt = EMeshPacket()
+
+    @always_comb
+    def beh_write():
+        fbus.write.next = epkt_i.access and not fbus.full
+        fbus.write_data.next = epkt_i.bits
+        epkt_i.wait.next = fbus.full
 
-    wr, rd = Signals(bool(0), 2)
-    fifo_intf = FIFOBus(width=len(emesh_i.bits))
+    # map the FIFO output (first-word-fall-through) to the packet
+    map_inst = epkt_from_bits(fpkt, fbus.read_data)
 
     @always_comb
-    def beh_assign():
-        wr.next = emesh_i.access and not fifo_intf.full
-        rd.next = not fifo_intf.empty and not emesh_i.wait
-        emesh_o.wait.next = fifo_intf.full
-
-    @always(emesh_o.clock.posedge)
-    def beh_access():
-        if not emesh_i.wait:
-            emesh_o.access.next = fifo_intf.read
-
-    # assign signals ot the FIFO interface
-    fifo_intf.write_data = emesh_i.bits
-    fifo_intf.read_data = emesh_o.bits
-
-    fifo_inst = cores.fifo.fifo_async(
-        clock_write=emesh_i.clock, clock_read=emesh_o.clock,
-        fifobus=fifo_intf, reset=glbl.reset, size=16
+    def beh_read():
+        fbus.read.next = not fbus.empty and not epkt_o.wait
+        epkt_o.access.next = not fbus.empty
+        epkt_o.write.next = fpkt.write
+        epkt_o.datamode.next = fpkt.datamode
+        epkt_o.ctrlmode.next = fpkt.ctrlmode
+        epkt_o.dstaddr.next = fpkt.dstaddr
+        epkt_o.data.next = fpkt.data
+        epkt_o.srcaddr.next = fpkt.srcaddr
+
+    fifo_inst = fifo_async(
+        clock_write=clock_i, clock_read=clock_o, fifobus=fbus,
+        reset=reset, size=size, sync_stages=sync_stages, fwft=True
     )
 
-    return beh_assign, beh_access, fifo_inst
\ No newline at end of file
+    return beh_write, map_inst, beh_read, fifo_inst
@@ -4,6 +4,8 @@ from __future__ import absolute_import
 from .fifo_async import fifo_async
 from .fifo_sync import fifo_sync
 from .fifo_fast import fifo_fast
+from .fifo_gearbox import fifo_gearbox
+from .fifo_packet import fifo_packet
 from .ramp import fifo_ramp
 
 
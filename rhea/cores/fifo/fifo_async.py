@@ -8,7 +8,7 @@ from __future__ import absolute_import
 from math import log, ceil
 
 import myhdl
-from myhdl import (Signal, ResetSignal, intbv, modbv, concat,
+from myhdl import (Signal, ResetSignal, intbv, modbv, concat, downrange,
                    always_comb, always_seq,)
 
 from rhea.system import FIFOBus
@@ -17,7 +17,24 @@ from .fifo_syncers import sync_reset, sync_mbits
 
 
 @myhdl.block
-def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
+def gray_to_binary(gray, binary):
+    """ decode a Gray code, e.g. a pointer from the other clock domain """
+    nbits = len(gray)
+
+    @always_comb
+    def beh_decode():
+        b = intbv(0)[nbits:]
+        b[nbits-1] = gray[nbits-1]
+        for ii in downrange(nbits-1):
+            b[ii] = b[ii+1] ^ gray[ii]
+        binary.next = b
+
+    return beh_decode
+
+
+@myhdl.block
+def fifo_async(clock_write, clock_read, fifobus, reset, size=128,
+               compact=False, sync_stages=2, fwft=False):
     """
     The following is a general purpose, platform independent 
     asynchronous FIFO (dual clock domains).
@@ -27,6 +44,23 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
 
     Typically in the "rhea" package the FIFOBus interface is used to
     interface with the FIFOs
+
+    The `compact` parameter selects the compact `fifo_mem` memory
+    array, simulation only, for deep FIFOs (see `fifo_mem`).
+
+    The `sync_stages` parameter is the number of synchronizer
+    registers for the pointers crossing the clock domains, more
+    stages for a better MTBF at the cost of latency.  With `fwft`
+    (first-word-fall-through) the next word is on `fbus.read_data`
+    when the FIFO is not empty, `fbus.read` acknowledges the word
+    and `fbus.read_valid` is combinatorial (`read and not empty`),
+    otherwise the data is valid the clock after the read.
+
+    The almost full flag is set in the write clock domain from the
+    write pointer and the synchronized read pointer, the almost empty
+    flag and the FIFO count (`fbus.count`) in the read clock domain
+    from the read pointer and the synchronized write pointer.  The
+    count is pessimistic, the synchronized pointers are delayed.
     """
     # @todo: use the clock_write and clock_read from the FIFOBus
     # @todo: interface, make this interface compliant with the
@@ -59,8 +93,14 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     sr1_inst = sync_reset(clock_write, reset, wrst)
     sr2_inst = sync_reset(clock_read, reset, rrst)
 
-    mb1_inst = sync_mbits(clock_write, wrst, rptr, wq2_rptr)
-    mb2_inst = sync_mbits(clock_read, rrst, wptr, rq2_wptr)
+    # the write pointer is passed to the read domain a write clock
+    # after the pointer update, after the memory is written
+    wptr_d = Signal(modbv(0)[asz+1:])
+
+    mb1_inst = sync_mbits(clock_write, wrst, rptr, wq2_rptr,
+                          sync_stages=sync_stages)
+    mb2_inst = sync_mbits(clock_read, rrst, wptr_d, rq2_wptr,
+                          sync_stages=sync_stages)
 
     @always_comb
     def beh_assigns():
@@ -70,10 +110,24 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     _we = Signal(bool(0))
     _re = Signal(bool(0))
 
-    @always_comb
-    def beh_wr():
-        _we.next = fbus.write and not fbus.full
-        _re.next = False
+    if fwft:
+        # the memory read address is advanced on a read, the next
+        # word is on the memory output the clock after the read
+        @always_comb
+        def beh_wr():
+            _we.next = fbus.write and not fbus.full
+            _re.next = fbus.read and not rempty
+            fbus.read_valid.next = fbus.read and not rempty
+    else:
+        @always_comb
+        def beh_wr():
+            _we.next = fbus.write and not fbus.full
+            _re.next = False
+
+        # the data is register from the memory, the data is delayed
+        @always_seq(clock_read.posedge, reset=rrst)
+        def beh_rd():
+            fbus.read_valid.next = fbus.read and not rempty
 
     # unused but needed for the fifo_mem block
     wad = Signal(waddr.val)
@@ -82,7 +136,7 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     # Memory for the FIFO
     fifomem_inst = fifo_mem(
         clock_write, _we, fbus.write_data, waddr,
-        clock_read, _re, fbus.read_data,  raddr, wad
+        clock_read, _re, fbus.read_data,  raddr, wad, compact=compact
     )
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -98,16 +152,15 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     @always_seq(clock_read.posedge, reset=rrst)
     def beh_rptrs():
         # increment when read and not empty 
-        rbn = rbin + (fbus.read and not rempty)
+        # the next pointer wraps, the Gray code of the wrapped pointer
+        rbn = modbv(0)[asz+1:]
+        rbn[:] = rbin + (fbus.read and not rempty)
         rbin.next = rbn
         rpn = (rbn >> 1) ^ rbn  # gray counter
         rptr.next = rpn   
 
         # FIFO empty when the next rptr == sync'd wptr or on reset
         rempty.next = (rpn == rq2_wptr)
-
-        # the data is register from the memory, the data is delayed
-        fbus.read_valid.next = fbus.read and not rempty
         
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # --Text from the paper--
@@ -121,10 +174,12 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
     @always_seq(clock_write.posedge, reset=wrst)
     def beh_wptrs():
         # increment when write and not full
-        wbn = wbin + (fbus.write and not wfull)
+        wbn = modbv(0)[asz+1:]
+        wbn[:] = wbin + (fbus.write and not wfull)
         wbin.next = wbn
         wpn = (wbn >> 1) ^ wbn
         wptr.next = wpn
+        wptr_d.next = wptr
 
         # what the dillio with the full determination ...
         wfull.next = (wpn == concat(~wq2_rptr[asz+1:asz-1],
@@ -135,6 +190,31 @@ def fifo_async(clock_write, clock_read, fifobus, reset, size=128):
         waddr.next = wbin[asz:0]
         raddr.next = rbin[asz:0]
 
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # The FIFO occupancy in each clock domain, the number of words
+    # written (write domain) and the number of words that can be
+    # read (read domain), the almost full and almost empty flags.
+    fifosize = 2**asz
+    wq2_rbin = Signal(intbv(0)[asz+1:])
+    rq2_wbin = Signal(intbv(0)[asz+1:])
+    g2b1_inst = gray_to_binary(wq2_rptr, wq2_rbin)
+    g2b2_inst = gray_to_binary(rq2_wptr, rq2_wbin)
+    wcount = Signal(modbv(0)[asz+1:])
+    rcount = Signal(modbv(0)[asz+1:])
+
+    @always_comb
+    def beh_counts():
+        wcount.next = wbin - wq2_rbin
+        rcount.next = rq2_wbin - rbin
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = wcount + fbus.almost_full_level >= fifosize
+        fbus.almost_empty.next = rcount <= fbus.almost_empty_level
+
+    # the FIFOBus count, the read domain count
+    fbus.count = rcount
+
     return myhdl.instances()
 
 
@@ -28,6 +28,9 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
     synchronous FIFOs.  This FIFO is implemented generically, consult the
     synthesis and map reports.
 
+    The FIFO count (`fbus.count`) and the almost full and almost
+    empty flags (see `FIFOBus`) are updated each clock.
+
     Arguments (ports):
         glbl: global signals, clock and reset
         fbus: FIFOBus FIFO interface
@@ -113,26 +116,25 @@ def fifo_fast(glbl, fifobus, size=16, use_srl_prim=False):
             
     # note: failures occur if write/read when full/empty respectively
 
+    # the FIFO occupancy, the number of words in the FIFO
     if fifo_fast.occupancy_assertions:
-        nvacant = Signal(intbv(nitems, min=0, max=nitems+1))  # # empty slots
         ntenant = Signal(intbv(0, min=0, max=nitems+1))       # # filled slots
     else:
-        nitems = int(2**(ceil(log(nitems, 2))))
-        nvacant = Signal(modbv(nitems, min=0, max=nitems))
-        ntenant = Signal(modbv(0, min=0, max=nitems))
-
-    if fifo_fast.debug:
-        @always_seq(clock.posedge, reset=reset)
-        def beh_occupancy():
-            if fbus.clear:
-                nvacant.next = nitems
-                ntenant.next = 0
-            elif fbus.read and not fbus.write:
-                nvacant.next = nvacant + 1
-                ntenant.next = ntenant - 1
-            elif fbus.write and not fbus.read:
-                nvacant.next = nvacant - 1
-                ntenant.next = ntenant + 1
+        ntenant = Signal(modbv(0, min=0, max=2**int(ceil(log(nitems+1, 2)))))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_occupancy():
+        if fbus.clear:
+            ntenant.next = 0
+        elif fbus.read and not fbus.write:
+            ntenant.next = ntenant - 1
+        elif fbus.write and not fbus.read:
+            ntenant.next = ntenant + 1
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = ntenant + fbus.almost_full_level >= nitems
+        fbus.almost_empty.next = ntenant <= fbus.almost_empty_level
 
     # attach the FIFO count to the FIFOBus
     fbus.count = ntenant
@@ -146,5 +148,4 @@ fifo_fast.portmap = dict(
     clock=Signal(bool(0)),
     fbus=FIFOBus()
 )
-fifo_fast.debug = True
 fifo_fast.occupancy_assertions = True
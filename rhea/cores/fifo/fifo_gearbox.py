@@ -0,0 +1,160 @@
+from __future__ import absolute_import
+
+import myhdl
+from myhdl import Signal, intbv, concat, always_comb, always_seq
+
+from rhea import Global
+from rhea.system import FIFOBus
+from .fifo_sync import fifo_sync
+
+
+@myhdl.block
+def fifo_gearbox(glbl, fbus_write, fbus_read, size=16, big_endian=True):
+    """ Width converting synchronous FIFO (gearbox)
+
+    The words written to `fbus_write` are read from `fbus_read`, the
+    interfaces have different widths, the wide width is a multiple of
+    the narrow width.  Narrow to wide (N:1), N narrow words are packed
+    into a wide word.  Wide to narrow (1:N), a wide word is read as N
+    narrow words.  A narrow word can be written (read) each clock,
+    the packing is done on the write (unpacking on the read) of the
+    wide FIFO, no extra clock cycles.
+
+    The internal FIFO is a `fifo_sync` of wide words, the read is a
+    "read acknowledge" (see `fifo_sync`).  The FIFO count and the
+    almost full and almost empty levels are in wide words.  A
+    partially packed wide word is not available on the read side.
+
+    Arguments:
+        glbl (Global): global signals, clock and reset
+        fbus_write (FIFOBus): the write interface
+        fbus_read (FIFOBus): the read interface
+
+    Parameters:
+        size (int): the FIFO depth in wide words
+        big_endian (bool): the first narrow word is the most
+            significant part of the wide word, otherwise the least
+            significant part.
+
+    Usage::
+
+        fbusb, fbusw = FIFOBus(width=8), FIFOBus(width=32)
+        gbx_inst = fifo_gearbox(glbl, fbusb, fbusw, size=16)
+    """
+    assert isinstance(glbl, Global)
+    assert isinstance(fbus_write, FIFOBus)
+    assert isinstance(fbus_read, FIFOBus)
+
+    clock, reset = glbl.clock, glbl.reset
+    win, wout = len(fbus_write.write_data), len(fbus_read.read_data)
+    wnarrow, wwide = min(win, wout), max(win, wout)
+    assert wwide % wnarrow == 0, \
+        "the widths {} and {} are not multiples".format(win, wout)
+    ratio = wwide // wnarrow
+
+    # the wide FIFO
+    fbus = FIFOBus(width=wwide)
+    fifo_inst = fifo_sync(glbl, fbus, size=size)
+
+    # the narrow word index, in the wide word
+    idx = Signal(intbv(0, min=0, max=max(ratio, 2)))
+    last = ratio - 1
+
+    @always_comb
+    def beh_assign():
+        fbus.clear.next = fbus_write.clear or fbus_read.clear
+        fbus.almost_full_level.next = fbus_write.almost_full_level
+        fbus.almost_empty_level.next = fbus_read.almost_empty_level
+        fbus_write.full.next = fbus.full
+        fbus_write.almost_full.next = fbus.almost_full
+        fbus_read.empty.next = fbus.empty
+        fbus_read.almost_empty.next = fbus.almost_empty
+        fbus_read.read_valid.next = fbus_read.read and not fbus.empty
+
+    if win < wout:
+        # narrow to wide, the narrow words are shifted into a register
+        # the wide word is written with the last narrow word
+        sreg = Signal(intbv(0)[wwide:])
+
+        @always_comb
+        def beh_write():
+            fbus.write.next = (fbus_write.write and not fbus.full and
+                               idx == last)
+            fbus.read.next = fbus_read.read
+            fbus_read.read_data.next = fbus.read_data
+
+        if big_endian:
+            @always_comb
+            def beh_pack():
+                fbus.write_data.next = concat(sreg[wwide-wnarrow:0],
+                                              fbus_write.write_data)
+
+            @always_seq(clock.posedge, reset=reset)
+            def beh_shift():
+                if fbus_write.write and not fbus.full:
+                    sreg.next = concat(sreg[wwide-wnarrow:0],
+                                       fbus_write.write_data)
+        else:
+            @always_comb
+            def beh_pack():
+                fbus.write_data.next = concat(fbus_write.write_data,
+                                              sreg[wwide:wnarrow])
+
+            @always_seq(clock.posedge, reset=reset)
+            def beh_shift():
+                if fbus_write.write and not fbus.full:
+                    sreg.next = concat(fbus_write.write_data,
+                                       sreg[wwide:wnarrow])
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_index():
+            if fbus.clear:
+                idx.next = 0
+            elif fbus_write.write and not fbus.full:
+                if idx == last:
+                    idx.next = 0
+                else:
+                    idx.next = idx + 1
+
+    else:
+        # wide to narrow, the narrow word is selected from the wide
+        # word, the wide word is read with the last narrow word
+        sel = Signal(intbv(0, min=0, max=max(ratio, 2)))
+
+        @always_comb
+        def beh_read():
+            fbus.write.next = fbus_write.write and not fbus.full
+            fbus.write_data.next = fbus_write.write_data
+            fbus.read.next = (fbus_read.read and not fbus.empty and
+                              idx == last)
+
+        if big_endian:
+            @always_comb
+            def beh_select():
+                sel.next = last - idx
+        else:
+            @always_comb
+            def beh_select():
+                sel.next = idx
+
+        @always_comb
+        def beh_unpack():
+            word = intbv(0)[wwide:]
+            word[:] = fbus.read_data >> (sel * wnarrow)
+            fbus_read.read_data.next = word[wnarrow:0]
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_index():
+            if fbus.clear:
+                idx.next = 0
+            elif fbus_read.read and not fbus.empty:
+                if idx == last:
+                    idx.next = 0
+                else:
+                    idx.next = idx + 1
+
+    # the FIFO count, the wide words
+    fbus_write.count = fbus.count
+    fbus_read.count = fbus.count
+
+    return myhdl.instances()
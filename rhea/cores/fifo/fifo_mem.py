@@ -3,6 +3,7 @@
 # See the licence file in the top directory
 #
 
+from array import array
 
 import myhdl
 from myhdl import Signal, modbv, intbv
@@ -10,9 +11,21 @@ from myhdl import always_comb, always
 from rhea.system import Signals
 
 
+def compact_memory(memsize, datasize):
+    """ the memory array of the compact (simulation) memory
+
+    The words are stored in a Python array, a 64 bit word per element,
+    a list of ints is used for the wider words.
+    """
+    if datasize <= 64:
+        return array('Q', [0]) * memsize
+    return [0 for _ in range(memsize)]
+
+
 @myhdl.block
 def fifo_mem(clock_w, write, write_data, write_addr,
-             clock_r, read, read_data, read_addr, write_addr_delayed):
+             clock_r, read, read_data, read_addr, write_addr_delayed,
+             compact=False):
     """ Memory module used by FIFOs
 
     The write data takes two `clock_w` clock cycles to be latched
@@ -33,6 +46,15 @@ def fifo_mem(clock_w, write, write_data, write_addr,
            and after the memory array).  This is a delayed version of
            the write_addr that matches the write_data delay.
 
+    Parameters:
+       compact: use the compact memory array, simulation only.  The
+           memory array is a list-of-signals, a signal for each word,
+           a deep memory is slow to elaborate and uses a lot of memory
+           in simulation.  The compact memory array is a single
+           array (`compact_memory`), the writes are committed after
+           the clock edge the same as the signal updates.  The compact
+           memory is not convertible.
+
     The memory size is determine from the address width.
     """
     
@@ -45,9 +67,6 @@ def fifo_mem(clock_w, write, write_data, write_addr,
     #     memsize, datasize, addrsize
     # ))
 
-    # create the list-of-signals to represent the memory array
-    memarray = Signals(intbv(0)[datasize:0], memsize)
-
     addr_w, addr_wd, addr_r = Signals(modbv(0)[addrsize:], 3)
     din, dout = Signals(intbv(0)[datasize:], 2)
     wr = Signal(bool(0))
@@ -59,10 +78,41 @@ def fifo_mem(clock_w, write, write_data, write_addr,
         addr_w.next = write_addr
         din.next = write_data
 
-    @always(clock_w.posedge)
-    def beh_mem_write():
-        if wr:
-            memarray[addr_w].next = din
+    if compact:
+        # the memory array and the writes pending until the signal
+        # updates of the clock edge (commit toggles)
+        memarray = compact_memory(memsize, datasize)
+        pending = []
+        commit = Signal(bool(0))
+
+        @always(clock_w.posedge)
+        def beh_mem_write():
+            if wr:
+                pending.append((int(addr_w), int(din)))
+                commit.next = not commit
+
+        @always(commit)
+        def beh_mem_commit():
+            for addr, data in pending:
+                memarray[addr] = data
+            del pending[:]
+
+        @always(clock_r.posedge)
+        def beh_mem_read():
+            dout.next = memarray[int(addr_r)]
+
+    else:
+        # create the list-of-signals to represent the memory array
+        memarray = Signals(intbv(0)[datasize:0], memsize)
+
+        @always(clock_w.posedge)
+        def beh_mem_write():
+            if wr:
+                memarray[addr_w].next = din
+
+        @always(clock_r.posedge)
+        def beh_mem_read():
+            dout.next = memarray[addr_r]
 
     @always(clock_r.posedge)
     def beh_write_address_delayed():
@@ -79,10 +129,6 @@ def fifo_mem(clock_w, write, write_data, write_addr,
         else:
             addr_r.next = read_addr
 
-    @always(clock_r.posedge)
-    def beh_mem_read():
-        dout.next = memarray[addr_r]
-
     @always_comb
     def beh_dataout():
         read_data.next = dout
@@ -0,0 +1,150 @@
+from __future__ import absolute_import
+
+from math import log, ceil
+
+import myhdl
+from myhdl import Signal, intbv, modbv, concat, always_comb, always_seq
+
+from rhea import Global
+from rhea.system import FIFOBus
+from .fifo_mem import fifo_mem
+
+
+@myhdl.block
+def fifo_packet(glbl, fbus, size=128):
+    """ Synchronous packet (frame) FIFO
+
+    The words of a packet are written with the `fbus.write_last` set
+    with the last word of the packet.  A packet is committed when the
+    last word is written, the words of a packet are not available to
+    the reader until the packet is committed: the FIFO is empty
+    until a complete packet is in the FIFO.  A partially written
+    packet is dropped with `fbus.rollback`, e.g. when an error is
+    detected in the packet being received.  The `fbus.read_last` is
+    set with the last word of a packet.
+
+    The read is a "read acknowledge", like the `fifo_sync`, the read
+    data is available before the read strobe.  The FIFO count
+    (`fbus.count`) is the number of words in the FIFO, including the
+    words of a packet being written, and the packet count
+    (`fbus.packet_count`) the number of complete packets.  The
+    `almost_full` is from the FIFO count, the `almost_empty` is from
+    the committed words only, a burst read on `not almost_empty`
+    does not underrun.  A packet must fit in the FIFO, a partial
+    packet that fills the FIFO has to be dropped.
+
+    Arguments:
+        glbl (Global): global signals, clock and reset
+        fbus (FIFOBus): FIFO bus interface
+
+    Parameters:
+        size (int): the FIFO depth, words, a power of two
+
+    Usage::
+
+        fifobus = FIFOBus(width=8)
+        fifo_inst = fifo_packet(glbl, fifobus, size=512)
+    """
+    assert isinstance(glbl, Global)
+    assert isinstance(fbus, FIFOBus)
+
+    clock, reset = glbl.clock, glbl.reset
+    asz = int(ceil(log(size, 2)))
+    fifosize = 2**asz
+    width = len(fbus.write_data)
+
+    # the pointers have an extra bit, full vs. empty
+    wptr = Signal(modbv(0)[asz+1:])    # the next word written
+    cptr = Signal(modbv(0)[asz+1:])    # the end of the committed words
+    rptr = Signal(modbv(0)[asz+1:])    # the next word read
+    # the committed pointer is delayed for the memory write latency
+    cptr1 = Signal(modbv(0)[asz+1:])
+    cptr2 = Signal(modbv(0)[asz+1:])
+    commit1, commit2 = Signal(bool(0)), Signal(bool(0))
+
+    waddr = Signal(modbv(0)[asz:])
+    raddr = Signal(modbv(0)[asz:])
+    wad = Signal(modbv(0)[asz:])       # unused, required by fifo_mem
+
+    # the last flag is stored with the word
+    wdata = Signal(intbv(0)[width+1:])
+    rdata = Signal(intbv(0)[width+1:])
+    _we, _re = Signal(bool(0)), Signal(bool(0))
+
+    fifomem_inst = fifo_mem(
+        clock, _we, wdata, waddr,
+        clock, _re, rdata, raddr, wad
+    )
+
+    ntenant = Signal(modbv(0)[asz+1:])     # all the words
+    ncommit = Signal(modbv(0)[asz+1:])     # the committed words
+    npackets = Signal(intbv(0, min=0, max=fifosize+1))
+
+    @always_comb
+    def beh_assign():
+        _we.next = fbus.write and not fbus.full
+        _re.next = fbus.read and not fbus.empty
+        wdata.next = concat(fbus.write_last, fbus.write_data)
+        waddr.next = wptr[asz:0]
+        raddr.next = rptr[asz:0]
+        fbus.read_data.next = rdata[width:0]
+        fbus.read_last.next = rdata[width]
+        fbus.read_valid.next = fbus.read and not fbus.empty
+
+    @always_comb
+    def beh_flags():
+        ntenant.next = wptr - rptr
+        ncommit.next = cptr2 - rptr
+        fbus.empty.next = rptr == cptr2
+        fbus.full.next = ((wptr[asz] != rptr[asz]) and
+                          (wptr[asz:0] == rptr[asz:0]))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_pointers():
+        if fbus.clear:
+            wptr.next = 0
+            cptr.next = 0
+            rptr.next = 0
+            cptr1.next = 0
+            cptr2.next = 0
+            commit1.next = False
+            commit2.next = False
+        else:
+            commit1.next = False
+            if fbus.rollback:
+                # drop the words written since the last commit
+                wptr.next = cptr
+            elif fbus.write and not fbus.full:
+                wptr.next = wptr + 1
+                if fbus.write_last:
+                    cptr.next = wptr + 1
+                    commit1.next = True
+
+            if fbus.read and not fbus.empty:
+                rptr.next = rptr + 1
+
+            # the committed words are available after the memory write
+            cptr1.next = cptr
+            cptr2.next = cptr1
+            commit2.next = commit1
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_packet_count():
+        rdlast = fbus.read and not fbus.empty and fbus.read_last
+        if fbus.clear:
+            npackets.next = 0
+        elif commit2 and not rdlast:
+            npackets.next = npackets + 1
+        elif rdlast and not commit2:
+            npackets.next = npackets - 1
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = ntenant + fbus.almost_full_level >= fifosize
+        fbus.almost_empty.next = ncommit <= fbus.almost_empty_level
+
+    # attach the FIFO count and the packet count to the FIFOBus
+    fbus.count = ntenant
+    fbus.packet_count = npackets
+
+    return myhdl.instances()
@@ -16,7 +16,7 @@ from .fifo_mem import fifo_mem
 
 
 @myhdl.block
-def fifo_sync(glbl, fbus, size=128):
+def fifo_sync(glbl, fbus, size=128, compact=False):
     """ Synchronous FIFO
     This block is a basic synchronous FIFO.  In many cases it is
     better to use the `fifo_fast` synchronous FIFO (lower resources).
@@ -26,6 +26,12 @@ def fifo_sync(glbl, fbus, size=128):
     read signal is set it is acknowledging the data has been read
     and the next FIFO item will be available on the bus.
 
+    The FIFO count (`fbus.count`) is the number of words that can be
+    read, the words written are counted once they are through the
+    memory pipeline.  The almost empty flag is set from the count, the
+    almost full flag from the words written and not read, and the
+    FIFOBus levels (see `FIFOBus`).
+
     Arguments:
         glbl (Global): global signals, clock and reset
         fbus (FIFOBus): FIFO bus interface
@@ -33,6 +39,8 @@ def fifo_sync(glbl, fbus, size=128):
     Parameters:
         size (int): the size of the FIFO, the FIFO will have hold
             at maximum *size* elements.
+        compact (bool): use the compact memory array (simulation
+            only), for deep FIFOs, see `fifo_mem`.
 
     Examples: 
     
@@ -66,20 +74,30 @@ def fifo_sync(glbl, fbus, size=128):
     wptr = Signal(modbv(0, min=0, max=fifosize))    # address to write to
     wptrd = Signal(modbv(0, min=0, max=fifosize))   # aligned write pointer
     rptr = Signal(modbv(0, min=0, max=fifosize))    # address to read from
+    # the next pointers, compared modulo the FIFO size
+    wnext = Signal(modbv(0, min=0, max=fifosize))
+    rnext = Signal(modbv(0, min=0, max=fifosize))
 
     # generic memory model, this memory uses two registers on 
     # the input and one on the output, it takes three clock 
     # cycles for write data to appear on the read.
+    # the memory reads ahead on a read, only when the read pointer
+    # advances (the FIFO is not empty)
+    _re = Signal(bool(0))
     fifomem_inst = fifo_mem(
         clock, fbus.write, fbus.write_data, wptr,
-        clock, fbus.read, fbus.read_data, rptr, wptrd
+        clock, _re, fbus.read_data, rptr, wptrd, compact=compact
     )
 
-    # @todo: almost full and almost empty flags
     read, write = fbus.read, fbus.write
     states = enum('init', 'empty', 'active', 'full')
     state = Signal(states.init)
 
+    @always_comb
+    def beh_next():
+        wnext.next = wptr + 1
+        rnext.next = rptr + 1
+
     @always_seq(clock.posedge, reset=reset)
     def beh_fifo():
 
@@ -106,23 +124,29 @@ def fifo_sync(glbl, fbus, size=128):
                 fbus.full.next = False
                 if not fbus.empty:
                     rptr.next = rptr + 1
-                if rptr+1 == wptrd:
+                if rnext == wptrd:
                     fbus.empty.next = True
                     state.next = states.empty
 
             elif write and not read:
                 if not fbus.full:
                     wptr.next = wptr + 1
-                if wptr+1 == rptr:
+                if wnext == rptr:
                     fbus.full.next = True
                     state.next = states.full
 
             elif write and read:
                 wptr.next = wptr + 1
-                rptr.next = rptr + 1
+                if not fbus.empty:
+                    rptr.next = rptr + 1
+                    # the word written is not through the fifo_mem yet
+                    if rnext == wptrd:
+                        fbus.empty.next = True
 
         elif state == states.full:
-            if read and not write:
+            # the write is ignored when full, the read is not
+            if read:
+                fbus.full.next = False
                 state.next = states.active
                 rptr.next = rptr + 1
 
@@ -134,39 +158,46 @@ def fifo_sync(glbl, fbus, size=128):
 
     @always_comb
     def beh_assign():
+        _re.next = fbus.read and not fbus.empty
         fbus.read_valid.next = fbus.read and not fbus.empty
                 
-    nitems = fifosize
-    if fifo_sync.occupancy_assertions:
-        nvacant = Signal(intbv(fifosize, min=0, max=nitems+1))  # # empty slots
-        ntenant = Signal(intbv(0, min=0, max=nitems+1))         # # filled slots
-    else:
-        nitems = int(2 ** (ceil(log(nitems, 2))))
-        nvacant = Signal(modbv(nitems, min=0, max=nitems))
-        ntenant = Signal(modbv(0, min=0, max=nitems))
-
-    if fifo_sync.debug:
-        @always_seq(clock.posedge, reset=reset)
-        def dbg_occupancy():
-            if fbus.clear:
-                nvacant.next = fifosize   # the number of empty slots
-                ntenant.next = 0          # the number of full slots
-            else:
-                v = int(nvacant)
-                f = int(ntenant)
-
-                if fbus.read_valid:
-                    v = v + 1
-                    f = f - 1
-                if fbus.write:
-                    v = v -1
-                    f = f + 1
-
-                nvacant.next = v
-                ntenant.next = f
-
-    # the FIFOBus count references the local signal
-    fbus.count = ntenant
+    # the FIFO occupancy from the pointers, the pointers are equal
+    # when the FIFO is empty or full.  The words written (write side)
+    # and the words through the memory pipeline (read side, aligned
+    # write pointer).
+    asz = int(ceil(log(fifosize, 2)))
+    ptrdiff = Signal(modbv(0)[asz:])
+    rdptrdiff = Signal(modbv(0)[asz:])
+    ntenant = Signal(intbv(0, min=0, max=fifosize+1))
+    nreadable = Signal(intbv(0, min=0, max=fifosize+1))
+
+    @always_comb
+    def beh_ptrdiff():
+        ptrdiff.next = wptr - rptr
+        rdptrdiff.next = wptrd - rptr
+
+    @always_comb
+    def beh_occupancy():
+        if fbus.full:
+            ntenant.next = fifosize
+        else:
+            ntenant.next = ptrdiff
+        # the empty is registered, the aligned pointer leads the empty
+        if fbus.empty:
+            nreadable.next = 0
+        elif fbus.full and rdptrdiff == 0:
+            nreadable.next = fifosize
+        else:
+            nreadable.next = rdptrdiff
+
+    @always_comb
+    def beh_almost():
+        fbus.almost_full.next = ntenant + fbus.almost_full_level >= fifosize
+        fbus.almost_empty.next = nreadable <= fbus.almost_empty_level
+
+    # the FIFOBus count references the local signal, the words that
+    # can be read
+    fbus.count = nreadable
 
     # @todo: will need to replace myhdl.instances with the
     #        conditional collection of inst/gens (see above)
@@ -175,5 +206,3 @@ def fifo_sync(glbl, fbus, size=128):
 
 # attached a generic fifo bus object to the module
 fifo_sync.fbus_intf = FIFOBus
-fifo_sync.debug = True
-fifo_sync.occupancy_assertions = True
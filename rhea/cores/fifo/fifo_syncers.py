@@ -33,14 +33,28 @@ def sync_reset(clock, reset_in, reset_out, sync_length=2):
 
 
 @myhdl.block
-def sync_mbits(clock, reset, signal_in, signal_out):
-    """Two stage synchronizer
+def sync_mbits(clock, reset, signal_in, signal_out, sync_stages=2):
+    """Multi-bit (multi-stage) synchronizer
+
+    Arguments:
+        clock: the destination clock domain clock
+        reset: the destination clock domain reset
+        signal_in: the signal from the source clock domain, the
+            bits must change one at a time (e.g. a Gray code)
+        signal_out: the sync'd signal
+    Parameters:
+        sync_stages: the number of register stages, including the
+            output register, two or more
     """
-    d1 = Signal(intbv(0)[len(signal_out):])
+    assert sync_stages >= 2, "at least two synchronizer stages required"
+    nbits = len(signal_out)
+    dsync = [Signal(intbv(0)[nbits:]) for _ in range(sync_stages-1)]
 
     @always_seq(clock.posedge, reset=reset)
     def beh():
-        d1.next = signal_in
-        signal_out.next = d1
+        dsync[0].next = signal_in
+        for ii in range(1, sync_stages-1):
+            dsync[ii].next = dsync[ii-1]
+        signal_out.next = dsync[sync_stages-2]
 
     return beh
@@ -5,3 +5,5 @@ from .controller import controller_basic
 from .peripheral import peripheral_memory
 from .peripheral import peripheral
 from .command_bridge import command_bridge
+from .crossbar import crossbar
+from .dma import dma, dma_regfile
@@ -2,162 +2,323 @@
 from __future__ import absolute_import
 
 import myhdl
-from myhdl import (Signal, intbv, enum, always_seq, always_comb,
-                   ConcatSignal)
+from myhdl import (Signal, intbv, modbv, enum, always_seq, always_comb,
+                   ConcatSignal, concat)
 
 from rhea.system import MemoryMapped, Barebone, FIFOBus
 from . import controller_basic
 
 
 @myhdl.block
-def command_bridge(glbl, fifobus, mmbus):
+def command_bridge(glbl, fifobus, mmbus, tagged=False, packets=False):
     """ Convert a command packet to a memory-mapped bus transaction
-    
-    This module will decode the incomming packet and start a bus 
+
+    This module will decode the incomming packet and start a bus
     transaction, the memmap_controller_basic is used to generate
-    the bus transactions, it convertes the Barebone interface to 
-    the MemoryMapped interface being used. 
-    
+    the bus transactions, it convertes the Barebone interface to
+    the MemoryMapped interface being used.
+
     The variable length command packet is:
         00: 0xDE
         01: command byte (response msb indicates error)
-        02: address high byte 
-        03: address byte 
-        04: address byte 
-        05: address low byte 
-        06: length of data (max length 256 bytes)
-        07: 0xCA   # sequence number, fixed for now
-        08: data high byte 
+        02: address high byte
+        03: address byte
+        04: address byte
+        05: address low byte
+        06: length of data in bytes, a multiple of 4 (0 is 256 bytes)
+        07: 0xCA   # sequence number (tag), fixed if not tagged
+        08: data high byte
         09: data byte
         10: data byte
         11: data low byte
-        Fixed 12 byte packet currently supported, future
-        to support block write/reads up to 256-8-4
-        12 - 253: write / read (big-endian)
+        12 - 263: block write / read data (big-endian)
         @todo: last 2 bytes crc
-    The total packet length is 16 + data_length
+
+    A block read command packet is the 8 byte header only, a single
+    word read command packet is 12 bytes, the header followed by 4
+    data bytes that are ignored (the original packet format, the 4
+    bytes are optional in the packet mode).  A write command packet
+    is the header followed by the write data.  A block read or
+    write is a sequence of bus cycles, the address increments by 4
+    (32-bit words) for each bus cycle.  The response packet is the
+    header followed by the data read, a write is read back after all
+    the words are written.  A single word packet is 12 bytes and a
+    block packet is up to 8 + 256 bytes.
+
+    The header of the next packet is received while the current packet
+    bus cycles run and the response is sent, a host can keep multiple
+    packets in flight (see `CommandPipeline`).  In the tagged mode byte
+    7 is a sequence number (tag) chosen by the host, the tag is
+    returned in the response so the host can match the responses.
+
+    In the packet mode the read path of the `fifobus` is a packet FIFO
+    (`fifo_packet`), the bytes of a command packet are available when
+    the complete packet is in the FIFO and the bytes of a packet are
+    read back to back.  The last byte of a packet is marked
+    (`read_last`), when an error is detected the bytes are flushed to
+    the end of the packet only, the next packet is not lost.  The last
+    byte of the response packet is written with the `write_last` set,
+    the write path can be a packet FIFO.
 
     Ports:
       glbl: global signals and control
       fifobus: FIFOBus interface, read and write path
       mmbus: memory-mapped bus (interface)
 
+    Parameters:
+      tagged: byte 7 is a sequence number instead of 0xCA
+      packets: the packet mode, the FIFOs mark the end of the packets
+
     this module is convertible
     """
     assert isinstance(fifobus, FIFOBus)
     assert isinstance(mmbus, MemoryMapped)
 
-    clock, reset = glbl.clock, glbl.reset 
+    clock, reset = glbl.clock, glbl.reset
     bb = Barebone(glbl, data_width=mmbus.data_width,
                   address_width=mmbus.address_width)
-    
+
     states = enum(
-        'idle',
-        'wait_for_packet',   # receive a command packet
+        'idle',              # wait for a command packet header
         'check_packet',      # basic command check
+        'read_discard',      # receive the single read data, ignored
+        'write_data',        # receive a write data word
         'write',             # bus write
         'write_end',         # end of the write cycle
+        'response',          # send response packet header
+        'response_full',     # check of RX FIFO full
         'read',              # read bus cycles for response
         'read_end',          # end of the read cycle
-        'response',          # send response packet
-        'response_full',     # check of RX FIFO full
+        'read_data',         # send the read data word
+        'read_data_full',    # check of RX FIFO full
         'error',             # error occurred
         'end'                # end state
     )
 
     state = Signal(states.idle)
-    ready = Signal(bool(0))
+    flush = Signal(bool(0))
     error = Signal(bool(0))
     bytecnt = intbv(0, min=0, max=256)
 
-    # known knows
-    pidx = (0, 7,)
-    pval = (0xDE, 0xCA,)
+    # known knows, byte 7 is the tag in the tagged mode
+    pidx = (0,) if tagged else (0, 7,)
+    pval = (0xDE,) if tagged else (0xDE, 0xCA,)
     assert len(pidx) == len(pval)
     nknown = len(pidx)
 
     bytemon = Signal(intbv(0)[8:])
 
-    # only supporting 12byte packets (single read/write) for now
-    packet_length = 12
-    data_offset = 8
-    packet = [Signal(intbv(0)[8:]) for _ in range(packet_length)]
+    # the packet header is saved, the data is streamed to and from
+    # the bus one word at a time.
+    header_length = 8
+    packet = [Signal(intbv(0)[8:]) for _ in range(header_length)]
     command = packet[1]
     address = ConcatSignal(*packet[2:6])
-    data = ConcatSignal(*packet[8:12])
     datalen = packet[6]
 
+    # the next packet header, received while the current packet is
+    # processed.
+    rxpkt = [Signal(intbv(0)[8:]) for _ in range(header_length)]
+    hdr_cnt = Signal(intbv(0, min=0, max=header_length+1))
+    hdr_busy = Signal(bool(0))     # receiving a header
+    hdr_valid = Signal(bool(0))    # a complete header is waiting
+    hdr_error = Signal(bool(0))    # unexpected known byte
+    hdr_enable = Signal(bool(0))   # the FIFO is not used for data
+    hdr_last = Signal(bool(0))     # the header is the complete packet
+    pkt_last = Signal(bool(0))     # the packet has been received
+
+    # the number of FIFO reads to issue (bytes to receive), header
+    # bytes and write data bytes.
+    hdr_rdreq = Signal(intbv(0, min=0, max=header_length+1))
+    rdreq = Signal(intbv(0, min=0, max=header_length+1))
+    # the number of words in the block and the current word
+    max_words = 64
+    nwords = Signal(intbv(0, min=0, max=max_words+1))
+    wordcnt = Signal(intbv(0, min=0, max=max_words+1))
+    addr = Signal(modbv(0)[32:])
+    data = Signal(intbv(0)[32:])
+
+    # @todo: need to support different address widths, use
+    # @todo: `bb` attributes to determine which bits to assign
+    plen, mlen = len(bb.per_addr), len(bb.mem_addr)
+
     # convert generic memory-mapped bus to the memory-mapped interface
     # passed to the controller
     mmc_inst = controller_basic(bb, mmbus)
 
     @always_comb
     def beh_fifo_read():
-        if ready and not fifobus.empty:
+        if ((flush or hdr_rdreq > 0 or rdreq > 0) and
+                not fifobus.empty):
             fifobus.read.next = True
         else:
             fifobus.read.next = False
 
-    @always_seq(clock.posedge, reset=reset)
-    def beh_state_machine():
+    @always_comb
+    def beh_hdr_enable():
+        # the header of the next packet can be received once the
+        # write data of the current packet has been received.
+        if (state == states.idle or state == states.response or
+                state == states.response_full or state == states.read or
+                state == states.read_end or state == states.read_data or
+                state == states.read_data_full or state == states.end):
+            hdr_enable.next = True
+        else:
+            hdr_enable.next = False
 
-        if state == states.idle:
-            state.next = states.wait_for_packet
-            ready.next = True
-            bytecnt[:] = 0
+    @always_seq(clock.posedge, reset=reset)
+    def beh_header():
+        # count the FIFO reads issued, the header and the write data
+        # reads never overlap
+        if fifobus.read and hdr_rdreq > 0:
+            hdr_rdreq.next = hdr_rdreq - 1
 
-        elif state == states.wait_for_packet:
+        if hdr_busy:
             if fifobus.read_valid:
                 # check the known bytes, if the values is unexpected
                 # goto the error state and flush all received bytes.
                 for ii in range(nknown):
                     idx = pidx[ii]
                     val = pval[ii]
-                    if bytecnt == idx:
+                    if hdr_cnt == idx:
                         if fifobus.read_data != val:
-                            error.next = True
-                            state.next = states.error
+                            hdr_error.next = True
 
-                packet[bytecnt].next = fifobus.read_data
-                bytecnt[:] = bytecnt + 1
+                rxpkt[hdr_cnt].next = fifobus.read_data
+                if hdr_cnt == header_length-1:
+                    hdr_busy.next = False
+                    hdr_valid.next = True
+                    hdr_last.next = fifobus.read_last
+                elif fifobus.read_last:
+                    # a short packet (packet mode), the header is
+                    # incomplete, no more reads
+                    hdr_rdreq.next = 0
+                    hdr_error.next = True
+                    hdr_busy.next = False
+                    hdr_valid.next = True
+                    hdr_last.next = True
+                hdr_cnt.next = hdr_cnt + 1
+
+        elif hdr_valid:
+            # the state machine takes the header in the idle state
+            if state == states.idle:
+                hdr_valid.next = False
+                hdr_error.next = False
+
+        elif hdr_enable and not flush:
+            hdr_busy.next = True
+            hdr_rdreq.next = header_length
+            hdr_cnt.next = 0
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_state_machine():
 
-            # @todo: replace 20 with len(CommandPacket().header)
-            if bytecnt == packet_length:
-                ready.next = False
-                state.next = states.check_packet
+        # count the FIFO reads issued
+        if fifobus.read and hdr_rdreq == 0 and rdreq > 0:
+            rdreq.next = rdreq - 1
+
+        if state == states.idle:
+            bytecnt[:] = 0
+            if hdr_valid:
+                for ii in range(header_length):
+                    packet[ii].next = rxpkt[ii]
+                pkt_last.next = hdr_last
+                if hdr_error:
+                    error.next = True
+                    flush.next = not hdr_last
+                    state.next = states.error
+                else:
+                    state.next = states.check_packet
 
         elif state == states.check_packet:
-            # @todo: some packet checking
-            # @todo: need to support different address widths, use
-            # @todo: `bb` attributes to determine which bits to assign
-            bb.per_addr.next = address[32:28]
-            bb.mem_addr.next = address[28:0]
-            assert bb.done
+            addr.next = address
             bytecnt[:] = 0
+            wordcnt.next = 0
+            if datalen == 0:
+                nwords.next = max_words
+            else:
+                nwords.next = datalen[8:2]
 
-            if command == 1:
-                state.next = states.read
+            if datalen[2:0] != 0:
+                error.next = True
+                flush.next = not pkt_last
+                state.next = states.error
+            elif command == 1:
+                # a single word read packet has 4 data bytes, in the
+                # packet mode the packet can be the header only
+                if datalen == 4 and not pkt_last:
+                    rdreq.next = 4
+                    state.next = states.read_discard
+                else:
+                    state.next = states.response
             elif command == 2:
-                bb.write_data.next = data
-                state.next = states.write
+                rdreq.next = 4
+                state.next = states.write_data
             else:
                 error.next = True
+                flush.next = not pkt_last
                 state.next = states.error
 
+        elif state == states.read_discard:
+            if fifobus.read_valid:
+                bytecnt[:] = bytecnt + 1
+            if bytecnt == 4:
+                bytecnt[:] = 0
+                state.next = states.response
+
+        elif state == states.write_data:
+            if fifobus.read_valid:
+                data.next = concat(data[24:0], fifobus.read_data)
+                bytecnt[:] = bytecnt + 1
+            if bytecnt == 4:
+                bytecnt[:] = 0
+                state.next = states.write
+
         elif state == states.write:
             # @todo: add timeout
             if bb.done:
+                bb.per_addr.next = addr[32:32-plen]
+                bb.mem_addr.next = addr[mlen:0]
+                bb.write_data.next = data
                 bb.write.next = True
                 state.next = states.write_end
 
         elif state == states.write_end:
             bb.write.next = False
             if bb.done:
+                addr.next = addr + 4
+                if wordcnt == nwords-1:
+                    wordcnt.next = 0
+                    state.next = states.response
+                else:
+                    wordcnt.next = wordcnt + 1
+                    rdreq.next = 4
+                    state.next = states.write_data
+
+        elif state == states.response:
+            # send the response header, the read data follows
+            fifobus.write.next = False
+            if bytecnt < header_length:
+                if not fifobus.full:
+                    fifobus.write.next = True
+                    fifobus.write_data.next = packet[bytecnt]
+                    fifobus.write_last.next = False
+                    bytecnt[:] = bytecnt + 1
+                state.next = states.response_full
+            else:
+                bytecnt[:] = 0
+                addr.next = address
                 state.next = states.read
 
+        elif state == states.response_full:
+            fifobus.write.next = False
+            state.next = states.response
+
         elif state == states.read:
             # @todo: add timeout
             if bb.done:
+                bb.per_addr.next = addr[32:32-plen]
+                bb.mem_addr.next = addr[mlen:0]
                 bb.read.next = True
                 state.next = states.read_end
 
@@ -165,35 +326,47 @@ def command_bridge(glbl, fifobus, mmbus):
             bb.read.next = False
             if bb.done:
                 # @todo: support different data_width bus
-                packet[data_offset+0].next = bb.read_data[32:24]
-                packet[data_offset+1].next = bb.read_data[24:16]
-                packet[data_offset+2].next = bb.read_data[16:8]
-                packet[data_offset+3].next = bb.read_data[8:0]
-                state.next = states.response
+                data.next = bb.read_data
+                state.next = states.read_data
 
-        elif state == states.response:
+        elif state == states.read_data:
+            # send the read data word (big-endian)
             fifobus.write.next = False
-            if bytecnt < packet_length:
+            if bytecnt < 4:
                 if not fifobus.full:
                     fifobus.write.next = True
-                    fifobus.write_data.next = packet[bytecnt]
+                    fifobus.write_data.next = data[32:24]
+                    # the last byte of the response packet
+                    fifobus.write_last.next = (bytecnt == 3 and
+                                               wordcnt == nwords-1)
+                    data.next = concat(data[24:0], intbv(0)[8:])
                     bytecnt[:] = bytecnt + 1
-                state.next = states.response_full
-            else:
+                state.next = states.read_data_full
+            elif wordcnt == nwords-1:
                 state.next = states.end
-                
-        elif state == states.response_full:
+            else:
+                bytecnt[:] = 0
+                addr.next = addr + 4
+                wordcnt.next = wordcnt + 1
+                state.next = states.read
+
+        elif state == states.read_data_full:
             fifobus.write.next = False
-            state.next = states.response
+            state.next = states.read_data
 
         elif state == states.error:
-            if not fifobus.read_valid:
+            if packets:
+                # flush to the end of the packet
+                if not flush or (fifobus.read_valid and fifobus.read_last):
+                    state.next = states.end
+                    flush.next = False
+            elif not fifobus.read_valid:
                 state.next = states.end
-                ready.next = False
+                flush.next = False
 
         elif state == states.end:
             error.next = False
-            ready.next = False
+            flush.next = False
             state.next = states.idle
 
         else:
@@ -201,4 +374,5 @@ def command_bridge(glbl, fifobus, mmbus):
 
         bytemon.next = bytecnt
 
-    return beh_fifo_read, mmc_inst, beh_state_machine
+    return (beh_fifo_read, beh_hdr_enable, mmc_inst, beh_header,
+            beh_state_machine)
@@ -0,0 +1,207 @@
+
+from __future__ import absolute_import
+
+import myhdl
+from myhdl import Signal, intbv, always_seq, always_comb
+
+from rhea.system import MemoryMapped, Barebone
+from . import controller_basic
+
+
+def _get_per_addrs(slave, ii, mem_width):
+    """ the peripheral addresses of a slave bus, from the base addresses
+    of the register files added to the bus, else the slave index.
+    """
+    if len(slave.regfiles) > 0:
+        return sorted(set([rf.base_address >> mem_width
+                           for rf in slave.regfiles.values()]))
+    return [ii]
+
+
+@myhdl.block
+def crossbar(glbl, masters, slaves, per_addrs=None,
+             arbitration='round_robin'):
+    """ Connect multiple memory-mapped masters to multiple peripherals
+
+    Each master and each slave is a `Barebone` bus, a slave can be any
+    `MemoryMapped` bus, a `controller_basic` is added to drive the
+    bus.  A master transaction is routed to the slave selected by the
+    peripheral address (`per_addr`), transactions from different
+    masters to different slaves run concurrently.  If multiple masters
+    access the same slave the slave arbiter grants the slave to one
+    master at a time, round-robin or by priority (master 0 first).
+
+    A master starts a transaction with a single cycle `write` or `read`
+    strobe, `done` goes low with the strobe and is high again when
+    the slave completed the transaction.  The crossbar registers the
+    request, a transaction takes two clocks more than a point-to-point
+    bus.  The slave read data is OR'd from the strobe until the slave
+    is done (an idle slave drives zero), the master `read_data` holds
+    the value until the next transaction.  A transaction to an address
+    without a peripheral completes with zero read data.
+
+    Ports:
+      glbl: global signals, clock and reset
+      masters: list of Barebone buses, the crossbar is the peripheral.
+        The masters need to be created first (e.g. `command_bridge`
+        maps its internal bus to the Barebone bus).
+      slaves: list of MemoryMapped buses, the crossbar is the master
+
+    Parameters:
+      per_addrs: a list with the peripheral addresses of each slave,
+        defaults to the base addresses of the register files added
+        to each slave bus (base_address >> len(mem_addr)) or the
+        slave index.
+      arbitration: 'round_robin' or 'priority'
+
+    this module is convertible
+    """
+    assert len(masters) > 0 and len(slaves) > 0
+    assert arbitration in ('round_robin', 'priority')
+    clock, reset = glbl.clock, glbl.reset
+    nmasters, nslaves = len(masters), len(slaves)
+    rr = 1 if arbitration == 'round_robin' else 0
+
+    data_width = masters[0].data_width
+    address_width = masters[0].address_width
+    pwidth, mwidth = len(masters[0].per_addr), len(masters[0].mem_addr)
+
+    # a generic (Barebone) bus for each slave
+    sbbs, ctl_insts = [], []
+    for slave in slaves:
+        if isinstance(slave, Barebone):
+            sbbs.append(slave)
+        else:
+            assert isinstance(slave, MemoryMapped)
+            bb = Barebone(glbl, data_width=data_width,
+                          address_width=address_width)
+            ctl_insts.append(controller_basic(bb, slave))
+            sbbs.append(bb)
+
+    for bb in masters + sbbs:
+        assert isinstance(bb, Barebone)
+        assert bb.data_width == data_width
+        assert len(bb.per_addr) == pwidth and len(bb.mem_addr) == mwidth
+
+    # the peripheral address to slave index decode table, nslaves
+    # is no slave at the address
+    if per_addrs is None:
+        per_addrs = [_get_per_addrs(slave, ii, mwidth)
+                     for ii, slave in enumerate(slaves)]
+    assert len(per_addrs) == nslaves
+    table = [nslaves for _ in range(2**pwidth)]
+    for ii, pas in enumerate(per_addrs):
+        for pa in pas:
+            assert table[pa] == nslaves, "per_addr {} collision".format(pa)
+            table[pa] = ii
+    table = tuple(table)
+
+    # master and slave bus signals
+    mwrite = [mm.write for mm in masters]
+    mread = [mm.read for mm in masters]
+    mpaddr = [mm.per_addr for mm in masters]
+    mmaddr = [mm.mem_addr for mm in masters]
+    mwdata = [mm.write_data for mm in masters]
+    mbe = [mm.byte_enable for mm in masters]
+    mrdata = [mm.read_data for mm in masters]
+    mdone = [mm.done for mm in masters]
+
+    swrite = [bb.write for bb in sbbs]
+    sread = [bb.read for bb in sbbs]
+    spaddr = [bb.per_addr for bb in sbbs]
+    smaddr = [bb.mem_addr for bb in sbbs]
+    swdata = [bb.write_data for bb in sbbs]
+    sbe = [bb.byte_enable for bb in sbbs]
+    srdata = [bb.read_data for bb in sbbs]
+    sdone = [bb.done for bb in sbbs]
+
+    # master port, the registered request and the state
+    m_idle, m_wait, m_busy = 0, 1, 2
+    mstate = [Signal(intbv(m_idle, min=0, max=3)) for _ in masters]
+    mslave = [Signal(intbv(0, min=0, max=nslaves+1)) for _ in masters]
+    mwe = [Signal(bool(0)) for _ in masters]
+    mpa = [Signal(intbv(0)[pwidth:]) for _ in masters]
+    mma = [Signal(intbv(0)[mwidth:]) for _ in masters]
+    mwd = [Signal(intbv(0)[data_width:]) for _ in masters]
+    nbytes = len(masters[0].byte_enable)
+    mbr = [Signal(intbv(0)[nbytes:]) for _ in masters]
+
+    # slave port, the master granted and the state
+    s_idle, s_strobe, s_busy = 0, 1, 2
+    sstate = [Signal(intbv(s_idle, min=0, max=3)) for _ in sbbs]
+    sowner = [Signal(intbv(0, min=0, max=max(2, nmasters))) for _ in sbbs]
+    # the first master checked by the arbiter
+    sfirst = [Signal(intbv(0, min=0, max=max(2, nmasters))) for _ in sbbs]
+
+    @always_comb
+    def beh_done():
+        for mm in range(nmasters):
+            if mstate[mm] == m_idle and not (mwrite[mm] or mread[mm]):
+                mdone[mm].next = True
+            else:
+                mdone[mm].next = False
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_crossbar():
+        # register the new master requests
+        for mm in range(nmasters):
+            if mstate[mm] == m_idle and (mwrite[mm] or mread[mm]):
+                pa = mpaddr[mm]
+                sel = table[pa]
+                mwe[mm].next = mwrite[mm]
+                mpa[mm].next = mpaddr[mm]
+                mma[mm].next = mmaddr[mm]
+                mwd[mm].next = mwdata[mm]
+                mbr[mm].next = mbe[mm]
+                mrdata[mm].next = 0
+                mslave[mm].next = sel
+                if sel != nslaves:
+                    mstate[mm].next = m_wait
+                else:
+                    mstate[mm].next = m_busy
+            elif mstate[mm] == m_busy and mslave[mm] == nslaves:
+                # no peripheral at the address, zero read data
+                mstate[mm].next = m_idle
+
+        for ss in range(nslaves):
+            if sstate[ss] == s_idle:
+                # grant the slave to a waiting master, round-robin
+                # starts after the last master granted
+                found = False
+                gnt = 0
+                for ii in range(nmasters):
+                    mi = (sfirst[ss] + ii) % nmasters
+                    if (not found and mstate[mi] == m_wait and
+                            mslave[mi] == ss):
+                        found = True
+                        gnt = mi
+
+                if found:
+                    sowner[ss].next = gnt
+                    if rr:
+                        sfirst[ss].next = (gnt + 1) % nmasters
+                    swrite[ss].next = mwe[gnt]
+                    sread[ss].next = not mwe[gnt]
+                    spaddr[ss].next = mpa[gnt]
+                    smaddr[ss].next = mma[gnt]
+                    swdata[ss].next = mwd[gnt]
+                    sbe[ss].next = mbr[gnt]
+                    mstate[gnt].next = m_busy
+                    sstate[ss].next = s_strobe
+
+            elif sstate[ss] == s_strobe:
+                swrite[ss].next = False
+                sread[ss].next = False
+                own = sowner[ss]
+                mrdata[own].next = mrdata[own] | srdata[ss]
+                sstate[ss].next = s_busy
+
+            else:
+                # wait for the slave to complete the transaction
+                own = sowner[ss]
+                mrdata[own].next = mrdata[own] | srdata[ss]
+                if sdone[ss]:
+                    mstate[own].next = m_idle
+                    sstate[ss].next = s_idle
+
+    return ctl_insts, beh_done, beh_crossbar
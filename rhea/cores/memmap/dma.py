@@ -0,0 +1,346 @@
+
+from __future__ import absolute_import
+
+import myhdl
+from myhdl import Signal, intbv, modbv, enum, always_seq, always_comb
+
+from rhea.system import MemoryMapped, Barebone, FIFOBus
+from rhea.system import Register, RegisterFile
+from . import controller_basic
+
+
+def dma_regfile(addr_step=4):
+    """ the DMA register file
+
+    Registers:
+      0x00 control: start (0), to_fifo (1) memory to FIFO else FIFO
+           to memory, sg (2) scatter-gather, irq_en (3) interrupt
+           enable.  A write to the control register clears the
+           done and error status.
+      0x04 status (ro): busy (0), done (1), error (2) bus timeout
+      0x08 address: the memory address of the first word
+      0x0C length: the number of words
+      0x10 stride: the address increment of each word
+      0x14 desc: the address of the first descriptor
+      0x18 count (ro): the number of words transferred
+    """
+    regfile = RegisterFile()
+
+    reg = Register('control', 32, 'rw', 0, 0x00)
+    reg.comment = "DMA control, the start bit starts a transfer"
+    reg.add_namedbits('start', 0, "start a transfer")
+    reg.add_namedbits('to_fifo', 1, "memory to FIFO, else FIFO to memory")
+    reg.add_namedbits('sg', 2, "scatter-gather, use the descriptor list")
+    reg.add_namedbits('irq_en', 3, "interrupt enable")
+    regfile.add_register(reg)
+
+    reg = Register('status', 32, 'ro', 0, 0x04)
+    reg.comment = "DMA status, cleared when the control is written"
+    reg.add_namedbits('busy', 0, "a transfer is in progress")
+    reg.add_namedbits('done', 1, "the transfer completed")
+    reg.add_namedbits('error', 2, "the transfer was aborted, bus timeout")
+    regfile.add_register(reg)
+
+    for name, default, addr, comment in (
+            ('address', 0, 0x08, "memory address of the first word"),
+            ('length', 0, 0x0C, "number of words to transfer"),
+            ('stride', addr_step, 0x10, "memory address increment"),
+            ('desc', 0, 0x14, "address of the first descriptor"),):
+        regfile.add_register(Register(name, 32, 'rw', default, addr, comment))
+
+    reg = Register('count', 32, 'ro', 0, 0x18)
+    reg.comment = "number of words transferred"
+    reg.add_namedbits('words', slice(32, 0), "words transferred")
+    regfile.add_register(reg)
+
+    return regfile
+
+
+@myhdl.block
+def dma(glbl, regbus, fifobus, membus, irq=None, base_address=None,
+        addr_step=4, timeout=255):
+    """ Move data between a FIFOBus stream and a memory-mapped bus
+
+    The DMA is configured with the register file (see `dma_regfile`)
+    on the `regbus` and transfers words between the `fifobus` and the
+    memory on the `membus`.  Memory to FIFO transfers read the memory
+    and write the FIFOBus write path, FIFO to memory transfers read
+    the FIFOBus read path and write the memory (see the FIFOBus
+    `assign_read_write_paths`).
+
+    A transfer is started by writing the control register with the
+    start bit set, `length` words are transferred starting at
+    `address`, the address increments by `stride` each word.  In the
+    scatter-gather mode (sg) the transfer is a list of descriptors
+    read from the memory starting at `desc`, a descriptor is four
+    words at consecutive addresses (`addr_step`):
+
+        0: address
+        1: length
+        2: stride
+        3: next descriptor address, 0 is the end of the list
+
+    The done status is set when the transfer (all the descriptors)
+    completed and remains set until the control register is written,
+    the `irq` is the done status when the interrupt is enabled.  If
+    the memory does not complete a bus cycle in `timeout` clocks the
+    transfer is aborted and the error and done status are set.
+
+    A `Barebone` membus is driven directly and the memory writes are
+    bursts (up to `max_burst` words, a word each clock while the
+    peripheral keeps `done` low), other buses are driven with a
+    `controller_basic` one bus cycle at a time.  The memory reads are
+    single bus cycles, the next read is started when the previous word
+    is written to the FIFO.
+
+    Ports:
+      glbl: global signals, clock and reset
+      regbus: memory-mapped bus the register file is added to
+      fifobus: FIFOBus, the stream read and write paths
+      membus: memory-mapped bus, the DMA is the master
+      irq: output, transfer done interrupt
+
+    Parameters:
+      base_address: the register file base address
+      addr_step: the address increment of consecutive words, 4 for a
+        byte addressed memory and 1 for a word addressed memory
+        (`peripheral_memory`), the default stride.
+      timeout: the maximum clocks for a memory bus cycle
+
+    this module is convertible
+    """
+    assert isinstance(regbus, MemoryMapped)
+    assert isinstance(fifobus, FIFOBus)
+    assert isinstance(membus, MemoryMapped)
+    assert fifobus.width == membus.data_width
+    assert membus.address_width <= 32
+    clock, reset = glbl.clock, glbl.reset
+
+    regfile = dma_regfile(addr_step)
+    regfile.base_address = base_address
+    regfile_inst = regbus.add(regfile, 'dma')
+
+    if irq is None:
+        irq = Signal(bool(0))
+
+    # the generic bus to the memory
+    if isinstance(membus, Barebone):
+        bb = membus
+        ctl_inst = []
+        max_burst = membus.max_burst
+    else:
+        bb = Barebone(glbl, data_width=membus.data_width,
+                      address_width=membus.address_width)
+        ctl_inst = controller_basic(bb, membus)
+        max_burst = 1
+    aw, mw = membus.address_width, len(bb.mem_addr)
+
+    states = enum(
+        'idle',          # wait for the start
+        'desc',          # read a descriptor word
+        'desc_strobe',   # end of the descriptor read strobe
+        'desc_wait',     # wait for the descriptor word
+        'write',         # FIFO to memory, write burst
+        'write_wait',    # wait for the end of the burst
+        'read',          # memory to FIFO, read a word
+        'read_strobe',   # end of the read strobe
+        'read_wait',     # wait for the word, write it to the FIFO
+        'read_hold',     # wait for space in the FIFO
+        'link'           # next descriptor or the end of the transfer
+    )
+    state = Signal(states.idle)
+
+    busy, done, error = [Signal(bool(0)) for _ in range(3)]
+    to_fifo, sg = [Signal(bool(0)) for _ in range(2)]
+    addr = Signal(modbv(0)[32:])
+    remain = Signal(intbv(0)[32:])
+    stride = Signal(intbv(0)[32:])
+    nxt = Signal(intbv(0)[32:])
+    daddr = Signal(modbv(0)[32:])
+    dword = Signal(intbv(0, min=0, max=4))
+    data = Signal(intbv(0)[membus.data_width:])
+    count = Signal(modbv(0)[32:])
+    bcnt = Signal(intbv(0, min=0, max=max_burst+1))
+    tocnt = Signal(intbv(0, min=0, max=timeout+1))
+
+    control_wr = regfile.control.wr
+
+    @always_comb
+    def beh_status():
+        regfile.busy.next = busy
+        regfile.done.next = done
+        regfile.error.next = error
+        regfile.words.next = count
+        irq.next = done and regfile.irq_en == 1
+
+    @always_comb
+    def beh_fifo_read():
+        if (state == states.write and remain > 0 and bcnt < max_burst and
+                not fifobus.empty):
+            fifobus.read.next = True
+        else:
+            fifobus.read.next = False
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_dma():
+        fifobus.write.next = False
+
+        if state == states.idle:
+            if control_wr:
+                done.next = False
+                error.next = False
+                if regfile.start:
+                    busy.next = True
+                    to_fifo.next = regfile.to_fifo
+                    sg.next = regfile.sg
+                    count.next = 0
+                    bcnt.next = 0
+                    if regfile.sg:
+                        daddr.next = regfile.desc
+                        dword.next = 0
+                        state.next = states.desc
+                    else:
+                        addr.next = regfile.address
+                        remain.next = regfile.length
+                        stride.next = regfile.stride
+                        nxt.next = 0
+                        if regfile.to_fifo:
+                            state.next = states.read
+                        else:
+                            state.next = states.write
+
+        # ~~~[read the four descriptor words]~~~
+        elif state == states.desc:
+            bb.per_addr.next = daddr[aw:mw]
+            bb.mem_addr.next = daddr[mw:0]
+            bb.read.next = True
+            daddr.next = daddr + addr_step
+            state.next = states.desc_strobe
+
+        elif state == states.desc_strobe:
+            bb.read.next = False
+            data.next = bb.read_data
+            tocnt.next = 0
+            state.next = states.desc_wait
+
+        elif state == states.desc_wait:
+            if not bb.done:
+                data.next = data | bb.read_data
+                if tocnt == timeout:
+                    error.next = True
+                    state.next = states.link
+                else:
+                    tocnt.next = tocnt + 1
+            else:
+                if dword == 0:
+                    addr.next = data
+                elif dword == 1:
+                    remain.next = data
+                elif dword == 2:
+                    stride.next = data
+                else:
+                    nxt.next = data
+
+                if dword == 3:
+                    dword.next = 0
+                    if to_fifo:
+                        state.next = states.read
+                    else:
+                        state.next = states.write
+                else:
+                    dword.next = dword + 1
+                    state.next = states.desc
+
+        # ~~~[FIFO to memory]~~~
+        elif state == states.write:
+            if fifobus.read_valid:
+                bb.per_addr.next = addr[aw:mw]
+                bb.mem_addr.next = addr[mw:0]
+                bb.write_data.next = fifobus.read_data
+                bb.write.next = True
+                addr.next = addr + stride
+                remain.next = remain - 1
+                count.next = count + 1
+                bcnt.next = bcnt + 1
+            elif bcnt > 0:
+                bb.write.next = False
+                bcnt.next = 0
+                tocnt.next = 0
+                state.next = states.write_wait
+            elif remain == 0:
+                state.next = states.link
+
+        elif state == states.write_wait:
+            if bb.done:
+                state.next = states.write
+            elif tocnt == timeout:
+                error.next = True
+                state.next = states.link
+            else:
+                tocnt.next = tocnt + 1
+
+        # ~~~[memory to FIFO]~~~
+        elif state == states.read:
+            if remain == 0:
+                state.next = states.link
+            else:
+                bb.per_addr.next = addr[aw:mw]
+                bb.mem_addr.next = addr[mw:0]
+                bb.read.next = True
+                addr.next = addr + stride
+                state.next = states.read_strobe
+
+        elif state == states.read_strobe:
+            bb.read.next = False
+            data.next = bb.read_data
+            tocnt.next = 0
+            state.next = states.read_wait
+
+        elif state == states.read_wait:
+            if not bb.done:
+                data.next = data | bb.read_data
+                if tocnt == timeout:
+                    error.next = True
+                    state.next = states.link
+                else:
+                    tocnt.next = tocnt + 1
+            elif fifobus.full:
+                state.next = states.read_hold
+            else:
+                fifobus.write.next = True
+                fifobus.write_data.next = data
+                remain.next = remain - 1
+                count.next = count + 1
+                # start the next read with the FIFO write
+                if remain > 1:
+                    bb.per_addr.next = addr[aw:mw]
+                    bb.mem_addr.next = addr[mw:0]
+                    bb.read.next = True
+                    addr.next = addr + stride
+                    state.next = states.read_strobe
+                else:
+                    state.next = states.read
+
+        elif state == states.read_hold:
+            if not fifobus.full:
+                fifobus.write.next = True
+                fifobus.write_data.next = data
+                remain.next = remain - 1
+                count.next = count + 1
+                state.next = states.read
+
+        # ~~~[next descriptor or done]~~~
+        elif state == states.link:
+            if sg and nxt != 0 and not error:
+                daddr.next = nxt
+                dword.next = 0
+                state.next = states.desc
+            else:
+                busy.next = False
+                done.next = True
+                state.next = states.idle
+
+        else:
+            assert False, "Invalid state %s" % (state,)
+
+    return regfile_inst, ctl_inst, beh_status, beh_fifo_read, beh_dma
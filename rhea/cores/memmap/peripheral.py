@@ -1,69 +1,169 @@
 
 from __future__ import absolute_import
 
+from math import ceil, log
+
 import myhdl
-from myhdl import Signal, intbv, always, always_comb
-from rhea.system.memmap import MemoryMapped, MemorySpace
+from myhdl import Signal, intbv, always, always_seq, always_comb, ConcatSignal
+from rhea.system import Global
+from rhea.system.memmap import MemoryMapped, MemorySpace, Barebone
+
+
+@myhdl.block
+def memory_lane(clock, wea, bea, addra, dia, doa, web, beb, addrb, dib, dob,
+                lane=0, depth=1024):
+    """ a byte lane of a true dual-port memory (block RAM)
+
+    Each port writes the lane bits of the data when the write enable
+    and the lane byte enable are set, the read data is registered
+    (read before write).  If both ports write the same address in the
+    same clock port B is written.
+    """
+    lo = 8*lane
+    hi = lo + len(doa)
+    mem = [Signal(intbv(0)[len(doa):]) for _ in range(depth)]
+
+    @always(clock.posedge)
+    def beh_ram():
+        if wea and bea[lane]:
+            mem[addra].next = dia[hi:lo]
+        if web and beb[lane]:
+            mem[addrb].next = dib[hi:lo]
+        doa.next = mem[addra]
+        dob.next = mem[addrb]
+
+    return beh_ram
+
+
+@myhdl.block
+def memory_port(bb, per_addr, per_mask, we, addr, rdata):
+    """ the generic (Barebone) bus side of a memory port
+
+    A bus cycle starts with the `write` or `read` strobe, a write
+    burst writes a word each clock while `write` is held.  The read
+    data is registered by the memory, it is valid the clock after the
+    strobe while `done` is low.
+
+    Ports:
+      bb: the generic bus, the memory is the peripheral
+      we: output, the memory write enable
+      addr: output, the memory word address
+      rdata: the memory read data
+
+    Parameters:
+      per_addr: the peripheral address, compared to the bus `per_addr`
+        bits selected by the `per_mask`, a zero mask always matches.
+    """
+    clock, reset = bb.clock, bb.reset
+    abits = len(addr)
+    inprog, newtrans, isread = [Signal(bool(0)) for _ in range(3)]
+    hit = Signal(bool(0))
+
+    @always_comb
+    def beh_decode():
+        hit.next = (bb.per_addr & per_mask) == per_addr
+        addr.next = bb.mem_addr[abits:0]
+
+    @always_comb
+    def beh_newtrans():
+        newtrans.next = (bb.write or bb.read) and not inprog
+
+    @always_comb
+    def beh_write():
+        we.next = bb.write and ((newtrans and hit) or inprog)
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_inprog():
+        if newtrans and hit:
+            inprog.next = True
+            isread.next = bb.read
+        elif not bb.write and not bb.read:
+            # clear once the strobes are cleared, not burst writes
+            inprog.next = False
+            isread.next = False
+
+    @always_comb
+    def beh_read():
+        if inprog and isread:
+            bb.read_data.next = rdata
+        else:
+            bb.read_data.next = 0
+
+    @always_comb
+    def beh_done():
+        bb.done.next = not newtrans and not inprog
+
+    return beh_decode, beh_newtrans, beh_write, beh_inprog, beh_read, beh_done
 
 
 @myhdl.block
-def peripheral_memory(memmap, depth=32):
+def peripheral_memory(memmap, depth=32, width=None, port=None):
     """
     Example mapping a memory-mapped (csr) bus to an internal memory
     buffer.
 
+    The memory is a true dual-port memory with registered reads, the
+    synthesis tools infer a block RAM for each byte lane, the bus byte
+    enables (`byte_enable`, Wishbone `sel_i`, AXI `wstrb`) select the
+    bytes written.  The bus addresses are word addresses.  The second
+    port (`port`) is a Barebone bus, e.g. a streaming engine (`dma`),
+    to access a large buffer from the bus and the engine at the same
+    time.  The port is point-to-point, the `per_addr` is ignored.
+
     (arguments == ports)
     Arguments:
         memmap: memory-mapped interface
+        port: optional Barebone, the memory second port
 
+    Parameters:
+        depth: the number of words, rounded up to a power of two
+        width: the word width, defaults to the bus data width
     """
-    width = 32
-    mem = [Signal(intbv(0)[width:]) for _ in range(depth)]
+    assert isinstance(memmap, MemoryMapped)
+    width = memmap.data_width if width is None else width
+    assert width <= memmap.data_width
     memspace = MemorySpace()
     memmap.add(memspace)
     per_addr = memspace.base_address
     print("memmap_peripheral_memory base address {:08X}".format(per_addr))
 
-    # @todo: add MemorySpace to the memmap bus, so the memmap object
-    # @todo: knows the address space occupied by this peripheral
-    inprog = Signal(bool(0))
-    newtrans = Signal(bool(0))
-
-    assert isinstance(memmap, MemoryMapped)
     clock = memmap.clock
     mm = memmap.get_generic()
     conv_inst = memmap.map_to_generic(mm)
 
-    @always(clock.posedge)
-    def beh_write():
-        if newtrans and not inprog and mm.per_addr == per_addr:
-            if mm.write or mm.read:
-                inprog.next = True
-            if mm.write:
-                mem[mm.mem_addr].next = mm.write_data
-        elif inprog and mm.write:
-            mem[mm.mem_addr].next = mm.write_data
-        else:
-            # clear wait once other strobes are cleared, not burst writes
-            if not mm.write and not mm.read:
-                inprog.next = False
-
-    @always_comb
-    def beh_read():
-        if mm.per_addr == per_addr and not mm.done:
-            mm.read_data.next = mem[mm.mem_addr]
-        else:
-            mm.read_data.next = 0
-
-    @always_comb
-    def beh_newtrans():
-        newtrans.next = (mm.write or mm.read) and not inprog
-
-    @always_comb
-    def beh_done():
-        mm.done.next = not newtrans and not inprog
-
-    return conv_inst, beh_write, beh_read, beh_newtrans, beh_done
+    if port is None:
+        # the second port is not used
+        port = Barebone(Global(memmap.clock, memmap.reset),
+                        data_width=memmap.data_width,
+                        address_width=memmap.address_width)
+    assert isinstance(port, Barebone)
+    assert width <= port.data_width
+
+    # the memory word address bits
+    abits = max(1, int(ceil(log(max(depth, 2), 2))))
+    abits = min(abits, len(mm.mem_addr), len(port.mem_addr))
+    depth = 2**abits
+
+    wea, web = Signal(bool(0)), Signal(bool(0))
+    addra, addrb = Signal(intbv(0)[abits:]), Signal(intbv(0)[abits:])
+
+    # a memory for each byte lane, the last lane can be narrower
+    nlanes = int(ceil(width/8.))
+    doa = [Signal(intbv(0)[min(8, width-8*ii):]) for ii in range(nlanes)]
+    dob = [Signal(intbv(0)[min(8, width-8*ii):]) for ii in range(nlanes)]
+    lane_insts = [memory_lane(clock, wea, mm.byte_enable, addra,
+                              mm.write_data, doa[ii], web, port.byte_enable,
+                              addrb, port.write_data, dob[ii],
+                              lane=ii, depth=depth)
+                  for ii in range(nlanes)]
+    rdata_a = ConcatSignal(*reversed(doa)) if nlanes > 1 else doa[0]
+    rdata_b = ConcatSignal(*reversed(dob)) if nlanes > 1 else dob[0]
+
+    pwidth = len(mm.per_addr)
+    porta_inst = memory_port(mm, per_addr, 2**pwidth-1, wea, addra, rdata_a)
+    portb_inst = memory_port(port, 0, 0, web, addrb, rdata_b)
+
+    return conv_inst, lane_insts, porta_inst, portb_inst
 
 
 @myhdl.block
@@ -23,6 +23,7 @@ class SDRAMInterface(object):
 
     addr_width = 12   # SDRAM address width
     data_width = 16   # SDRAM data width
+    col_width = 9     # SDRAM column address width
 
     def __init__(self, num_banks=4, addr_width=12, data_width=16, ver='sdr'):
 
@@ -79,11 +80,20 @@ class SDRAMInterface(object):
             cycles[k] = (v * (self.clock_frequency / 1e9))
             # @todo: if 'ddr' in self.ver: cycles[k] *= 2
 
-        # add the cycle numbers to the
+        # add the cycle numbers to the interface
         for k, v in cycles.items():
-            # majority of the timing parameters are maximum times,
-            # floor error on the side of margin ...
-            self.__dict__['cyc_'+k] = int(floor(v))
+            if k == 'ref':
+                # the refresh interval is a maximum time,
+                # floor error on the side of margin ...
+                self.__dict__['cyc_'+k] = int(floor(v))
+            else:
+                # the other parameters are minimum times, ceil
+                self.__dict__['cyc_'+k] = int(ceil(v - 1e-9))
+
+        # the mode register settings, the transactors use these and
+        # `load_mode` sets them (and the device mode register).
+        self.cas_latency = 1
+        self.burst_length = 1
 
         # convert the time parameters to simulation ticks
         # @todo: where to get the global simulation step?
@@ -109,7 +119,7 @@ class SDRAMInterface(object):
           L   L    H    H   X    : ACT
           L   L    H    L   X    : PRE
           L   L    L    H   X    : REF  (auto refresh)
-          L   L    L    L   X    : LRM  (load mode register)
+          L   L    L    L   X    : LMR  (load mode register)
         :return:
         """
         cs, ras, cas, we, dqm = (self.cs, self.ras, self.cas,
@@ -127,86 +137,175 @@ class SDRAMInterface(object):
             elif not ras and not cas and we:
                 cmd = self.Commands.REF
             elif not ras and not cas and not we:
-                cmd = self.Commands.LRM
+                cmd = self.Commands.LMR
         return cmd
 
     def _set_cmd(self, cmd):
-        pass
+        """ set the command signals (cs, ras, cas, we), see `get_command` """
+        Commands = self.Commands
+        cs, ras, cas, we = {
+            Commands.NOP: (False, True, True, True),
+            Commands.RD: (False, True, False, True),
+            Commands.WR: (False, True, False, False),
+            Commands.ACT: (False, False, True, True),
+            Commands.PRE: (False, False, True, False),
+            Commands.REF: (False, False, False, True),
+            Commands.LMR: (False, False, False, False),
+        }[cmd]
+        self.cs.next = cs
+        self.ras.next = ras
+        self.cas.next = cas
+        self.we.next = we
 
-    def _nop(self):
-        self.cs.next = False
-        self.ras.next = True
-        self.cas.next = True
-        self.we.next = True
-        yield self.clk.posedge
+    def _nop(self, num=1):
+        self._set_cmd(self.Commands.NOP)
+        for _ in range(num):
+            yield self.clk.posedge
 
     def _activate(self, row_addr):
         self.addr.next = row_addr
-        self.cs.next = False
-        self.ras.next = False
-        self.cas.next = True
-        self.we.next = True
+        self._set_cmd(self.Commands.ACT)
         yield self.clk.posedge
 
-    def _write(self, addr, val):
-        self.addr.next = addr
-        self.wdq.next = val     # transaction bus only
-        self.dqo.next = val     # host side driver (controller)
-        self.cs.next = False
-        self.ras.next = True
-        self.cas.next = False
-        self.we.next = False
+    def _precharge(self, all_banks=False):
+        self.addr.next = (1 << 10) if all_banks else 0
+        self._set_cmd(self.Commands.PRE)
         yield self.clk.posedge
+
+    def _write(self, addr, vals):
+        """ write command followed by the write burst data """
+        self.addr.next = addr
+        self._set_cmd(self.Commands.WR)
+        for val in vals:
+            self.wdq.next = val     # transaction bus only
+            self.dqo.next = val     # host side driver (controller)
+            yield self.clk.posedge
+            self._set_cmd(self.Commands.NOP)
         self.dqo.next = None
 
     def _read(self, addr):
         self.addr.next = addr
-        self.cs.next = False
-        self.ras.next = True
-        self.cas.next = False
-        self.we.next = True
+        self._set_cmd(self.Commands.RD)
         yield self.clk.posedge
-        if self.dq is not None and self.dqo is None:
-            self.rdq.next = self.dq
+        self._set_cmd(self.Commands.NOP)
+
+    def _close_row(self, num_cycles):
+        """ precharge the bank `num_cycles` after the row activate """
+        if num_cycles < self.cyc_ras:
+            yield self._nop(self.cyc_ras - num_cycles)
+        yield self._precharge()
+        yield self._nop(self.cyc_rp)
 
-    def write(self, val, row_addr, col_addr, bankid=0, burst=1):
+    def write(self, val, row_addr, col_addr, bankid=0, burst=None):
         """ Controller side write
         This is a transaction generator, this generator is used to
-        emulate a host write to an SDRAM device.
+        emulate a host write to an SDRAM device.  The row is activated,
+        the data is written and the bank is precharged (closed), the
+        SDRAM timing parameters are met.
+
+        Arguments:
+            val: the write data, a list of values for a burst write
+            row_addr (int): the row address
+            col_addr (int): the column address
+            bankid (int): the bank
+            burst (int): the number of beats, defaults to the
+                programmed burst length (`load_mode`).
 
-        @todo: complete burst transaction
         Not convertible.
         """
+        burst = self.burst_length if burst is None else burst
+        vals = list(val) if burst > 1 else [val]
+        assert len(vals) == burst
+
         # start on the posedge of the interface clock
         yield self.clk.posedge
         self.bs.next = bankid
         self.cke.next = True
         yield self._nop()
         yield self._activate(row_addr)
-        yield self._nop()
-        yield self._write(col_addr, val)
-        yield self._nop()
+        yield self._nop(self.cyc_rcd-1)
+        yield self._write(col_addr, vals)
+        # write recovery from the last data to the precharge
+        yield self._nop(self.cyc_wr-1)
+        yield self._close_row(self.cyc_rcd + burst-1 + self.cyc_wr)
         self.cke.next = False
 
-    def read(self, row_addr, col_addr, bankid=0, burst=1):
+    def read(self, row_addr, col_addr, bankid=0, burst=None):
         """ Controller side read
         This is a transaction generator, this generator is used to
-        emulate a host read to an SDRAM device.
+        emulate a host read to an SDRAM device.  The read data is
+        captured after the CAS latency (`load_mode`).
+
+        Arguments:
+            row_addr (int): the row address
+            col_addr (int): the column address
+            bankid (int): the bank
+            burst (int): the number of beats, defaults to the
+                programmed burst length.  A burst read saves a list
+                of values.
 
-        @todo: complete burst transaction
         Not convertible.
         """
+        burst = self.burst_length if burst is None else burst
+
         # start of the posedge of the interface clock
         yield self.clk.posedge
         self.bs.next = bankid
         self.cke.next = True
         yield self._nop()
         yield self._activate(row_addr)
-        yield self._nop()
+        yield self._nop(self.cyc_rcd-1)
         yield self._read(col_addr)
+        data = []
+        for ii in range(self.cas_latency + burst - 1):
+            yield self.clk.posedge
+            if ii >= self.cas_latency - 1:
+                data.append(int(self.rdq))
+        yield self._close_row(self.cyc_rcd + self.cas_latency + burst)
+        self.cke.next = False
+        self.read_data = data if burst > 1 else data[0]
+
+    def load_mode(self, cas_latency=2, burst_length=1,
+                  interleave=False, single_write=False):
+        """ Controller side load mode register
+        All the banks need to be precharged (idle).
+
+        Arguments:
+            cas_latency (int): the read latency in clock cycles
+            burst_length (int): 1, 2, 4, 8 or 'page'
+            interleave (bool): interleaved burst addressing
+            single_write (bool): single location write bursts
+
+        Not convertible.
+        """
+        codes = {1: 0, 2: 1, 4: 2, 8: 3, 'page': 7}
+        mode = (codes[burst_length] | (int(interleave) << 3) |
+                (cas_latency << 4) | (int(single_write) << 9))
+
+        yield self.clk.posedge
+        self.cke.next = True
+        yield self._nop()
+        self.addr.next = mode
+        self._set_cmd(self.Commands.LMR)
+        yield self.clk.posedge
+        yield self._nop(2)    # load mode to command time (tMRD)
+        self.cke.next = False
+        self.cas_latency = cas_latency
+        self.burst_length = (2**self.col_width if burst_length == 'page'
+                             else burst_length)
+
+    def refresh(self):
+        """ Controller side auto refresh, all the banks need to be idle
+
+        Not convertible.
+        """
+        yield self.clk.posedge
+        self.cke.next = True
         yield self._nop()
+        self._set_cmd(self.Commands.REF)
+        yield self.clk.posedge
+        yield self._nop(self.cyc_rfc)
         self.cke.next = False
-        self.read_data = int(self.rdq)
 
     def get_read_data(self):
         return self.read_data
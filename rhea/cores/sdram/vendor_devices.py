@@ -18,3 +18,4 @@ class Winboad_W9812G6JH_75(SDRAMInterface):
     
     addr_width = 12   # SDRAM address width
     data_width = 16   # SDRAM data width
+    col_width = 9     # SDRAM column address width
@@ -96,7 +96,6 @@ def spi_controller(
 
     # FIFO for the wishbone data transfer
     if include_fifo:
-        fifo_fast.debug = spi_controller.debug
         fifo_tx_inst = fifo_fast(glbl, fifobus=itx, size=fifosize)
         fifo_rx_inst = fifo_fast(glbl, fifobus=irx, size=fifosize)
 
@@ -2,14 +2,22 @@
 from __future__ import print_function
 
 from random import shuffle
+from collections import deque
 from myhdl import *
 
 
 class FIFO(object):
     """
     FIFO interface and model.
+
+    The FIFO occupancy is traced, with `trace=True` each change of the
+    occupancy is recorded as a (simulation time, count) tuple in
+    `trace`, the high-water mark (`max_count`) and the number of
+    writes dropped because the FIFO was full (`overflows`) are always
+    kept.
     """
-    def __init__(self, depth=16, width=16, clock_read=None, clock_write=None):
+    def __init__(self, depth=16, width=16, clock_read=None, clock_write=None,
+                 trace=False):
         self.depth = depth
         self.clock_write = clock_write
         self.clock_read = clock_read
@@ -22,7 +30,10 @@ class FIFO(object):
         self.data_valid = Signal(bool(0))       # data out is valid
 
         # modeling only
-        self._fifo = []
+        self._fifo = deque(maxlen=depth)
+        self.trace = [] if trace else None
+        self.max_count = 0
+        self.overflows = 0
 
     def __str__(self):
         s = "full: {}, empty: {}, count: {}".format(self.full, self.empty, len(self._fifo))
@@ -33,6 +44,12 @@ class FIFO(object):
         return len(self._fifo)
 
     def _update_flags(self):
+        count = len(self._fifo)
+        self.max_count = max(self.max_count, count)
+        if self.trace is not None:
+            if len(self.trace) == 0 or self.trace[-1][1] != count:
+                self.trace.append((now(), count))
+
         if len(self._fifo) >= self.depth:
             self.full.next = True
         else:
@@ -52,7 +69,24 @@ class FIFO(object):
         """
         if len(self._fifo) < self.depth:
             self._fifo.append(obj)
+        else:
+            self.overflows += 1
+        self._update_flags()
+
+    def write_many(self, objs):
+        """ write a sequence to the FIFO (model)
+        :param objs: the items to push onto the FIFO
+        :return: the number of items written, the items that do not
+            fit are dropped
+
+        not convertible
+        """
+        objs = list(objs)
+        num = min(len(objs), self.depth - len(self._fifo))
+        self._fifo.extend(objs[:num])
+        self.overflows += len(objs) - num
         self._update_flags()
+        return num
 
     def read(self):
         """ read from the FIFO (model)
@@ -63,10 +97,22 @@ class FIFO(object):
         """
         obj = None
         if len(self._fifo) > 0:
-            obj = self._fifo.pop(0)
+            obj = self._fifo.popleft()
         self._update_flags()
         return obj
 
+    def read_many(self, num=None):
+        """ read from the FIFO (model)
+        :param num: the max number of items to read, all if None
+        :return: a list of the items read
+
+        not convertible
+        """
+        num = len(self._fifo) if num is None else min(num, len(self._fifo))
+        objs = [self._fifo.popleft() for _ in range(num)]
+        self._update_flags()
+        return objs
+
     def is_empty(self):
         return len(self._fifo) == 0
 
@@ -76,4 +122,18 @@ class FIFO(object):
     def shuffle(self):
         shuffle(self._fifo)
 
-
+    def full_intervals(self):
+        """ the (start, end) simulation times the FIFO was full, from
+        the occupancy trace, the end is None if the FIFO is full.
+        """
+        assert self.trace is not None, "the FIFO is not traced"
+        intervals, start = [], None
+        for time, count in self.trace:
+            if count >= self.depth and start is None:
+                start = time
+            elif count < self.depth and start is not None:
+                intervals.append((start, time))
+                start = None
+        if start is not None:
+            intervals.append((start, None))
+        return intervals
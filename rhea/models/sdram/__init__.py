@@ -1,3 +1,4 @@
 
-from .sdram_model import SDRAMModel
+from .sdram_memory import PagedMemory
+from .sdram_model import SDRAMModel, SDRAMTimingError
 from .sdram_controller_model import sdram_controller_model
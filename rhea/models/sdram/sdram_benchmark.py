@@ -0,0 +1,260 @@
+"""
+SDRAM controller bandwidth and latency benchmark.
+
+The benchmark drives an SDRAM controller through its internal
+(memory-mapped) bus with different traffic patterns and measures the
+achieved bandwidth, the access latency and the refresh overhead.  The
+external SDRAM is the `SDRAMModel`, the model checks the SDRAM timing
+and counts the row hits and misses.
+
+Traffic patterns:
+    sequential: write then read consecutive addresses
+    strided: write then read with an address stride (default one
+        row), every access opens a new row.
+    random: write then read random addresses
+    mixed: random reads and writes interleaved
+
+Usage::
+
+    python -m rhea.models.sdram.sdram_benchmark --num 500 \
+        --output output/sdram_bench/results.json
+
+The results are printed and saved as JSON to track the controller
+performance between revisions.
+
+Not convertible.
+"""
+
+from __future__ import print_function, division
+
+import os
+import sys
+import json
+import argparse
+from random import Random
+
+import myhdl
+from myhdl import instance, always, delay, now, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Wishbone
+from rhea.cores.sdram import SDRAMInterface
+from rhea.utils.test import run_testbench, tb_default_args
+
+from .sdram_model import SDRAMModel
+from .sdram_controller_model import sdram_controller_model
+
+
+patterns = ('sequential', 'strided', 'random', 'mixed')
+
+
+def _get_accesses(pattern, num, max_addr, stride, rng):
+    """ the (write, address) accesses for a traffic pattern """
+    if pattern == 'sequential':
+        addrs = [ii % max_addr for ii in range(num)]
+    elif pattern == 'strided':
+        # a stride that is not a multiple of the address space
+        # wraps to a different row and column
+        addrs = [(ii*stride + (ii*stride) // max_addr) % max_addr
+                 for ii in range(num)]
+    elif pattern in ('random', 'mixed'):
+        addrs = [rng.randrange(max_addr) for _ in range(num)]
+    else:
+        raise ValueError("invalid traffic pattern {}".format(pattern))
+
+    if pattern == 'mixed':
+        # read an address after it has been written
+        accesses, written = [], []
+        for addr in addrs:
+            if len(written) > 0 and rng.random() < 0.5:
+                accesses.append((False, rng.choice(written)))
+            else:
+                accesses.append((True, addr))
+                written.append(addr)
+        return accesses
+
+    return [(True, addr) for addr in addrs] + [(False, addr) for addr in addrs]
+
+
+def _latency_stats(latencies):
+    if len(latencies) == 0:
+        return dict(num=0, avg=0., p99=0, max=0)
+    lat = sorted(latencies)
+    p99 = lat[min(len(lat)-1, int(0.99 * len(lat)))]
+    return dict(num=len(lat), avg=sum(lat) / len(lat), p99=p99, max=lat[-1])
+
+
+def sdram_benchmark(patterns=patterns, num=200, controller=None,
+                    stride=None, seed=7, filename=None, args=None):
+    """ run the SDRAM traffic patterns and collect the statistics
+
+    Arguments:
+        patterns (list): the traffic patterns to run
+        num (int): the number of addresses (accesses) per pattern
+        controller (callable): the controller under test, a myhdl
+            block with the (sdram_intf, internal_intf) arguments,
+            defaults to the `sdram_controller_model`.
+        stride (int): the strided pattern address stride, defaults
+            to one row.
+        seed (int): the random seed, the benchmark is repeatable
+        filename (str): save the results to a JSON file
+        args (Namespace): testbench arguments (trace)
+
+    Returns:
+        A dict with the configuration and the results for each
+        pattern.
+    """
+    args = tb_default_args(args)
+    controller = sdram_controller_model if controller is None else controller
+    rng = Random(seed)
+
+    # internal clock
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=0, isasync=False)
+    # sdram clock
+    clock_sdram = Clock(0, frequency=100e6)
+
+    glbl = Global(clock=clock, reset=reset)
+    ixbus = Wishbone(glbl=glbl, data_width=32, address_width=32)
+    ixbus.timeout = 10000
+    exbus = SDRAMInterface()
+    exbus.clk = clock_sdram
+
+    sdram = SDRAMModel(exbus)
+    max_addr = sdram.bank_size
+    stride = 2**exbus.col_width if stride is None else stride
+    max_data = 2**exbus.data_width
+    nbytes = exbus.data_width // 8
+
+    results = []
+
+    @myhdl.block
+    def bench_sdram_benchmark():
+        tbdut = controller(exbus, ixbus)
+        tbmdl = sdram.process()
+        tbclk = clock.gen(hticks=10*1000)
+        tbclk_sdram = clock_sdram.gen(hticks=5*1000)
+
+        # internal bus clock cycle count
+        cycles = [0]
+
+        @always(clock.posedge)
+        def tbcnt():
+            cycles[0] += 1
+
+        @instance
+        def tbstim():
+            reset.next = reset.active
+            yield delay(18000)
+            reset.next = not reset.active
+            yield clock.posedge
+
+            for pattern in patterns:
+                accesses = _get_accesses(pattern, num, max_addr, stride, rng)
+                latency = {True: [], False: []}
+                expected, errors = {}, 0
+                start_counters = dict(sdram.counters)
+                start_time = now()
+
+                for write, addr in accesses:
+                    cstart = cycles[0]
+                    if write:
+                        data = rng.randrange(max_data)
+                        yield ixbus.writetrans(addr, data)
+                        expected[addr] = data
+                    else:
+                        yield ixbus.readtrans(addr)
+                        if ixbus.get_read_data() != expected.get(addr):
+                            errors += 1
+                    latency[write].append(cycles[0] - cstart)
+
+                sim_time = now() - start_time
+                counters = {kk: vv - start_counters[kk]
+                            for kk, vv in sdram.counters.items()}
+                num_acc = len(accesses)
+                seconds = sim_time * 1e-12   # timescale 1ps
+                accesses_rw = counters['reads'] + counters['writes']
+                results.append(dict(
+                    pattern=pattern,
+                    accesses=num_acc,
+                    writes=len(latency[True]),
+                    reads=len(latency[False]),
+                    errors=errors,
+                    sim_time=sim_time,
+                    mb_per_s=num_acc * nbytes / seconds / 1e6,
+                    write_latency=_latency_stats(latency[True]),
+                    read_latency=_latency_stats(latency[False]),
+                    refresh_stall_fraction=(counters['refresh_cycles'] /
+                                            counters['cycles']),
+                    row_hit_rate=(counters['row_hits'] / accesses_rw
+                                  if accesses_rw > 0 else 0.),
+                    sdram=counters,
+                ))
+
+            raise StopSimulation
+
+        return myhdl.instances()
+
+    run_testbench(bench_sdram_benchmark, timescale='1ps', args=args)
+
+    summary = dict(
+        controller=controller.__name__,
+        clock_frequency=clock.frequency,
+        sdram_clock_frequency=clock_sdram.frequency,
+        timing=dict(exbus.timing),
+        num=num, seed=seed,
+        violations=list(sdram.violations),
+        results=results,
+    )
+
+    if filename is not None:
+        dr = os.path.dirname(filename)
+        if dr != '' and not os.path.isdir(dr):
+            os.makedirs(dr)
+        with open(filename, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    return summary
+
+
+def print_results(summary):
+    print("SDRAM benchmark, controller {}, {} accesses per pattern".format(
+        summary['controller'], summary['num']))
+    print("{:<12s} {:>9s} {:>10s} {:>10s} {:>10s} {:>10s} {:>9s} {:>7s}"
+          .format("pattern", "MB/s", "wr avg", "wr p99", "rd avg",
+                  "rd p99", "refresh", "errors"))
+    for rr in summary['results']:
+        wl, rl = rr['write_latency'], rr['read_latency']
+        print("{:<12s} {:>9.2f} {:>10.1f} {:>10d} {:>10.1f} {:>10d} "
+              "{:>8.2f}% {:>7d}".format(
+                  rr['pattern'], rr['mb_per_s'], wl['avg'], wl['p99'],
+                  rl['avg'], rl['p99'], 100*rr['refresh_stall_fraction'],
+                  rr['errors']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="SDRAM controller bandwidth and latency benchmark")
+    parser.add_argument('--num', type=int, default=200,
+                        help="number of accesses per pattern")
+    parser.add_argument('--patterns', nargs='+', default=list(patterns),
+                        choices=patterns, help="traffic patterns")
+    parser.add_argument('--stride', type=int, default=None,
+                        help="strided pattern stride (default one row)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default='output/sdram_bench/results.json',
+                        help="JSON results file")
+    parser.add_argument('--trace', action='store_true',
+                        help="enable VCD tracing")
+    args = parser.parse_args(argv)
+
+    summary = sdram_benchmark(patterns=args.patterns, num=args.num,
+                              stride=args.stride, seed=args.seed,
+                              filename=args.output, args=args)
+    print_results(summary)
+    failed = [rr for rr in summary['results'] if rr['errors'] > 0]
+    return 1 if len(failed) > 0 or len(summary['violations']) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
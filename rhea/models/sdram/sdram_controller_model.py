@@ -2,18 +2,20 @@
 from __future__ import print_function
 
 import myhdl
-from myhdl import instance
+from myhdl import Signal, instance
 
 from rhea.cores.sdram import SDRAMInterface
 from rhea.system import MemoryMapped
 
 
 @myhdl.block
-def sdram_controller_model(sdram_intf, internal_intf):
+def sdram_controller_model(sdram_intf, internal_intf, refresh=True):
     """ Model the transaction between the internal bus and external SDRAM
 
     :param sdram_intf: Interface to the SDRAM device
     :param internal_intf: Internal interface
+    :param refresh: issue the periodic auto refresh, one refresh
+        per row every refresh interval (tREF).
     :return: myhdl generators
 
     Not convertible.
@@ -24,9 +26,15 @@ def sdram_controller_model(sdram_intf, internal_intf):
     # short-cuts
     ix, ex = internal_intf, sdram_intf
 
+    # the average refresh interval (tREFI) in SDRAM clock cycles
+    refresh_interval = ex.cyc_ref // 2**ex.addr_width
+    refresh_req = Signal(bool(0))
+    refresh_ack = Signal(bool(0))
+
     def translate_address(addr):
-        #@todo: add correct translation
-        row_addr, col_addr = 0, addr
+        # @todo: add the bank to the translation
+        row_addr = addr >> ex.col_width
+        col_addr = addr & (2**ex.col_width - 1)
         return row_addr, col_addr
 
     @instance
@@ -40,6 +48,13 @@ def sdram_controller_model(sdram_intf, internal_intf):
         """
 
         while True:
+            # refresh between the bus transactions, the banks are idle
+            if refresh_req:
+                yield ex.refresh()
+                refresh_ack.next = True
+                yield ex.clk.posedge
+                refresh_ack.next = False
+
             addr = ix.get_address()
             row_addr, col_addr = translate_address(addr)
             if ix.is_write:
@@ -53,4 +68,16 @@ def sdram_controller_model(sdram_intf, internal_intf):
 
             yield ix.clock.posedge
 
-    return mproc
+    @instance
+    def refresh_timer():
+        count = 0
+        while True:
+            yield ex.clk.posedge
+            if refresh_ack:
+                refresh_req.next = False
+            count += 1
+            if refresh and count >= refresh_interval:
+                refresh_req.next = True
+                count = 0
+
+    return mproc, refresh_timer
@@ -0,0 +1,171 @@
+from __future__ import print_function, division
+
+import os
+
+import numpy as np
+
+
+def _get_dtype(data_width):
+    """ the smallest unsigned numpy type for the data width """
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if data_width <= np.dtype(dtype).itemsize * 8:
+            return np.dtype(dtype)
+    raise ValueError("data width {} not supported, max 64".format(data_width))
+
+
+class PagedMemory(object):
+    def __init__(self, size, data_width=16, page_size=4096,
+                 filename=None, offset=0):
+        """ Sparse, paged memory storage for the memory models
+
+        The memory is split into fixed size pages, a page (numpy array)
+        is only allocated when it is first written.  Reads of memory
+        that has not been written return zero.  The memory can be
+        backed by a (sparse) memory-mapped file, this is used to
+        pre-load a large memory image and to inspect the memory after
+        the simulation.
+
+        Arguments:
+            size (int): the number of words in the memory
+            data_width (int): the word width in bits
+            page_size (int): the number of words in a page
+            filename (str): back the memory with a memory-mapped file,
+                the file is created (or extended) if needed.
+            offset (int): the byte offset of the memory in the file,
+                multiple memories (e.g. SDRAM banks) can share a file.
+
+        The memory supports the dict access the models use::
+
+            mem[addr] = data
+            data = mem[addr]
+            data = mem.get(addr, 0)
+
+        Not convertible.
+        """
+        self.size = size
+        self.data_width = data_width
+        self.page_size = page_size
+        self.dtype = _get_dtype(data_width)
+        self.filename = filename
+        self._mask = (1 << data_width) - 1
+        self._pages = {}
+        self._mm = None
+
+        if filename is not None:
+            nbytes = offset + size * self.dtype.itemsize
+            mode = 'r+b' if os.path.isfile(filename) else 'w+b'
+            with open(filename, mode) as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() < nbytes:
+                    f.truncate(nbytes)   # sparse, not written to disk
+            self._mm = np.memmap(filename, dtype=self.dtype, mode='r+',
+                                 offset=offset, shape=(size,))
+
+    def __str__(self):
+        return "PagedMemory {} words, {} of {} pages".format(
+            self.size, self.num_pages, -(-self.size // self.page_size))
+
+    @property
+    def num_pages(self):
+        """ the number of pages allocated (touched) """
+        return len(self._pages)
+
+    def _check_address(self, addr):
+        if addr < 0 or addr >= self.size:
+            raise IndexError("address {:#x} out of range, memory size {:#x}"
+                             .format(addr, self.size))
+
+    def _get_page(self, pidx, create=False):
+        page = self._pages.get(pidx)
+        if page is None and (create or self._mm is not None):
+            if self._mm is not None:
+                start = pidx * self.page_size
+                page = self._mm[start:start+self.page_size]
+            else:
+                page = np.zeros(self.page_size, dtype=self.dtype)
+            self._pages[pidx] = page
+        return page
+
+    def __getitem__(self, addr):
+        self._check_address(addr)
+        page = self._get_page(addr // self.page_size)
+        if page is None:
+            return 0
+        return int(page[addr % self.page_size])
+
+    def __setitem__(self, addr, data):
+        self._check_address(addr)
+        page = self._get_page(addr // self.page_size, create=True)
+        page[addr % self.page_size] = int(data) & self._mask
+
+    def __contains__(self, addr):
+        return 0 <= addr < self.size
+
+    def get(self, addr, default=0):
+        if addr not in self:
+            return default
+        return self[addr]
+
+    def load_image(self, image, address=0):
+        """ bulk write a memory image without simulating the writes
+
+        Arguments:
+            image: a sequence of words (list, numpy array) or a
+                binary file name, the file contains the words in the
+                native byte order of the memory data type.
+            address (int): the start (word) address
+        """
+        if isinstance(image, str):
+            image = np.fromfile(image, dtype=self.dtype)
+        image = np.asarray(image)
+        if len(image) > 0:
+            self._check_address(address)
+            self._check_address(address + len(image) - 1)
+        image = image.astype(self.dtype) & self.dtype.type(self._mask)
+
+        ps, ii = self.page_size, 0
+        while ii < len(image):
+            addr = address + ii
+            pidx, poff = divmod(addr, ps)
+            num = min(ps - poff, len(image) - ii)
+            page = self._get_page(pidx, create=True)
+            page[poff:poff+num] = image[ii:ii+num]
+            ii += num
+
+    def dump_image(self, address=0, length=None, filename=None):
+        """ bulk read the memory
+
+        Arguments:
+            address (int): the start (word) address
+            length (int): the number of words, default to the end of
+                the memory.
+            filename (str): also save the image to a binary file
+
+        Returns:
+            A numpy array with the memory contents.
+        """
+        if length is None:
+            length = self.size - address
+        image = np.zeros(length, dtype=self.dtype)
+        if length > 0:
+            self._check_address(address)
+            self._check_address(address + length - 1)
+
+        ps, ii = self.page_size, 0
+        while ii < length:
+            addr = address + ii
+            pidx, poff = divmod(addr, ps)
+            num = min(ps - poff, length - ii)
+            page = self._get_page(pidx)
+            if page is not None:
+                image[ii:ii+num] = page[poff:poff+num]
+            ii += num
+
+        if filename is not None:
+            image.tofile(filename)
+        return image
+
+    def flush(self):
+        """ write the changes to a memory-mapped file """
+        if self._mm is not None:
+            self._mm.flush()
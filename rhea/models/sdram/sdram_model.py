@@ -2,15 +2,38 @@
 from __future__ import print_function, division
 
 from math import ceil, floor
+
+import numpy as np
 import myhdl
 from myhdl import Signal, intbv, enum, instance, always_comb
 
 from rhea import Signals
 from rhea.cores.sdram import SDRAMInterface
+from .sdram_memory import PagedMemory, _get_dtype
+
+
+class SDRAMTimingError(ValueError):
+    """ an SDRAM command violates the bank state or timing """
+    pass
+
+
+class _BankState(object):
+    __slots__ = ('row', 'accessed', 'act_cyc', 'pre_cyc', 'wr_cyc',
+                 'auto_pre')
+
+    def __init__(self):
+        """ the open row state of an SDRAM bank """
+        self.row = None          # the open (active) row, None if idle
+        self.accessed = False    # the open row has been read / written
+        self.act_cyc = -2**31    # cycle of the last activate
+        self.pre_cyc = -2**31    # cycle of the last precharge
+        self.wr_cyc = -2**31     # cycle of the last write data
+        self.auto_pre = None     # cycle of a pending auto precharge
 
 
 class SDRAMModel(object):
-    def __init__(self, intf):
+    def __init__(self, intf, banks=None, page_size=4096, filename=None,
+                 strict=True):
         """ SDRAM Model
         This will model the behavior and cycle accurate interface to
         an SDRAM device.
@@ -20,6 +43,19 @@ class SDRAMModel(object):
             sdram_model = SDRAMModel(extmembus)   # model
             sdram_proc = sdram_model.process()    # send to simulator
 
+        Arguments:
+            intf (SDRAMInterface): the external SDRAM interface
+            banks (list): the storage for each bank, any object with
+                dict like access (e.g. `dict` or `PagedMemory`), by
+                default each bank is a sparse `PagedMemory`.
+            page_size (int): the `PagedMemory` page size (words)
+            filename (str): back the memory with a memory-mapped
+                file, the banks are stored one after another in the
+                file.  Use this to pre-load a large device image and
+                inspect the memory after the simulation.
+            strict (bool): raise an `SDRAMTimingError` on a timing
+                violation, otherwise the violations are saved.
+
         This model implements the functionality described in the Micron
         datasheet for a 256Mb device:
         http://www.micron.com/parts/dram/sdram/mt48lc16m16a2b4-6a-it?pc=%7B5144650B-31FA-410A-993E-BADF981C54DD%7D
@@ -32,17 +68,153 @@ class SDRAMModel(object):
         # also contains the SDRAM timing parameters.
         self.intf = intf
 
-        # emulate banks in an SDRAM
-        self.banks = [{} for _ in range(intf.num_banks)]
+        # emulate banks in an SDRAM, a bank is a (rows x columns) array
+        # of words, pages of the bank are allocated when touched.
+        self.bank_size = 2**(intf.addr_width + intf.col_width)
+        self.dtype = _get_dtype(intf.data_width)
+        if banks is None:
+            nbytes = self.bank_size * self.dtype.itemsize
+            banks = [PagedMemory(self.bank_size, intf.data_width,
+                                 page_size=page_size, filename=filename,
+                                 offset=ii*nbytes)
+                     for ii in range(intf.num_banks)]
+        assert len(banks) == intf.num_banks
+        self.banks = banks
 
         # typically DRAM is defined using states (@todo add reference)
         self.States = enum("IDLE", "ACTIVE")
         self.Commands = intf.Commands
 
+        # the open row state of each bank and the mode register, the
+        # device defaults (no load mode) are a single word burst and
+        # a CAS latency of one.
+        self.bank_states = [_BankState() for _ in range(intf.num_banks)]
+        self.cas_latency = 1
+        self.burst_length = 1
+        self.interleave = False
+        self.single_write = False
+
+        self.strict = strict
+        self.violations = []
+        self.counters = dict(
+            cycles=0,          # total clock cycles
+            data_cycles=0,     # cycles with data on the bus
+            idle_cycles=0,     # no command and no data
+            active_cycles=0,   # cycles with a bank active (summed)
+            refresh_cycles=0,  # cycles the device is refreshing (tRFC)
+            activates=0, precharges=0, refreshes=0,
+            reads=0, writes=0,
+            row_hits=0,        # read/write to an already accessed row
+            row_misses=0,      # first read/write after an activate
+        )
+
+    def load_image(self, image, address=0):
+        """ bulk load a device image without simulating the writes
+
+        Arguments:
+            image: a sequence of words (list, numpy array) or a binary
+                file name.
+            address (int): the device word address, the device address
+                is the bank address followed by the address in the
+                bank, an image can span multiple banks.
+
+        The bulk load and dump require `PagedMemory` banks.
+        """
+        if isinstance(image, str):
+            image = np.fromfile(image, dtype=self.dtype)
+        ii = 0
+        while ii < len(image):
+            bank, addr = divmod(address + ii, self.bank_size)
+            num = min(self.bank_size - addr, len(image) - ii)
+            self.banks[bank].load_image(image[ii:ii+num], addr)
+            ii += num
+
+    def dump_image(self, address=0, length=None, filename=None):
+        """ bulk read the device memory, see `load_image`
+
+        Returns:
+            A numpy array with the memory contents.
+        """
+        if length is None:
+            length = self.bank_size * len(self.banks) - address
+        images, ii = [], 0
+        while ii < length:
+            bank, addr = divmod(address + ii, self.bank_size)
+            num = min(self.bank_size - addr, length - ii)
+            images.append(self.banks[bank].dump_image(addr, num))
+            ii += num
+        image = np.zeros(0, self.dtype)
+        if len(images) > 0:
+            image = np.concatenate(images)
+        if filename is not None:
+            image.tofile(filename)
+        return image
+
+    def flush(self):
+        """ write the changes to the memory-mapped file """
+        for bank in self.banks:
+            if isinstance(bank, PagedMemory):
+                bank.flush()
+
+    def _violation(self, msg):
+        """ a timing or state violation, raise or count """
+        msg = "[SDRAM] {} (cycle {})".format(msg, self.counters['cycles'])
+        self.violations.append(msg)
+        if self.strict:
+            raise SDRAMTimingError(msg)
+
+    def _load_mode(self, addr):
+        bl = addr & 0x7
+        if bl == 7:
+            self.burst_length = 2**self.intf.col_width
+        else:
+            assert bl <= 3, "invalid burst length code {}".format(bl)
+            self.burst_length = 1 << bl
+        self.interleave = bool(addr & 0x08)
+        self.cas_latency = (addr >> 4) & 0x7
+        assert self.cas_latency in (1, 2, 3), \
+            "invalid CAS latency {}".format(self.cas_latency)
+        self.single_write = bool(addr & 0x200)
+
+    def _burst_addresses(self, col, num):
+        """ the column addresses of a burst """
+        bl, ncols = self.burst_length, 2**self.intf.col_width
+        if bl == ncols:
+            return [(col + ii) % ncols for ii in range(num)]
+        base, off = col & ~(bl-1), col & (bl-1)
+        if self.interleave:
+            return [base | (off ^ ii) for ii in range(num)]
+        return [base | ((off + ii) & (bl-1)) for ii in range(num)]
+
+    def get_stats(self):
+        """ the model counters and the derived throughput statistics """
+        stats = dict(self.counters)
+        cycles, accesses = stats['cycles'], stats['reads'] + stats['writes']
+        stats['utilization'] = (stats['data_cycles'] / cycles
+                                if cycles > 0 else 0.)
+        stats['row_hit_rate'] = (stats['row_hits'] / accesses
+                                 if accesses > 0 else 0.)
+        stats['refresh_overhead'] = (stats['refresh_cycles'] / cycles
+                                     if cycles > 0 else 0.)
+        stats['violations'] = len(self.violations)
+        return stats
+
     @myhdl.block
     def process(self, skip_init=True):
-        """
-        @todo: documentation
+        """ The SDRAM device model
+
+        Each bank has an open row state, the commands are checked
+        against the bank state and the timing parameters (cycles) of
+        the interface: tRCD (ACT to RD/WR), tRP (PRE to ACT/REF),
+        tRAS (ACT to PRE), tWR (write data to PRE) and tRFC (REF to
+        ACT/REF).  The CAS latency and burst length are set by the
+        load mode register command (LMR), reads and writes with A10
+        set auto precharge the bank.
+
+        A violation raises an `SDRAMTimingError` (strict) or is saved
+        in `violations`.  The `counters` (see `get_stats`) count the
+        commands, the row hits and misses, the data, idle and refresh
+        cycles.
         """
         intf = self.intf   # external SDRAM memory interface
 
@@ -50,11 +222,17 @@ class SDRAMModel(object):
         cmdmn = Signal(self.Commands.NOP)
 
         Commands, States = self.Commands, self.States
+        counters, banks = self.counters, self.bank_states
+        colmask = 2**intf.col_width - 1
+        tras, trcd, trp = intf.cyc_ras, intf.cyc_rcd, intf.cyc_rp
+        trfc, twr = intf.cyc_rfc, intf.cyc_wr
 
         @instance
         def mproc():
             cmd = self.Commands.NOP
             refresh_counter = 0
+            ref_cyc = -trfc
+            rd_pipe, wr_pipe = {}, {}   # burst data beats, cycle: address
 
             # emulate the initialization sequence / requirement
             if skip_init:
@@ -63,36 +241,128 @@ class SDRAMModel(object):
                 pass  # @todo: do init
 
             while True:
+                cyc = counters['cycles']
                 # check the refresh counter
                 if refresh_counter >= intf.cyc_ref:
-                    # @todo: create specific exception for refresh error
-                    raise ValueError
+                    self._violation("refresh interval exceeded")
+                    refresh_counter = 0
                 refresh_counter += 1
 
+                # complete the auto precharges
+                for bank in banks:
+                    if bank.auto_pre is not None and cyc >= bank.auto_pre:
+                        bank.row, bank.pre_cyc = None, bank.auto_pre
+                        bank.auto_pre = None
+                    if bank.row is not None:
+                        counters['active_cycles'] += 1
+
                 intf.dqi.next = None   # release the bi-dir bus (default)
                 bs, addr = int(intf.bs), int(intf.addr)
+                bank = banks[bs]
+                cmd = Commands.NOP
                 if intf.cke:
                     cmd = intf.get_command()
 
-                    # @todo: need to add the device specific states
-                    if cmd == Commands.NOP:
-                        pass  # print("[SDRAM] nop commands")
-                    elif cmd == Commands.ACT:
-                        pass  # print("[SDRAM] ack commands")
-                    elif cmd == Commands.WR:
-                        # @todo look at the intf.dq bus and only get if valid
-                        data = 0
-                        if intf.dq is not None:
-                            data = int(intf.dq)
-                        assert intf.dq == intf.wdq
-                        self.banks[bs][addr] = data
-                    elif cmd == Commands.RD:
-                        data = 0
-                        if addr in self.banks[bs]:
-                            data = self.banks[bs][addr]
-                        intf.rdq.next = data
-                        intf.dqi.next = data
+                if cmd == Commands.ACT:
+                    counters['activates'] += 1
+                    if bank.row is not None or bank.auto_pre is not None:
+                        self._violation("ACT bank {} row {} is open".format(
+                            bs, bank.row))
+                    if cyc - bank.pre_cyc < trp:
+                        self._violation("tRP, bank {}".format(bs))
+                    if cyc - ref_cyc < trfc:
+                        self._violation("tRFC, bank {}".format(bs))
+                    bank.row, bank.act_cyc, bank.accessed = addr, cyc, False
+
+                elif cmd in (Commands.RD, Commands.WR):
+                    if bank.row is None:
+                        self._violation("{} bank {} no open row".format(
+                            cmd, bs))
+                    elif cyc - bank.act_cyc < trcd:
+                        self._violation("tRCD, bank {}".format(bs))
+                    if bank.accessed:
+                        counters['row_hits'] += 1
+                    else:
+                        counters['row_misses'] += 1
+                    bank.accessed = True
+
+                    # a new read or write terminates a burst
+                    row = 0 if bank.row is None else bank.row
+                    rowaddr = row << intf.col_width
+                    if cmd == Commands.WR:
+                        counters['writes'] += 1
+                        rd_pipe.clear()
+                        wr_pipe.clear()
+                        num = 1 if self.single_write else self.burst_length
+                        cols = self._burst_addresses(addr & colmask, num)
+                        for ii, col in enumerate(cols):
+                            wr_pipe[cyc+ii] = (bs, rowaddr | col)
+                        bank.wr_cyc = cyc + num - 1
+                        pre = bank.wr_cyc + twr
+                    else:
+                        counters['reads'] += 1
+                        wr_pipe.clear()
+                        start = cyc + self.cas_latency - 1
+                        for kk in [kk for kk in rd_pipe if kk >= start]:
+                            del rd_pipe[kk]
+                        num = self.burst_length
+                        cols = self._burst_addresses(addr & colmask, num)
+                        for ii, col in enumerate(cols):
+                            rd_pipe[start+ii] = (bs, rowaddr | col)
+                        pre = cyc + num
+                    # auto precharge, A10
+                    if addr & (1 << 10) and bank.row is not None:
+                        bank.auto_pre = max(pre, bank.act_cyc + tras)
+
+                elif cmd == Commands.PRE:
+                    counters['precharges'] += 1
+                    pbanks = banks if addr & (1 << 10) else [bank]
+                    for ii, pb in enumerate(pbanks):
+                        if pb.row is None:
+                            continue
+                        if cyc - pb.act_cyc < tras:
+                            self._violation("tRAS, bank {}".format(ii))
+                        if cyc - pb.wr_cyc < twr:
+                            self._violation("tWR, bank {}".format(ii))
+                        pb.row, pb.pre_cyc = None, cyc
+
+                elif cmd in (Commands.REF, Commands.LMR):
+                    if any([bb.row is not None for bb in banks]):
+                        self._violation("{} with an open row".format(cmd))
+                    if cyc - max([bb.pre_cyc for bb in banks]) < trp:
+                        self._violation("tRP, {}".format(cmd))
+                    if cyc - ref_cyc < trfc:
+                        self._violation("tRFC, {}".format(cmd))
+                    if cmd == Commands.REF:
+                        counters['refreshes'] += 1
+                        counters['refresh_cycles'] += trfc
+                        ref_cyc, refresh_counter = cyc, 0
+                    else:
+                        self._load_mode(addr)
+
+                # the write and read data beats
+                data_cycle = False
+                if cyc in wr_pipe:
+                    wbs, waddr = wr_pipe.pop(cyc)
+                    data = intf.dq.val
+                    self.banks[wbs][waddr] = 0 if data is None else int(data)
+                    data_cycle = True
+                if cyc in rd_pipe:
+                    rbs, raddr = rd_pipe.pop(cyc)
+                    data = self.banks[rbs].get(raddr, 0)
+                    intf.rdq.next = data
+                    intf.dqi.next = data
+                    data_cycle = True
+
+                if data_cycle:
+                    counters['data_cycles'] += 1
+                elif cmd == Commands.NOP:
+                    counters['idle_cycles'] += 1
+                counters['cycles'] += 1
 
+                state.next = (States.ACTIVE if any([bb.row is not None
+                                                    for bb in banks])
+                              else States.IDLE)
                 # this command, will always be one clock delayed
                 cmdmn.next = cmd
                 # synchronous RAM :)
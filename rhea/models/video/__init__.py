@@ -4,3 +4,4 @@ from __future__ import absolute_import
 from .video_display import VideoDisplay
 from .vga_display import VGADisplay
 from .lt24lcd_display import LT24LCDDisplay
+from .frame_writer import FrameWriter
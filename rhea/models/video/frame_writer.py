@@ -0,0 +1,203 @@
+from __future__ import print_function, division
+
+import os
+import atexit
+import hashlib
+import threading
+import weakref
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import numpy as np
+from PIL import Image
+
+
+def adjust_color_depth(frame, color_depth=(8, 8, 8)):
+    """ rescale the (rows, cols, rgb) frame colors to 8 bits per color """
+    if tuple(color_depth) == (8, 8, 8):
+        return np.minimum(frame, 255).astype(np.uint8)
+
+    aframe = np.empty(frame.shape, dtype=np.uint8)
+    for cc, nbits in enumerate(color_depth):
+        maxval = (1 << nbits) - 1
+        color = np.minimum(frame[:, :, cc].astype(np.uint32), maxval)
+        aframe[:, :, cc] = (color * 255 + maxval // 2) // maxval
+    return aframe
+
+
+def _close_at_exit(ref):
+    """ close a writer that was not closed, the writer is not kept
+    alive by the exit handler """
+    writer = ref()
+    if writer is not None:
+        writer.close()
+
+
+class FrameWriter(object):
+    def __init__(self, name='video', path='output', every=1,
+                 on_change=False, container=None, maxsize=8, drop=False):
+        """ Save the video display frames in a background thread
+
+        The video display models (`VGADisplay`, `LT24LCDDisplay`) pass
+        each completed frame to the writer, the frames are encoded and
+        saved by a thread so the simulation does not wait on the image
+        encoding.  An error saving a frame is raised by the next `put`,
+        `flush` or `close`, the frames that follow are not saved.
+
+        Arguments:
+            name (str): the image file name prefix
+            path (str): the directory the images are saved to
+            every (int): only save every Nth frame
+            on_change (bool): only save a frame if it is different
+                than the last saved frame (frame hash).
+            container (str): save all the frames to a single multi-frame
+                image (e.g. 'tiff', 'gif') when the writer is closed
+                instead of a png per frame.
+            maxsize (int): the max number of frames in the queue
+            drop (bool): if the queue is full drop the frame instead
+                of waiting for the writer.
+
+        Usage::
+
+            writer = FrameWriter(every=4, on_change=True)
+            display = VGADisplay(frame_writer=writer)
+            # ... run the simulation
+            writer.close()
+
+        Not convertible.
+        """
+        assert every >= 1
+        self.name = name
+        self.path = path
+        self.every = every
+        self.on_change = on_change
+        self.container = container
+        self.drop = drop
+
+        # statistics
+        self.num_written = 0    # frames saved
+        self.num_skipped = 0    # frames not changed
+        self.num_dropped = 0    # frames dropped, queue was full
+        self.filenames = []
+
+        self._last_hash = None
+        self._images = []       # container frames
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._closed = False
+        self._error = None      # an error in the writer thread
+        self._failed = False    # the remaining frames are not saved
+        self._thread.start()
+
+        # make sure the queued frames are saved if the writer is not
+        # explicitly closed at the end of the simulation
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    def put(self, framen, frame, convert=None, color_depth=(8, 8, 8)):
+        """ queue a frame to be saved
+
+        Arguments:
+            framen (int): the frame number
+            frame (numpy.ndarray): (rows, cols, rgb) frame
+            convert (callable): converts the frame to a uint8 array,
+                this is called (in the simulation thread) only for the
+                frames that are saved.  The display reuses the frame
+                buffer, the converted frame needs to be a copy.
+            color_depth (tuple): the bits per color of the frame, if
+                not converted the colors are scaled to 8 bits.  A
+                color larger than the color depth is an error.
+        """
+        assert not self._closed
+        self._raise_error()
+        if framen % self.every != 0:
+            return
+        if convert is not None:
+            frame = convert(frame)
+        else:
+            frame = np.asarray(frame)
+            for cc, nbits in enumerate(color_depth):
+                if frame[:, :, cc].max() >= (1 << nbits):
+                    raise ValueError(
+                        "color {} exceeds the {} bit color depth".format(
+                            cc, nbits))
+            frame = adjust_color_depth(frame, color_depth)
+
+        item = (framen, frame)
+        if self.drop:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.num_dropped += 1
+        else:
+            self._queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                if not self._failed:
+                    self._write(*item)
+            except Exception as err:
+                # keep the queue draining, the error is raised in the
+                # simulation thread (put, flush or close)
+                self._failed = True
+                self._error = err
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        """ raise the error of the writer thread, once """
+        err, self._error = self._error, None
+        if err is not None:
+            raise err
+
+    def _write(self, framen, frame):
+        if self.on_change:
+            fhash = hashlib.md5(frame.tobytes()).digest()
+            if fhash == self._last_hash:
+                self.num_skipped += 1
+                return
+            self._last_hash = fhash
+
+        im = Image.fromarray(frame, 'RGB')
+        if self.container is not None:
+            self._images.append(im)
+        else:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            imgpath = os.path.join(self.path, "{}_frame_{}.png".format(
+                self.name, framen))
+            im.save(imgpath)
+            im.close()
+            self.filenames.append(imgpath)
+        self.num_written += 1
+
+    def flush(self):
+        """ wait for all the queued frames to be saved """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """ save the remaining frames and stop the writer thread """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+        if self.container is not None and len(self._images) > 0:
+            if not os.path.isdir(self.path):
+                os.makedirs(self.path)
+            imgpath = os.path.join(self.path, "{}_frames.{}".format(
+                self.name, self.container))
+            im = self._images[0]
+            im.save(imgpath, save_all=True, append_images=self._images[1:])
+            self.filenames.append(imgpath)
+            self._images = []
+        self._raise_error()
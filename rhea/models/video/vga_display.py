@@ -32,11 +32,13 @@ class Counters(object):
 
 class VGADisplay(VideoDisplay):
     def __init__(self, frequency=50e6, resolution=(640, 480), refresh_rate=60,
-                 line_rate=31250, color_depth=(10, 10, 10)):
+                 line_rate=31250, color_depth=(10, 10, 10),
+                 frame_writer=None):
         """
         """
         super(VGADisplay, self).__init__(resolution, refresh_rate,
-                                         line_rate, color_depth)
+                                         line_rate, color_depth,
+                                         frame_writer)
         self.name = 'vga'
         
         # get the timings for the configuration
@@ -2,20 +2,28 @@
 from __future__ import print_function, division
 
 import os
-from copy import deepcopy
 from datetime import datetime
-from myhdl import intbv, now
+
+import numpy as np
+from myhdl import now
 from PIL import Image
 
+from .frame_writer import adjust_color_depth
+
 
 class VideoDisplay(object):
     def __init__(self, 
                  resolution=(640,480,), 
                  refresh_rate = 60,
                  line_rate = 31250,
-                 color_depth=(10, 10, 10,)
+                 color_depth=(10, 10, 10,),
+                 frame_writer=None
              ):
         """
+        Arguments:
+            frame_writer (FrameWriter): save the frames in a background
+                thread, if None each frame is saved (png) when the
+                frame completes.
         """
         self.resolution = res = resolution
         self.num_hpxl, self.num_vpxl = self.resolution
@@ -23,15 +31,20 @@ class VideoDisplay(object):
         self.update_cnt = 0
         self._col, self._row = 0, 0
         self.color_depth=color_depth
+        self.frame_writer = frame_writer
+
+        # create a frame buffer (row, col, rgb) to emulate the video
+        # display in the process of updating the image, the completed
+        # (static) image is in the second buffer, the buffers are
+        # swapped at the end of each frame.
+        self._uvmem = np.zeros((res[1], res[0], 3), dtype=np.uint16)
+        self._vvmem = np.zeros((res[1], res[0], 3), dtype=np.uint16)
+
+        # shifts and masks to extract the colors from a packed pixel
+        cd = color_depth
+        self._shifts = (cd[1]+cd[2], cd[2], 0)
+        self._masks = tuple([(1 << nbits) - 1 for nbits in cd])
 
-        # create a container to emulate the video display
-        # in the process of updating image
-        self._uvmem = [[None for _ in range(res[0])]
-                        for _ in range(res[1])]
-        # static image
-        self._vvmem = [[None for _ in range(res[0])]
-                        for _ in range(res[1])]
-                        
         # emulating video displays takes considerable simulation time, track
         # the simulation real time. 
         self.time_start = datetime.now()
@@ -55,18 +68,14 @@ class VideoDisplay(object):
         assert row < self.num_vpxl
 
         if isinstance(val, int):
-            nbits = sum(self.color_depth)
-            val = intbv(val)[nbits:]
-            cd = self.color_depth
-            rgb = (int(val[nbits:nbits-cd[0]]),
-                   int(val[nbits-cd[0]:cd[2]]),
-                   int(val[cd[2]:0]),)
+            rgb = [(val >> ss) & mm
+                   for ss, mm in zip(self._shifts, self._masks)]
         elif isinstance(val, tuple):
             rgb = val
         else:
             raise ValueError
 
-        self._uvmem[row][col] = rgb
+        self._uvmem[row, col] = rgb
 
         col += 1
         if col == self.num_hpxl:
@@ -76,13 +85,7 @@ class VideoDisplay(object):
             row = 0
 
         if col == 0 and row == 0:
-            # @todo: remove print add option to create png or not
-            self.update_cnt += 1
-            td = datetime.now() - self.time_last
-            print("{:<10d}: full display update {} ({})".format(now(), self.update_cnt, td))
-            self._vvmem = deepcopy(self._uvmem)
-            self.create_save_image()
-            self.time_last = datetime.now()
+            self._frame_complete()
             
         self._col, self._row = col, row
         return 
@@ -95,60 +98,51 @@ class VideoDisplay(object):
         """
         assert col < self.num_hpxl
         assert row < self.num_vpxl
-        self._uvmem[row][col] = rgb
+        self._uvmem[row, col] = rgb
         if last:
-            self.update_cnt += 1
-            td = datetime.now() - self.time_last
-            print("{:<10d}: full display update {} ({})".format(now(), self.update_cnt, td))
-            self._vvmem = deepcopy(self._uvmem)
-            self.create_save_image()
-            self.time_last = datetime.now()
+            self._frame_complete()
         return
 
-    def _adjust_color_depth(self, rgb):
-        argb = rgb
-        if self.color_depth != (8, 8, 8):
-            argb = [(vv/cc)*256 for vv, cc in zip(rgb, self.color_depth)]
-            argb = list(map(int, argb))
-        return argb
+    def _frame_complete(self):
+        """ a full display update, swap the frame buffers and save """
+        # @todo: remove print add option to create png or not
+        self.update_cnt += 1
+        td = datetime.now() - self.time_last
+        print("{:<10d}: full display update {} ({})".format(
+            now(), self.update_cnt, td))
+        # the completed frame becomes the static image, the previous
+        # static image buffer is reused (overwritten) by the next frame
+        self._vvmem, self._uvmem = self._uvmem, self._vvmem
+        if self.frame_writer is not None:
+            self.frame_writer.put(self.update_cnt, self._vvmem,
+                                  convert=self._adjust_color_depth)
+        else:
+            self.create_save_image()
+        self.time_last = datetime.now()
+
+    def get_frame(self):
+        """ the last completed frame, (row, col, rgb) array """
+        return self._vvmem
+
+    def _adjust_color_depth(self, frame):
+        """ rescale the frame colors to 8 bits per color """
+        return adjust_color_depth(frame, self.color_depth)
 
     def create_save_image(self):
-        """ 
-        :param framen: frame number
-        :param frame: 2D frame container (list, array)
-        """
+        """ save the last completed frame as a png """
         framen = self.update_cnt   # latest display update
         frame = self._vvmem        # display memory
         print("Creating frame image and saving as png")
-        im = Image.new('RGB', self.resolution, self.color_depth)
-        assert len(frame) <= self.resolution[1]
-        assert len(frame[0]) <= self.resolution[0]
-        print("   ... put pixels")
-        for rr, row in enumerate(frame):
-            for cc, rgb in enumerate(row):
-                #rgb = self._adjust_color_depth(rgb)
-                im.putpixel((cc, rr), tuple(rgb))
-                pass 
-                
+        im = Image.fromarray(self._adjust_color_depth(frame), 'RGB')
+        assert im.size == tuple(self.resolution)
+
         if not os.path.isdir("output"):
             os.makedirs("output")
         imgpath = os.path.join("output/", "{}_frame_{}.png".format(
             self.name, framen))
-        print("   ... save image")
-        print("     width ........... {}".format(im.width))
-        print("     height .......... {}".format(im.height))
-        # debug, should always be a set of colors
-        if im.getcolors() is None:
-            for row in range(2):
-                for col in range(8):
-                    print("{} -> {} ".format(
-                          frame[row][col], im.getpixel((col, row)) ),
-                         end='')
-                print("")
-        im.verify()
         im.save(imgpath)
         im.close()
-        print("image written")
+        print("image written {}".format(imgpath))
 
     def process(self, glbl, vga):
         """ emulate the behavior of the display """
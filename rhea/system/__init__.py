@@ -25,6 +25,11 @@ from .memmap import Barebone
 from .memmap import Wishbone
 from .memmap import AvalonMM
 from .memmap import AXI4Lite
+from .memmap import TransactionRecorder
+
+# register map artifacts
+from .memmap import get_regmap
+from .memmap import export_regmap
 
 # streaming interfaces
 from .stream import FIFOBus
@@ -17,3 +17,14 @@ from .wishbone import Wishbone
 from .avalonmm import AvalonMM
 from .axi4 import AXI4Lite
 
+# bus transaction recorder (simulation)
+from .recorder import Transaction
+from .recorder import TransactionRecorder
+
+
+# register map artifacts (host software)
+from .regmap import get_regmap
+from .regmap import regmap_to_json
+from .regmap import regmap_to_c_header
+from .regmap import regmap_to_python
+from .regmap import export_regmap
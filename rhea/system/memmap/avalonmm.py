@@ -96,51 +96,51 @@ class AvalonMM(MemoryMapped):
 
         # @todo: have be base_address be an attribute of the regfile
         nregs = len(regs_list)
-        max_address = base_address + max(addr_list)
+        nrw = len(rf.rwregs)
 
         # @todo: add the peripheral interface stuff ...
 
         clock = self.clk
         reset = self.reset
 
+        # the address decode, the index of the addressed register and
+        # the index of the last register read and write strobes
+        regsel = Signal(bool(0))
+        regidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        rdidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        wridx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        decode_inst = rf.get_decoder(av.address, base_address, regsel, regidx)
+
         # determine if this register-file is selected, this check
         # adds an extra clock cycle to the transaction
         selected = Signal(bool(0))
 
         @always_seq(clock.posedge, reset=reset)
         def beh_selected():
-            if av.address >= base_address and av.address < max_address:
+            if regsel:
                 selected.next = True
             else:
                 selected.next = False
 
-        # @todo: scan the register list, if it is contiguous remove
-        #        the base and use the offset directly to access the
-        #        register list instead of the for loop
-        # if regfile.contiguous:
-        #     @always_seq(clock.posedge, reset=reset)
-        #     ...
-
         # read side of the bus transaction
         @always(clock.posedge)
         def beh_read():
             if reset == int(reset.active):
                 for ii in range(nregs):
                     prd[ii].next = False
+                rdidx.next = 0
             else:
+                # only the last read strobe needs to be cleared
+                prd[rdidx].next = False
                 if selected and not av.write:
-                    for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
-                        if av.address == aa:
-                            av.readdata.next = regs_list[ii]
-                            prd[ii].next = True
+                    av.readdata.next = regs_list[regidx]
+                    prd[regidx].next = True
+                    rdidx.next = regidx
                 else:
                     av.readdata.next = 0
-                    for ii in range(nregs):
-                        prd[ii].next = False
 
-        # write side of the bus transaction
+        # write side of the bus transaction, the read-write registers
+        # are first in the register list
         @always(clock.posedge)
         def beh_write():
             if reset == int(reset.active):
@@ -150,18 +150,13 @@ class AvalonMM(MemoryMapped):
                     if not ro:
                         regs_list[ii].next = dd
                     pwr[ii].next = False
+                wridx.next = 0
             else:
-                if selected and av.write:
-                    for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
-                        ro = rol[ii]
-                        if not ro and av.address == aa:
-                            regs_list[ii].next = av.writedata
-                            pwr[ii].next = True
-                else:
-                    for ii in range(nregs):
-                        pwr[ii].next = False
+                pwr[wridx].next = False
+                if selected and av.write and regidx < nrw:
+                    regs_list[regidx].next = av.writedata
+                    pwr[regidx].next = True
+                    wridx.next = regidx
 
         # get the generators that assign the named bits
         assign_insts = regfile.get_assigns()
@@ -179,6 +174,11 @@ class AvalonMM(MemoryMapped):
         :param val: value to write to the address
         :return: yields
         """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            yield self._tlm_trans(reg, addr, val)
+            return
+
         self._start_transaction(write=True, address=addr, data=val)
         self.address.next = addr
         self.writedata.next = val
@@ -187,6 +187,7 @@ class AvalonMM(MemoryMapped):
         while self.waitrequest and to < self.timeout:
             yield self.clock.posedge
             to += 1
+        self._timedout = to >= self.timeout
         yield self.clock.posedge
         self.write.next = False
         self.writedata.next = 0
@@ -197,6 +198,11 @@ class AvalonMM(MemoryMapped):
         :param addr:
         :return:
         """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            yield self._tlm_trans(reg, addr)
+            return
+
         self._start_transaction(write=False, address=addr)
         self.address.next = addr
         self.read.next = True
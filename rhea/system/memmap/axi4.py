@@ -4,109 +4,559 @@ from __future__ import absolute_import
 from math import log, ceil
 
 import myhdl
-from myhdl import Signal, intbv, always_seq
+from myhdl import (Signal, intbv, always_seq, always, always_comb,
+                   enum, concat, ConcatSignal)
+
+from ..glbl import Global
 from . import MemoryMapped
+from . import Barebone
 
 
 class AXI4Lite(MemoryMapped):
-    def __init__(self, glbl, data_width=8, address_width=16):
-        """ 
+    name = 'axi4lite'
+
+    # response (bresp, rresp) values
+    OKAY = 0
+    SLVERR = 2
+
+    def __init__(self, glbl, data_width=8, address_width=16, name=None):
+        """ AXI4-Lite bus object
+
+        The five channels (write address, write data, write response,
+        read address and read data) are independent, a transfer occurs
+        when `valid` and `ready` are both high on a clock edge.  A
+        master can issue multiple write and read requests before the
+        responses are received (outstanding transactions), the
+        responses are returned in order.
+
+        Parameters (kwargs):
+        --------------------
+          :param glbl: system clock and reset
+          :param data_width: data bus width
+          :param address_width: address bus width
+          :param name: name for the bus
         """
         super(AXI4Lite, self).__init__(glbl,
                                        data_width=data_width,
-                                       address_width=address_width) 
+                                       address_width=address_width)
         self.aclk = glbl.clock
         # not used, use
         # self.aresetn = glbl.reset
-        
+
         self.awaddr = Signal(intbv(0)[address_width:])
         self.awprot = Signal(intbv(0)[3:])
         self.awvalid = Signal(bool(0))
         self.awready = Signal(bool(0))
-        
+
         self.wdata = Signal(intbv(0)[data_width:])
         num_strb_bits = int(ceil(data_width/8))
         self.wstrb = Signal(intbv(0)[num_strb_bits:])
         self.wvalid = Signal(bool(0))
         self.wready = Signal(bool(0))
-        
+
         self.bresp = Signal(intbv(0)[2:])
         self.bvalid = Signal(bool(0))
         self.bready = Signal(bool(0))
-        
+
         self.araddr = Signal(intbv(0)[address_width:])
         self.arprot = Signal(intbv(0)[3:])
         self.arvalid = Signal(bool(0))
         self.arready = Signal(bool(0))
-        
+
         self.rdata = Signal(intbv(0)[data_width:])
         self.rresp = Signal(intbv(0)[2:])
         self.rvalid = Signal(bool(0))
         self.rready = Signal(bool(0))
-        
-    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    # Transactors
-    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~        
-    def writetrans(self, addr, val):
-        """ Emulate a write transfer from a master
-        The following is a very basic write transaction, future 
-        enhancements are needed to verify/validate of features of 
-        the AXI4Lite bus. 
-        
-        @todo: add priority  (not often used)
-        @todo: add byte strobe
-        @todo: add response checks
-        @todo: and checks for all channel acks
+
+        # a peripheral holds a write address (waiting for the write
+        # data), the write data belongs to this peripheral.
+        self.awpend = Signal(bool(0))
+
+        # peripheral outputs
+        self._pawready = []
+        self._pwready = []
+        self._pbresp = []
+        self._pbvalid = []
+        self._parready = []
+        self._prdata = []
+        self._prresp = []
+        self._prvalid = []
+        self._pawpend = []
+
+        # the responses of the last transactor call
+        self._responses = []
+
+        self._add_bus(name)
+
+    def add_output_bus(self, awready, wready, bresp, bvalid,
+                       arready, rdata, rresp, rvalid, awpend):
+        self._pawready.append(awready)
+        self._pwready.append(wready)
+        self._pbresp.append(bresp)
+        self._pbvalid.append(bvalid)
+        self._parready.append(arready)
+        self._prdata.append(rdata)
+        self._prresp.append(rresp)
+        self._prvalid.append(rvalid)
+        self._pawpend.append(awpend)
+
+    @myhdl.block
+    def interconnect(self):
+        """ combine all the peripheral outputs
+        The outputs are combined without a register, the ready
+        signals are part of the channel handshake.  A peripheral
+        drives zero when it is not addressed.
         """
-        self.awaddr.next = addr 
-        self.awvalid.next = True
-        self.wdata.next = val 
-        self.wvalid.next = True 
-        self.bready.next = True 
-        tickcount = 0
-        yield self.aclk.posedge
-        while not self.wready and tickcount < self.timeout:
-            yield self.aclk.posedge
-            tickcount += 1 
-        self.awvalid.next = False 
-        self.wvalid.next = False 
-        self.bready.next = False 
-    
-    def readtrans(self, addr):
-        pass
-    
-    def acktrans(self, data=None):
-        pass
-    
+        ndevs = len(self._prdata)
+        axi = self
+
+        @always_comb
+        def beh_or_combine():
+            awready = False
+            wready = False
+            bvalid = False
+            arready = False
+            rvalid = False
+            awpend = False
+            bresp = 0
+            rdata = 0
+            rresp = 0
+            for ii in range(ndevs):
+                awready = awready or axi._pawready[ii]
+                wready = wready or axi._pwready[ii]
+                bresp = bresp | axi._pbresp[ii]
+                bvalid = bvalid or axi._pbvalid[ii]
+                arready = arready or axi._parready[ii]
+                rdata = rdata | axi._prdata[ii]
+                rresp = rresp | axi._prresp[ii]
+                rvalid = rvalid or axi._prvalid[ii]
+                awpend = awpend or axi._pawpend[ii]
+            axi.awready.next = awready
+            axi.wready.next = wready
+            axi.bresp.next = bresp
+            axi.bvalid.next = bvalid
+            axi.arready.next = arready
+            axi.rdata.next = rdata
+            axi.rresp.next = rresp
+            axi.rvalid.next = rvalid
+            axi.awpend.next = awpend
+
+        return beh_or_combine
+
+    @myhdl.block
+    def peripheral_regfile(self, regfile, name=''):
+        """ memory-mapped AXI4-Lite peripheral interface
+
+        A write address is accepted when the address is a register in
+        this register file and no other write address is pending, the
+        write data is accepted once the address has been received.  The
+        register is written when the write data is accepted, a write
+        address and a write data can be accepted each clock.  A read
+        address is accepted when the read data channel is free and the
+        read data is valid on the next clock.  A write to a read-only
+        register is not written and the response is SLVERR.  The
+        write strobes (`wstrb`) select the bytes written.
+        """
+        axi = self     # register bus
+        rf = regfile   # register file definition
+        clock, reset = self.clock, self.reset
+
+        base_address = regfile.base_address
+        if base_address is None:
+            base_address = 0
+
+        # get the list-of-signals that represent the regfile
+        al, rl, rol, dl = rf.get_reglist()
+        regs_list = rl
+        pwr, prd = rf.get_strobelist()
+        nregs = len(regs_list)
+        nrw = len(rf.rwregs)
+        okay, slverr = self.OKAY, self.SLVERR
+
+        # the local outputs, combined by the interconnect, the read
+        # response is always OKAY
+        dw = self.data_width
+        awready, wready, bvalid, arready, rvalid, awhold = [
+            Signal(bool(0)) for _ in range(6)]
+        bresp, rresp = Signal(intbv(0)[2:]), Signal(intbv(0)[2:])
+        rdata = Signal(intbv(0)[dw:])
+        axi.add_output_bus(awready, wready, bresp, bvalid,
+                           arready, rdata, rresp, rvalid, awhold)
+
+        # the write and read address decode
+        awsel, arsel = Signal(bool(0)), Signal(bool(0))
+        awidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        aridx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        awdec_inst = rf.get_decoder(axi.awaddr, base_address, awsel, awidx)
+        ardec_inst = rf.get_decoder(axi.araddr, base_address, arsel, aridx)
+
+        # the register index of the write address held and the index
+        # of the last register read and write strobes
+        hidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        rdidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        wridx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        wrdata = Signal(intbv(0)[dw:])
+        dowrite = Signal(bool(0))
+
+        # the byte write strobes to a bit mask
+        wmask = ConcatSignal(*[axi.wstrb((dw-1-ii)//8) for ii in range(dw)])
+
+        @always_comb
+        def beh_write_ready():
+            # the write response channel is free
+            if awhold and (not axi.bvalid or axi.bready):
+                wready.next = True
+                dowrite.next = axi.wvalid
+            else:
+                wready.next = False
+                dowrite.next = False
+
+        @always_comb
+        def beh_ready():
+            awready.next = awsel and (not axi.awpend or dowrite)
+            arready.next = arsel and (not axi.rvalid or axi.rready)
+
+        @always_comb
+        def beh_write_data():
+            wrdata.next = ((regs_list[hidx] & ~wmask) |
+                           (axi.wdata & wmask))
+
+        # write side of the bus transaction, the read-write registers
+        # are first in the register list
+        @always(clock.posedge)
+        def beh_write():
+            if reset == int(reset.active):
+                for ii in range(nregs):
+                    ro = rol[ii]
+                    dd = dl[ii]
+                    if not ro:
+                        regs_list[ii].next = dd
+                    pwr[ii].next = False
+                wridx.next = 0
+                hidx.next = 0
+                awhold.next = False
+                bvalid.next = False
+                bresp.next = 0
+            else:
+                pwr[wridx].next = False
+                if dowrite:
+                    awhold.next = False
+                    bvalid.next = True
+                    if hidx < nrw:
+                        regs_list[hidx].next = wrdata
+                        pwr[hidx].next = True
+                        wridx.next = hidx
+                        bresp.next = okay
+                    else:
+                        bresp.next = slverr
+                elif bvalid and axi.bready:
+                    bvalid.next = False
+                    bresp.next = 0
+
+                if awready and axi.awvalid:
+                    awhold.next = True
+                    hidx.next = awidx
+
+        # read side of the bus transaction
+        @always(clock.posedge)
+        def beh_read():
+            if reset == int(reset.active):
+                for ii in range(nregs):
+                    prd[ii].next = False
+                rdidx.next = 0
+                rvalid.next = False
+                rdata.next = 0
+            else:
+                prd[rdidx].next = False
+                if arready and axi.arvalid:
+                    rvalid.next = True
+                    rdata.next = regs_list[aridx]
+                    prd[aridx].next = True
+                    rdidx.next = aridx
+                elif rvalid and axi.rready:
+                    rvalid.next = False
+                    rdata.next = 0
+
+        # get the generators that assign the named bits
+        assign_insts = regfile.get_assigns()
+
+        return myhdl.instances()
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Modules
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def map_generic(self):
-        pass
+    def get_generic(self):
+        generic = Barebone(Global(self.clock, self.reset),
+                           data_width=self.data_width,
+                           address_width=self.address_width)
+        return generic
 
     @myhdl.block
-    def peripheral_regfile(self, glbl, regfile, name):
-        clock, reset = glbl.clock, glbl.reset
-        readtrans = Signal(bool(0))
-        writetrans = Signal(bool(0))
-        
-        # @todo: incomplete finish
+    def map_to_generic(self, generic):
+        """ AXI4-Lite peripheral to a generic (Barebone) peripheral
+        One transaction at a time, a write when both the write address
+        and the write data are valid.
+        """
+        clock, reset = self.clock, self.reset
+        axi, bb = self, generic
+        plen, mlen = len(bb.per_addr), len(bb.mem_addr)
+        states = enum('idle', 'write', 'write_resp', 'read', 'read_resp')
+        state = Signal(states.idle)
+
+        awready, wready, bvalid, arready, rvalid, awhold = [
+            Signal(bool(0)) for _ in range(6)]
+        bresp, rresp = Signal(intbv(0)[2:]), Signal(intbv(0)[2:])
+        rdata = Signal(intbv(0)[self.data_width:])
+        axi.add_output_bus(awready, wready, bresp, bvalid,
+                           arready, rdata, rresp, rvalid, awhold)
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_map():
+            awready.next = False
+            wready.next = False
+            arready.next = False
+            bb.write.next = False
+            bb.read.next = False
+
+            if state == states.idle:
+                if axi.awvalid and axi.wvalid and bb.done:
+                    awready.next = True
+                    wready.next = True
+                    bb.per_addr.next = axi.awaddr[mlen+plen:mlen]
+                    bb.mem_addr.next = axi.awaddr[mlen:0]
+                    bb.write_data.next = axi.wdata
+                    bb.byte_enable.next = axi.wstrb
+                    bb.write.next = True
+                    state.next = states.write
+                elif axi.arvalid and bb.done:
+                    arready.next = True
+                    bb.per_addr.next = axi.araddr[mlen+plen:mlen]
+                    bb.mem_addr.next = axi.araddr[mlen:0]
+                    bb.read.next = True
+                    state.next = states.read
+
+            elif state == states.write:
+                if not bb.write and bb.done:
+                    bvalid.next = True
+                    state.next = states.write_resp
+
+            elif state == states.write_resp:
+                if axi.bready:
+                    bvalid.next = False
+                    state.next = states.idle
+
+            elif state == states.read:
+                # the read data is valid while done is low
+                if not bb.done:
+                    rdata.next = bb.read_data
+                elif not bb.read:
+                    rvalid.next = True
+                    state.next = states.read_resp
+
+            elif state == states.read_resp:
+                if axi.rready:
+                    rvalid.next = False
+                    rdata.next = 0
+                    state.next = states.idle
+
+        return beh_map
+
+    @myhdl.block
+    def map_from_generic(self, generic):
+        """ a generic (Barebone) master to an AXI4-Lite master
+        The generic bus `done` is low until the response is received.
+        """
+        clock, reset = self.clock, self.reset
+        axi, bb = self, generic
+        awdone, wdone, ardone = [Signal(bool(0)) for _ in range(3)]
+        inprog, iswrite = Signal(bool(0)), Signal(bool(0))
+
+        @always_comb
+        def beh_assign():
+            axi.awaddr.next = concat(bb.per_addr, bb.mem_addr)
+            axi.araddr.next = concat(bb.per_addr, bb.mem_addr)
+            axi.wdata.next = bb.write_data
+            axi.wstrb.next = bb.byte_enable
+            axi.awvalid.next = inprog and iswrite and not awdone
+            axi.wvalid.next = inprog and iswrite and not wdone
+            axi.bready.next = inprog and iswrite
+            axi.arvalid.next = inprog and not iswrite and not ardone
+            axi.rready.next = inprog and not iswrite
+            if axi.rvalid:
+                bb.read_data.next = axi.rdata
+            else:
+                bb.read_data.next = 0
+            bb.done.next = not (inprog or bb.write or bb.read)
+
         @always_seq(clock.posedge, reset=reset)
-        def beh_row():
-            if self.awvalid:
-                writetrans.next = True
-            
-            if self.arvalid:
-                readtrans.next = True
-                
-        return beh_row
-    
-    def controller(self, generic):
-        pass
-    
-    def peripheral(self, generic):
-        pass 
-    
-    
+        def beh_channels():
+            if not inprog:
+                awdone.next = False
+                wdone.next = False
+                ardone.next = False
+                if bb.write or bb.read:
+                    inprog.next = True
+                    iswrite.next = bb.write
+            else:
+                if axi.awvalid and axi.awready:
+                    awdone.next = True
+                if axi.wvalid and axi.wready:
+                    wdone.next = True
+                if axi.arvalid and axi.arready:
+                    ardone.next = True
+                if ((axi.bvalid and axi.bready) or
+                        (axi.rvalid and axi.rready)):
+                    inprog.next = False
+
+        return beh_assign, beh_channels
+
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    # Transactors
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _outstanding(self, write, addrs, vals=None, depth=4, strb=None):
+        """ issue the requests with up to `depth` outstanding
+
+        The address (and write data) channels issue a request each
+        clock while the responses are received.  The responses are
+        saved to `_responses` and the words read to `_read_data`.
+        """
+        num = len(addrs)
+        assert num > 0 and depth > 0
+        strb = 2**len(self.wstrb) - 1 if strb is None else strb
+        nreq, ndat, nrsp = 0, 0, 0
+        rvals, resps = [], []
+        to = 0
 
+        yield self.aclk.posedge
+        while nrsp < num and to < self.timeout:
+            if write:
+                self.awvalid.next = nreq < num and nreq - nrsp < depth
+                self.awaddr.next = addrs[min(nreq, num-1)]
+                self.wvalid.next = ndat < num and ndat - nrsp < depth
+                self.wdata.next = vals[min(ndat, num-1)]
+                self.wstrb.next = strb
+                self.bready.next = True
+            else:
+                self.arvalid.next = nreq < num and nreq - nrsp < depth
+                self.araddr.next = addrs[min(nreq, num-1)]
+                self.rready.next = True
+            yield self.aclk.posedge
+            to += 1
+
+            # the transfers on this clock edge
+            if write:
+                if self.awvalid and self.awready:
+                    nreq += 1
+                if self.wvalid and self.wready:
+                    ndat += 1
+                if self.bvalid and self.bready:
+                    resps.append(int(self.bresp))
+                    nrsp += 1
+                    to = 0
+            else:
+                if self.arvalid and self.arready:
+                    nreq += 1
+                if self.rvalid and self.rready:
+                    rvals.append(int(self.rdata))
+                    resps.append(int(self.rresp))
+                    nrsp += 1
+                    to = 0
+
+        self._timedout = to >= self.timeout
+        if write:
+            self.awvalid.next = False
+            self.wvalid.next = False
+            self.bready.next = False
+        else:
+            self.arvalid.next = False
+            self.rready.next = False
+            self._read_data = rvals
+        self._responses = resps
+
+    def get_responses(self):
+        """ the responses (`bresp`, `rresp`) of the last transactor """
+        return self._responses
+
+    def writetrans(self, addr, val, strb=None):
+        """ write accessor for testbenches
+        :param addr: address to write
+        :param val: value to write to the address
+        :param strb: the byte write strobes, default all bytes
+        """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            mask = None
+            if strb is not None:
+                mask = sum([0xFF << 8*ii for ii in range(len(self.wstrb))
+                            if (strb >> ii) & 1])
+            yield self._tlm_trans(reg, addr, val, mask)
+            self._responses = [self.OKAY if reg.access == 'rw'
+                               else self.SLVERR]
+            return
+
+        self._start_transaction(write=True, address=addr, data=val)
+        yield self._outstanding(True, [addr], [val], depth=1, strb=strb)
+        self._end_transaction()
+
+    def readtrans(self, addr):
+        """ read accessor for testbenches """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            yield self._tlm_trans(reg, addr)
+            self._responses = [self.OKAY]
+            return
+
+        self._start_transaction(write=False, address=addr)
+        yield self._outstanding(False, [addr], depth=1)
+        rvals = self._read_data
+        # no response, the transaction timed out, read as 0
+        self._read_data = rvals[0] if len(rvals) > 0 else 0
+        self._end_transaction()
 
+    def write_outstanding(self, addrs, vals, depth=4):
+        """ multiple writes, up to `depth` outstanding
+        The write responses are returned by `get_responses`.
+        """
+        assert len(addrs) == len(vals)
+        self._start_transaction(write=True, address=addrs[0], data=vals)
+        yield self._outstanding(True, addrs, vals, depth=depth)
+        self._end_transaction()
+
+    def read_outstanding(self, addrs, depth=4):
+        """ multiple reads, up to `depth` outstanding
+        The words read are returned by `get_read_data` (list).
+        """
+        self._start_transaction(write=False, address=addrs[0])
+        yield self._outstanding(False, addrs, depth=depth)
+        rvals = self._read_data
+        self._end_transaction()
+        self._read_data = rvals
+
+    def acktrans(self, data=None):
+        """ respond to the next transaction (peripheral model)
+        Only without a peripheral on the bus, the response signals
+        are driven directly.
+        """
+        while not (self.arvalid or (self.awvalid and self.wvalid)):
+            yield self.aclk.posedge
+        if self.arvalid:
+            self.arready.next = True
+            yield self.aclk.posedge
+            self.arready.next = False
+            self.rvalid.next = True
+            self.rdata.next = 0 if data is None else data
+            yield self.aclk.posedge
+            while not self.rready:
+                yield self.aclk.posedge
+            self.rvalid.next = False
+        else:
+            self.awready.next = True
+            self.wready.next = True
+            yield self.aclk.posedge
+            self.awready.next = False
+            self.wready.next = False
+            self.bvalid.next = True
+            yield self.aclk.posedge
+            while not self.bready:
+                yield self.aclk.posedge
+            self.bvalid.next = False
@@ -58,6 +58,10 @@ class Barebone(MemoryMapped):
 
         * currently not implemented but envisioned it will be added
 
+        The `byte_enable` selects the bytes written (one bit per byte
+        of `write_data`), it is all ones if the master does not drive
+        it and a peripheral without byte writes ignores it.
+
         (arguments == ports)
         Arguments:
             glbl: system clock and reset
@@ -75,6 +79,9 @@ class Barebone(MemoryMapped):
         self.done = Signal(bool(1))
         self.read_data = Signal(intbv(0)[data_width:])
         self.write_data = Signal(intbv(0)[data_width:])
+        # the bytes written, all bytes if not driven by the master
+        nbytes = int(ceil(data_width/8.))
+        self.byte_enable = Signal(intbv(2**nbytes-1)[nbytes:])
 
         # separate address bus for selecting a peripheral and the register
         # addresses.  The total number of peripherals is num_periphal-1,
@@ -92,14 +99,17 @@ class Barebone(MemoryMapped):
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # Transactors
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    def writetrans(self, addr, data):
+    def writetrans(self, addr, data, byte_enable=None):
         self._start_transaction(write=True, address=addr, data=data)
         # @todo: this will need to be enhanced for multiple master
         # @todo: scenario, wait for done vs. asserting done
         assert self.done
         print("Barebone: write transaction {:08X} to {:08X}".format(data, addr))
+        nbytes = len(self.byte_enable)
         self.write.next = True
         self.write_data.next = data
+        self.byte_enable.next = (2**nbytes-1 if byte_enable is None
+                                 else byte_enable)
         self.mem_addr.next = addr
         to = 0
         yield self.clock.posedge
@@ -108,6 +118,7 @@ class Barebone(MemoryMapped):
         while not self.done and to < self.timeout:
             yield self.clock.posedge
             to += 1
+        self._timedout = to >= self.timeout
         self.write_data.next = 0
         self._end_transaction(self.write_data)
 
@@ -125,6 +136,7 @@ class Barebone(MemoryMapped):
             rd = int(self.read_data)
             yield self.clock.posedge
             to += 1
+        self._timedout = to >= self.timeout
         print(" read {:08X}".format(rd))
         self._end_transaction(rd)
 
@@ -159,10 +171,12 @@ class Barebone(MemoryMapped):
         self.write = generic.write
         self.read = generic.read
         self.write_data = generic.write_data
+        self.byte_enable = generic.byte_enable
         self.read_data = generic.read_data
         self.done = generic.done
         self.per_addr = generic.per_addr
         self.mem_addr = generic.mem_addr
+        self.address = self.mem_addr
 
         return []
 
@@ -3,6 +3,7 @@ from __future__ import print_function, absolute_import
 
 from copy import deepcopy
 import myhdl
+from myhdl import now
 from ..clock import Clock
 from ..reset import Reset
 from ..cso import ControlStatusBase
@@ -31,6 +32,20 @@ class MemoryMapped(MemorySpace):
         """ Base class for the different memory-map interfaces.
         This is a base class for the various memory-mapped (control and 
         status (CSR)) interfaces.
+
+        The transactors (`writetrans` and `readtrans`) have a fast
+        transaction-level (TLM) mode, when `tlm` is set a transaction
+        to a register added to the bus (`add`) updates or reads the
+        register directly and pulses the register `wr` or `rd` strobe,
+        the bus cycle is not simulated.  The transactions to other
+        addresses are bus cycles.  The mode can be changed between
+        transactions, e.g. a system testbench configures the
+        peripherals in the TLM mode and then tests a peripheral with
+        bus cycles::
+
+            regbus.tlm = True
+            yield regbus.writetrans(0x0400, 0x01)   # one clock
+            regbus.tlm = False
         """
         super(MemoryMapped, self).__init__()
         self.data_width = data_width
@@ -58,12 +73,25 @@ class MemoryMapped(MemorySpace):
         # bus transaction timeout in clock ticks
         self.timeout = 100
 
+        # transaction-level transactors, the registers added to the
+        # bus by address.
+        self.tlm = False
+        self._tlm_regs = {}
+
         # the generic shadow of this bus, each
         self.generic = None
         
         # _debug is used to enable bus tracing prints etc.
         self._debug = False
 
+        # the transaction recorder (TransactionRecorder.attach), the
+        # transactions in progress (nested, e.g. a burst of single
+        # transactions) and the transaction timeout status
+        self.recorder = None
+        self._recorder_name = None
+        self._trans_stack = []
+        self._timedout = False
+
     @property
     def is_write(self):
         return self._write
@@ -82,6 +110,11 @@ class MemoryMapped(MemorySpace):
         return self._address
 
     def _start_transaction(self, write=False, address=None, data=None):
+        if self.recorder is not None:
+            if len(self._trans_stack) > 0:
+                self._trans_stack[-1][2] = True
+            self._trans_stack.append([now(), self.recorder.cycles, False])
+        self._timedout = False
         self._write = write
         self._read = not write
         self._address = address
@@ -93,9 +126,50 @@ class MemoryMapped(MemorySpace):
     def _end_transaction(self, data=None):
         if self._read and data is not None:
             self._read_data = int(data)
+        if self.recorder is not None and len(self._trans_stack) > 0:
+            # a transaction of nested transactions is not recorded,
+            # the nested transactions are
+            time, start, nested = self._trans_stack.pop()
+            if not nested:
+                data = self._write_data if self._write else self._read_data
+                self.recorder.record(self, time, start, self._write,
+                                     self._address, data, self._timedout)
         self._write = False
         self._read = False
 
+    def _tlm_register(self, addr):
+        """ the register at the address in the TLM mode, else None """
+        if not self.tlm:
+            return None
+        return self._tlm_regs.get(addr, None)
+
+    def _tlm_trans(self, reg, addr, data=None, mask=None):
+        """ transaction-level register write (data) or read
+
+        The register is updated (a read-write register) or read on
+        the falling edge of the clock and the register write or read
+        strobe is active for one clock.  A write to a read-only
+        register is ignored, the same as a bus cycle.
+        """
+        write = data is not None
+        self._start_transaction(write=write, address=addr, data=data)
+        yield self.clock.negedge
+        strobe = None
+        if not write:
+            strobe = reg.rd
+            data = int(reg.val)
+        elif reg.access == 'rw':
+            strobe = reg.wr
+            rmask = 2**reg.width - 1
+            mask = rmask if mask is None else mask & rmask
+            reg.next = (int(reg.val) & ~mask) | (data & mask)
+        if strobe is not None:
+            strobe.next = True
+        yield self.clock.negedge
+        if strobe is not None:
+            strobe.next = False
+        self._end_transaction(data)
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # public transactor API
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -151,16 +225,19 @@ class MemoryMapped(MemorySpace):
 
             # automatically assigning an empty base_address
             memspace.base_address = base_address
+            arf.base_address = base_address
 
             for k, v in arf.__dict__.items():
                 if isinstance(v, Register):
                     v.addr += base_address
+                    # the register used by the peripheral (not the copy)
+                    self._tlm_regs[v.addr] = regfile.__dict__[k]
 
-            if peripheral_name in self.regfiles:
+            if peripheral_name in self.names:
                 self.names[peripheral_name] += 1
                 peripheral_name = peripheral_name.upper() + "_{:03d}".format(self.names[peripheral_name])
             else:
-                self.names = {peripheral_name: 0}
+                self.names[peripheral_name] = 0
                 peripheral_name = peripheral_name.upper() + "_000"
 
             self.regfiles[peripheral_name] = arf
@@ -0,0 +1,258 @@
+"""
+Record the memory-mapped bus transactions (simulation only).
+
+The transactors (`writetrans`, `readtrans`, ...) of the buses the
+recorder is attached to log each transaction to a ring buffer: the
+simulation time, the master (bus) name, the address, the data, the
+latency in clock cycles and if the transaction timed out.  The
+recorder keeps the statistics of all the transactions (not only the
+transactions in the ring buffer): the accesses to each peripheral,
+the latency histograms and the bus utilization.
+
+Usage::
+
+    recorder = TransactionRecorder(clock, depth=1024)
+    recorder.attach(wb, name='cpu')
+
+    @myhdl.block
+    def bench():
+        tbrec = recorder.process()    # counts the clock cycles
+        ...
+
+    recorder.report()
+    recorder.dump('output/trace.bin')
+"""
+
+from __future__ import absolute_import, print_function, division
+
+import struct
+from collections import deque, namedtuple
+
+import myhdl
+from myhdl import instance
+
+from .regfile import Register
+
+
+Transaction = namedtuple('Transaction', [
+    'time',       # simulation time at the start of the transaction
+    'master',     # the name of the bus (master) the transaction is on
+    'write',      # write (True) or read (False)
+    'address',    # the address (first address of a burst)
+    'data',       # the data written or read, a list for a burst
+    'latency',    # the transaction length in clock cycles
+    'timeout',    # the transaction timed out
+    'peripheral'  # the name of the peripheral addressed, None unmapped
+])
+
+
+class TransactionRecorder(object):
+    # the binary trace format, a header, the master names and the
+    # transactions, a transaction is followed by the data words
+    MAGIC = b'RHTR'
+    _header = struct.Struct('<4sHH')
+    _record = struct.Struct('<QHBBQIH')
+    _word = struct.Struct('<Q')
+
+    def __init__(self, clock, depth=1024):
+        """ Memory-mapped bus transaction recorder
+
+        Arguments:
+            clock: the bus clock, the latency is counted in cycles of
+                this clock, the recorder `process` counts the cycles.
+
+        Parameters:
+            depth: the number of transactions kept (ring buffer)
+        """
+        self.clock = clock
+        self.depth = depth
+        self.log = deque(maxlen=depth)
+        self.cycles = 0          # the clock cycles counted
+        self.masters = []
+        self.regions = []        # (name, lo, hi) address regions
+        self.clear()
+
+    def clear(self):
+        """ clear the log and the statistics """
+        self.log.clear()
+        self.num_transactions = 0
+        self.access = {}         # peripheral: [reads, writes, timeouts]
+        self.latency = {}        # peripheral: {cycles: count}
+        self._busy = {mm: 0 for mm in self.masters}  # busy cycles
+        self._busy_all = 0       # busy cycles, any master
+        self._busy_until = 0
+        self._first = self.cycles
+
+    def attach(self, memmap, name=None):
+        """ record the transactions of the bus
+
+        Arguments:
+            memmap (MemoryMapped): the bus, the transactions of the bus
+                transactors are recorded.
+            name (str): the master name, defaults to the bus name
+        """
+        name = memmap.name if name is None else name
+        memmap.recorder = self
+        memmap._recorder_name = name
+        if name not in self.masters:
+            self.masters.append(name)
+            self._busy[name] = 0
+
+    def add_region(self, name, lo, hi):
+        """ name an address range [lo, hi), e.g. a memory peripheral,
+        the register files added to the buses are named by the
+        peripheral name.
+        """
+        self.regions.append((name, lo, hi))
+
+    @myhdl.block
+    def process(self):
+        """ count the clock cycles, the transaction latency """
+        clock = self.clock
+
+        @instance
+        def mon_cycles():
+            while True:
+                yield clock.posedge
+                self.cycles += 1
+
+        return mon_cycles
+
+    def peripheral(self, memmap, address):
+        """ the name of the peripheral at the address on the bus """
+        for name, lo, hi in self.regions:
+            if lo <= address < hi:
+                return name
+        for name, rf in memmap.regfiles.items():
+            addrs = [vv.addr for vv in rf.__dict__.values()
+                     if isinstance(vv, Register)]
+            if len(addrs) > 0 and min(addrs) <= address <= max(addrs):
+                return name
+        return None
+
+    def record(self, memmap, time, start, write, address, data,
+               timeout=False):
+        """ record a transaction, called by the bus transactors
+
+        Arguments:
+            memmap: the bus
+            time: the simulation time at the start of the transaction
+            start: the clock cycle at the start of the transaction
+        """
+        master = memmap._recorder_name
+        latency = self.cycles - start
+        per = self.peripheral(memmap, address)
+        if isinstance(data, (list, tuple)):
+            data = [int(dd) for dd in data]
+        elif data is not None:
+            data = int(data)
+        trans = Transaction(time, master, write, address, data, latency,
+                            timeout, per)
+        self.log.append(trans)
+        self.num_transactions += 1
+
+        cnt = self.access.setdefault(per, [0, 0, 0])
+        cnt[1 if write else 0] += 1
+        cnt[2] += 1 if timeout else 0
+        hist = self.latency.setdefault(per, {})
+        hist[latency] = hist.get(latency, 0) + 1
+
+        # the busy cycles, the overlapping transactions (masters)
+        # are counted once
+        self._busy[master] += latency
+        self._busy_all += max(0, self.cycles - max(start, self._busy_until))
+        self._busy_until = max(self._busy_until, self.cycles)
+        return trans
+
+    def utilization(self, master=None):
+        """ the fraction of the clock cycles the bus (master) is busy
+        since the recorder was cleared.
+        """
+        ncyc = self.cycles - self._first
+        if ncyc == 0:
+            return 0.
+        busy = self._busy_all if master is None else self._busy[master]
+        return busy / ncyc
+
+    def stats(self):
+        """ the statistics of each peripheral, a dict with the number
+        of reads, writes, timeouts, the latency histogram and the
+        mean latency.
+        """
+        stats = {}
+        for per, (reads, writes, timeouts) in self.access.items():
+            hist = self.latency[per]
+            num = sum(hist.values())
+            mean = sum([lat*cnt for lat, cnt in hist.items()]) / num
+            stats[per] = dict(reads=reads, writes=writes, timeouts=timeouts,
+                              latency=dict(hist), mean_latency=mean)
+        return stats
+
+    def report(self):
+        """ print the statistics, the busiest peripheral first """
+        stats = self.stats()
+        print("{} transactions, {} cycles, utilization {:.2f}".format(
+            self.num_transactions, self.cycles - self._first,
+            self.utilization()))
+        for master in self.masters:
+            print("  {:<16s} utilization {:.2f}".format(
+                master, self.utilization(master)))
+        order = sorted(stats.items(),
+                       key=lambda kv: -(kv[1]['reads'] + kv[1]['writes']))
+        for per, st in order:
+            print("  {:<16s} rd {:6d} wr {:6d} to {:4d} latency {:.1f} "
+                  "(max {})".format(str(per), st['reads'], st['writes'],
+                                    st['timeouts'], st['mean_latency'],
+                                    max(st['latency'])))
+
+    def dump(self, filename):
+        """ write the logged transactions to a binary trace file """
+        with open(filename, 'wb') as f:
+            f.write(self._header.pack(self.MAGIC, 1, len(self.masters)))
+            for master in self.masters:
+                name = master.encode('utf-8')
+                f.write(struct.pack('<H', len(name)) + name)
+            for tr in self.log:
+                data = tr.data
+                if data is None:
+                    data = []
+                elif not isinstance(data, list):
+                    data = [data]
+                flags = (1 if tr.write else 0) | (2 if tr.timeout else 0)
+                f.write(self._record.pack(
+                    tr.time, self.masters.index(tr.master), flags,
+                    0, tr.address, tr.latency, len(data)))
+                for dd in data:
+                    f.write(self._word.pack(dd & 0xFFFFFFFFFFFFFFFF))
+
+    @classmethod
+    def load(cls, filename):
+        """ read a binary trace file, a list of `Transaction` (the
+        peripheral is not saved, None).
+        """
+        with open(filename, 'rb') as f:
+            buf = f.read()
+        magic, version, nmasters = cls._header.unpack_from(buf, 0)
+        if magic != cls.MAGIC:
+            raise ValueError("{} is not a transaction trace".format(filename))
+        pos = cls._header.size
+        masters = []
+        for _ in range(nmasters):
+            nlen, = struct.unpack_from('<H', buf, pos)
+            pos += 2
+            masters.append(buf[pos:pos+nlen].decode('utf-8'))
+            pos += nlen
+
+        log = []
+        while pos < len(buf):
+            time, midx, flags, _, address, latency, num = \
+                cls._record.unpack_from(buf, pos)
+            pos += cls._record.size
+            data = [cls._word.unpack_from(buf, pos+ii*8)[0]
+                    for ii in range(num)]
+            pos += num*8
+            data = data[0] if num == 1 else (None if num == 0 else data)
+            log.append(Transaction(time, masters[midx], bool(flags & 1),
+                                   address, data, latency,
+                                   bool(flags & 2), None))
+        return log
@@ -5,7 +5,7 @@
 from copy import deepcopy
 
 import myhdl
-from myhdl import Signal, intbv, always_comb
+from myhdl import Signal, intbv, modbv, always_comb, ConcatSignal
 from myhdl import SignalType
 
 from ..cso import ControlStatusBase
@@ -234,13 +234,65 @@ class RegisterFile(MemorySpace):
         _rrw = [False for aa, rr in self._rwregs]
         roa = [aa for aa, rr in self._roregs]       # ro address
         ror = [rr for aa, rr in self._roregs]       # ro register
-        _rro = [True for aa, rr in self._rwregs]
+        _rro = [True for aa, rr in self._roregs]
         self._allregs = rwr+ror
         dl = [rr.default for aa,rr in self._rwregs+self._roregs]
-        # @todo: order the list from low address to high address
-        # @todo: set flag if addresses are contiguous
         return tuple(rwa+roa), rwr+ror, tuple(_rrw+_rro), tuple(dl)
 
+    def get_decode(self):
+        """ get the address decode for the registers
+
+        The register index is the position in the `get_reglist` lists,
+        the read-write registers are first.  If the register addresses
+        are contiguous (in the index order) the index is the address
+        offset.  Otherwise a few of the address offset bits index a
+        lookup table, the fewest bits that are unique for the register
+        addresses are used.
+
+        Returns:
+            lo (int): the lowest register address
+            shift (int): the offset bits below the index, 2 if all the
+                registers are word (4 byte) aligned.
+            contiguous (bool): the index is the (shifted) offset
+            bits (tuple): the (shifted) offset bits used to index
+                the lookup table
+            table (tuple): the register index lookup, `nregs` marks
+                no register.
+            offsets (tuple): the address offset of each register
+        """
+        addrs = [aa for aa, rr in self._rwregs+self._roregs]
+        assert len(addrs) > 0, "empty register file"
+        assert len(set(addrs)) == len(addrs), "duplicate register address"
+        nregs = len(addrs)
+        lo = min(addrs)
+        offsets = tuple([aa - lo for aa in addrs])
+        shift = 2 if all([off % 4 == 0 for off in offsets]) else 0
+        words = [off >> shift for off in offsets]
+        contiguous = words == list(range(nregs))
+
+        # select the fewest offset bits that are unique for all the
+        # registers, the selected bits index the lookup table
+        def _keys(bits):
+            return set([sum([((ww >> bb) & 1) << ii
+                             for ii, bb in enumerate(bits)])
+                        for ww in words])
+
+        bits, nbits = [], max(max(words).bit_length(), 1)
+        while len(bits) == 0 or len(_keys(bits)) != nregs:
+            cands = [bb for bb in range(nbits) if bb not in bits]
+            best = max(cands, key=lambda bb: len(_keys(bits+[bb])))
+            bits = sorted(bits + [best])
+        table = [nregs for _ in range(2**len(bits))]
+        for ii, ww in enumerate(words):
+            key = sum([((ww >> bb) & 1) << jj for jj, bb in enumerate(bits)])
+            table[key] = ii
+
+        return lo, shift, contiguous, tuple(bits), tuple(table), offsets
+
+    @property
+    def contiguous(self):
+        return self.get_decode()[2]
+
     def get_strobelist(self):
         assert self._allregs is not None
         wr = [rr.wr for rr in self._allregs]
@@ -254,6 +306,76 @@ class RegisterFile(MemorySpace):
             assign_inst += [rr.assign_namedbits()]
         return assign_inst
 
+    @myhdl.block
+    def get_decoder(self, address, base_address, regsel, regidx):
+        """ decode the bus address to a register index
+
+        The bus adapters (`peripheral_regfile`) use the register index
+        to access the register and strobe lists instead of comparing
+        the address to each register address.  A contiguous register
+        file uses the address offset as the index, a sparse register
+        file uses a lookup table (ROM) on a few offset bits and
+        compares the offset with the one register found.
+
+        Ports:
+            address: the bus address
+            regsel: output, the address is a register in this file
+            regidx: output, the register index, see `get_reglist`
+
+        Parameters:
+            base_address: the register file base address
+        """
+        lo, shift, contiguous, bits, table, offsets = self.get_decode()
+        lo = lo + base_address
+        nregs = len(offsets)
+        maxoff = max(offsets)
+        amask = 2**shift - 1
+
+        # the address offset from the lowest register address, an
+        # address below wraps to a large offset
+        offset = Signal(modbv(0)[len(address):])
+
+        @always_comb
+        def beh_offset():
+            offset.next = address - lo
+
+        if contiguous:
+            @always_comb
+            def beh_decode():
+                if offset <= maxoff and (offset & amask) == 0:
+                    regsel.next = True
+                    regidx.next = offset >> shift
+                else:
+                    regsel.next = False
+                    regidx.next = 0
+
+        else:
+            regkey = ConcatSignal(*[offset(bb+shift)
+                                    for bb in reversed(bits)])
+            lookup = Signal(intbv(0, min=0, max=nregs+1))
+            lkoff = Signal(intbv(0, min=0, max=maxoff+1))
+            # the offset for each index, no register (nregs) included
+            offsets = offsets + (0,)
+
+            @always_comb
+            def beh_lookup():
+                lookup.next = table[regkey]
+
+            @always_comb
+            def beh_lookup_offset():
+                lkoff.next = offsets[lookup]
+
+            @always_comb
+            def beh_decode():
+                if lookup < nregs and offset == lkoff:
+                    regsel.next = True
+                    regidx.next = lookup
+                else:
+                    regsel.next = False
+                    regidx.next = 0
+
+        return myhdl.instances()
+
 
 def build_register_file(cso):
     """ Build a register file from a control-status object.
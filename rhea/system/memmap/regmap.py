@@ -0,0 +1,263 @@
+"""
+Register map artifacts from the register files on a memory-mapped bus.
+
+The register addresses are assigned when the register files are added
+to a bus (`MemoryMapped.add`), the exporters walk the bus register
+files and generate the register map for the host software:
+
+    get_regmap: the register map (dict)
+    regmap_to_json: the register map as JSON
+    regmap_to_c_header: a C header with the address, mask and shift
+        defines of each register and named bits
+    regmap_to_python: a Python module with a client class with the
+        address, mask and shift constants and the register
+        (read-modify-write) access methods
+    export_regmap: write the JSON, C header and Python files
+
+Usage::
+
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    inst = wb.add(regfile, peripheral_name='spi')
+    export_regmap(wb, 'output/regmap', 'mysys')
+"""
+
+from __future__ import absolute_import
+
+import os
+import re
+import json
+
+from .regfile import Register
+
+
+def _name(*names):
+    """ a C / Python identifier from the names """
+    name = "_".join([str(nn) for nn in names if nn not in (None, '')])
+    return re.sub(r'[^0-9A-Za-z_]', '_', name).upper()
+
+
+def get_regmap(memmap, name=None):
+    """ get the register map of the register files on a bus
+
+    Arguments:
+        memmap (MemoryMapped): the bus, the register files have been
+            added to the bus (`add`).
+        name (str): the register map name, defaults to the bus name
+
+    Returns:
+        A dict with the bus information and a list of peripherals,
+        each peripheral has a list of registers (sorted by address)
+        and each register a list of named bits.  The addresses are
+        the bus addresses (base address included).
+    """
+    name = memmap.name if name is None else name
+    dmask = 2**memmap.data_width - 1
+    peripherals = []
+    for pname, rf in sorted(memmap.regfiles.items(),
+                            key=lambda kv: kv[1].base_address):
+        regs = [vv for vv in rf.__dict__.values() if isinstance(vv, Register)]
+        registers = []
+        for reg in sorted(regs, key=lambda rr: rr.addr):
+            bits = []
+            for bname, bb in sorted(reg.bits.items(),
+                                    key=lambda kv: kv[1].b.stop):
+                width = bb.b.start - bb.b.stop
+                bits.append(dict(
+                    name=bname, shift=bb.b.stop, width=width,
+                    mask=((2**width - 1) << bb.b.stop) & dmask,
+                    comment=bb.comment))
+            registers.append(dict(
+                name=reg.name, address=reg.addr,
+                offset=reg.addr - rf.base_address,
+                width=reg.width, access=reg.access,
+                default=int(reg.default), mask=2**reg.width - 1,
+                comment=reg.comment, bits=bits))
+        peripherals.append(dict(name=pname, base_address=rf.base_address,
+                                registers=registers))
+
+    return dict(name=name, data_width=memmap.data_width,
+                address_width=memmap.address_width,
+                peripherals=peripherals)
+
+
+def regmap_to_json(regmap):
+    """ the register map as a JSON string """
+    return json.dumps(regmap, indent=2)
+
+
+def regmap_to_c_header(regmap):
+    """ the register map as a C header
+
+    For each register `<MAP>_<PERIPHERAL>_<REGISTER>` the `_ADDR`,
+    `_DEFAULT` and `_MASK` are defined and for each named bit
+    `<MAP>_<PERIPHERAL>_<REGISTER>_<BITS>` the `_MASK` and `_SHIFT`,
+    the `_GET` and `_SET` macros extract and insert the named bits.
+    """
+    prefix = _name(regmap['name'])
+    guard = "{}_REGMAP_H".format(prefix)
+    lines = ["/* register map {}, generated do not edit */".format(
+             regmap['name']),
+             "#ifndef {}".format(guard), "#define {}".format(guard), "",
+             "#define {}_GET(val, bits) "
+             "(((val) & bits##_MASK) >> bits##_SHIFT)".format(prefix),
+             "#define {}_SET(val, bits, x) (((val) & ~bits##_MASK) | "
+             "(((x) << bits##_SHIFT) & bits##_MASK))".format(prefix), ""]
+
+    def define(name, value):
+        lines.append("#define {:<47s} 0x{:08X}U".format(name, value))
+
+    for per in regmap['peripherals']:
+        lines.append("/* {} */".format(per['name']))
+        define(_name(prefix, per['name'], 'BASE'), per['base_address'])
+        for reg in per['registers']:
+            rname = _name(prefix, per['name'], reg['name'])
+            if reg['comment']:
+                lines.append("/* {}: {} */".format(reg['name'],
+                                                   reg['comment']))
+            define(rname + '_ADDR', reg['address'])
+            define(rname + '_DEFAULT', reg['default'])
+            define(rname + '_MASK', reg['mask'])
+            for bb in reg['bits']:
+                bname = _name(rname, bb['name'])
+                define(bname + '_MASK', bb['mask'])
+                lines.append("#define {:<47s} {}".format(
+                    bname + '_SHIFT', bb['shift']))
+        lines.append("")
+
+    lines += ["#endif /* {} */".format(guard), ""]
+    return "\n".join(lines)
+
+
+_python_client = '''# register map {name}, generated do not edit
+
+
+class {classname}(object):
+    """ register map {name}, generated do not edit
+
+    The register access functions are passed to the client, the
+    optional `read_many` and `write_many` functions access multiple
+    registers at once (e.g. a `CommandPipeline`).
+
+        regs = {classname}(read, write)
+        regs.write_bits(regs.{example}, 1)
+    """
+    DATA_WIDTH = {data_width}
+
+{constants}
+
+    def __init__(self, read, write, read_many=None, write_many=None):
+        self._read = read
+        self._write = write
+        self._read_many = read_many
+        self._write_many = write_many
+
+    def read(self, addr):
+        return self._read(addr)
+
+    def write(self, addr, val):
+        self._write(addr, val)
+
+    def read_many(self, addrs):
+        if self._read_many is not None:
+            return list(self._read_many(addrs))
+        return [self._read(addr) for addr in addrs]
+
+    def write_many(self, addrs, vals):
+        if self._write_many is not None:
+            self._write_many(addrs, vals)
+        else:
+            for addr, val in zip(addrs, vals):
+                self._write(addr, val)
+
+    @staticmethod
+    def get_bits(val, bits):
+        """ extract the named bits, `bits` is an (addr, mask, shift) """
+        return (val & bits[1]) >> bits[2]
+
+    @staticmethod
+    def set_bits(val, bits, x):
+        """ insert the named bits """
+        return (val & ~bits[1]) | ((x << bits[2]) & bits[1])
+
+    def read_bits(self, bits):
+        return self.get_bits(self._read(bits[0]), bits)
+
+    def write_bits(self, bits, x):
+        """ read-modify-write of the named bits """
+        self.modify([(bits, x)])
+
+    def modify(self, updates):
+        """ batched read-modify-write
+
+        The updates are a list of (bits, value), the registers
+        are read once and written once.
+        """
+        addrs = []
+        for bits, x in updates:
+            if bits[0] not in addrs:
+                addrs.append(bits[0])
+        vals = dict(zip(addrs, self.read_many(addrs)))
+        for bits, x in updates:
+            vals[bits[0]] = self.set_bits(vals[bits[0]], bits, x)
+        self.write_many(addrs, [vals[addr] for addr in addrs])
+'''
+
+
+def regmap_to_python(regmap, classname=None):
+    """ the register map as a Python module with a client class
+
+    The class has a constant for each register address (`<PERIPHERAL>_
+    <REGISTER>`) and for each named bit (`<PERIPHERAL>_<REGISTER>_<BITS>`)
+    an (address, mask, shift) tuple.
+    """
+    if classname is None:
+        classname = "".join([ss.capitalize() for ss in
+                             _name(regmap['name']).split('_')]) + "Regs"
+    constants, example = [], None
+    for per in regmap['peripherals']:
+        constants.append("    # {}".format(per['name']))
+        constants.append("    {} = 0x{:08X}".format(
+            _name(per['name'], 'BASE'), per['base_address']))
+        for reg in per['registers']:
+            rname = _name(per['name'], reg['name'])
+            constants.append("    {} = 0x{:08X}".format(rname,
+                                                      reg['address']))
+            for bb in reg['bits']:
+                bname = _name(rname, bb['name'])
+                example = bname if example is None else example
+                constants.append("    {} = (0x{:08X}, 0x{:08X}, {})".format(
+                    bname, reg['address'], bb['mask'], bb['shift']))
+    if example is None:
+        example = "<BITS>"
+
+    return _python_client.format(
+        classname=classname, name=regmap['name'], example=example,
+        data_width=regmap['data_width'], constants="\n".join(constants))
+
+
+def export_regmap(memmap, path='output/regmap', name=None):
+    """ write the JSON, C header and Python register map files
+
+    Arguments:
+        memmap (MemoryMapped): the bus with the register files
+        path (str): the output directory
+        name (str): the register map name, the file names are
+            `<name>_regmap.json`, `<name>_regmap.h` and
+            `<name>_regmap.py`.
+
+    Returns:
+        The list of files written.
+    """
+    regmap = get_regmap(memmap, name)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    base = re.sub(r'[^0-9A-Za-z_]', '_', regmap['name']).lower()
+    files = []
+    for ext, text in (('json', regmap_to_json(regmap)),
+                      ('h', regmap_to_c_header(regmap)),
+                      ('py', regmap_to_python(regmap))):
+        filename = os.path.join(path, "{}_regmap.{}".format(base, ext))
+        with open(filename, 'w') as f:
+            f.write(text)
+        files.append(filename)
+    return files
@@ -16,7 +16,14 @@ from . import Barebone
 class Wishbone(MemoryMapped):
     name = 'wishbone'
 
-    def __init__(self, glbl=None, data_width=8, address_width=16, name=None):
+    # cycle type identifier (cti) values
+    CTI_CLASSIC = 0
+    CTI_CONST = 1
+    CTI_INCR = 2
+    CTI_END = 7
+
+    def __init__(self, glbl=None, data_width=8, address_width=16, name=None,
+                 pipelined=False):
         """ Wishbose bus object
         Parameters (kwargs):
         --------------------
@@ -24,6 +31,9 @@ class Wishbone(MemoryMapped):
           :param data_width: data bus width
           :param address_width: address bus width
           :param name: name for the bus
+          :param pipelined: Wishbone B4 pipelined mode, a peripheral
+            accepts a request each clock (unless `stall_o`) and acks
+            it on the next clock.
         """
         # @todo: ?? not sure if this how the arguments should
         #        should be handled.  Passing args is simple but a
@@ -48,42 +58,68 @@ class Wishbone(MemoryMapped):
         self.stb_i = Signal(bool(0))
         self.adr_i = Signal(intbv(0)[address_width:])
         self.we_i = Signal(bool(0))
-        self.sel_i = Signal(bool(0))
+        # the byte select, all the bytes if not driven
+        nsel = (data_width + 7) // 8
+        self.sel_i = Signal(intbv(2**nsel-1)[nsel:])
         self.dat_i = Signal(intbv(0)[data_width:])
+        self.cti_i = Signal(intbv(0)[3:])    # cycle type identifier
+        self.bte_i = Signal(intbv(0)[2:])    # burst type extension
 
         # outputs from the peripherals
         self.dat_o = Signal(intbv(0)[data_width:])
         self.ack_o = Signal(bool(0))
+        self.stall_o = Signal(bool(0))
 
         # peripheral outputs
         self._pdat_o = []
         self._pack_o = []
+        self._pstall_o = []
+
+        self.pipelined = pipelined
 
         self.timeout = 1111
 
         self._add_bus(name)
         
-    def add_output_bus(self, dat, ack):
+    def add_output_bus(self, dat, ack, stall=None):
         self._pdat_o.append(dat)
         self._pack_o.append(ack)
+        self._pstall_o.append(Signal(bool(0)) if stall is None else stall)
 
     @myhdl.block
     def interconnect(self):
         """ combine all the peripheral outputs
+        In the pipelined mode the outputs are combined without a
+        register, the peripherals register the ack and data.
         """
         assert len(self._pdat_o) == len(self._pack_o)
         ndevs = len(self._pdat_o)
         wb = self
-        
-        @always_seq(self.clk_i.posedge, reset=self.rst_i)
-        def beh_or_combine():
-            dats = 0
-            acks = 0
-            for ii in range(ndevs):
-                dats = dats | wb._pdat_o[ii]
-                acks = acks | wb._pack_o[ii]
-            wb.dat_o.next = dats
-            wb.ack_o.next = acks
+
+        if self.pipelined:
+            @always_comb
+            def beh_or_combine():
+                dats = 0
+                acks = False
+                stalls = False
+                for ii in range(ndevs):
+                    dats = dats | wb._pdat_o[ii]
+                    acks = acks or wb._pack_o[ii]
+                    stalls = stalls or wb._pstall_o[ii]
+                wb.dat_o.next = dats
+                wb.ack_o.next = acks
+                wb.stall_o.next = stalls
+
+        else:
+            @always_seq(self.clk_i.posedge, reset=self.rst_i)
+            def beh_or_combine():
+                dats = 0
+                acks = 0
+                for ii in range(ndevs):
+                    dats = dats | wb._pdat_o[ii]
+                    acks = acks | wb._pack_o[ii]
+                wb.dat_o.next = dats
+                wb.ack_o.next = acks
             
         return beh_or_combine
 
@@ -91,6 +127,9 @@ class Wishbone(MemoryMapped):
     def peripheral_regfile(self, regfile, name=''):
         """ memory-mapped wishbone peripheral interface
         """
+        if self.pipelined:
+            pipe_inst = self.peripheral_regfile_pipelined(regfile, name)
+            return pipe_inst
 
         # local alias
         wb = self     # register bus
@@ -110,6 +149,7 @@ class Wishbone(MemoryMapped):
         pwr, prd = rf.get_strobelist()
 
         nregs = len(regs_list)
+        nrw = len(rf.rwregs)
         max_address = base_address + max(addr_list)
 
         lwb_do = Signal(intbv(0)[self.data_width:])
@@ -121,6 +161,14 @@ class Wishbone(MemoryMapped):
         ackcnt = Signal(intbv(num_ackcyc, min=0, max=num_ackcyc+1))
         newcyc = Signal(bool(0))
 
+        # the address decode, the index of the addressed register and
+        # the index of the last register read and write strobes
+        regsel = Signal(bool(0))
+        regidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        rdidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        wridx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        decode_inst = rf.get_decoder(wb.adr_i, base_address, regsel, regidx)
+
         if self._debug:
             @instance 
             def debug_check():
@@ -145,7 +193,7 @@ class Wishbone(MemoryMapped):
 
         @always_seq(clock.posedge, reset=reset)
         def beh_selected():
-            if (wb.cyc_i and wb.adr_i >= base_address and wb.adr_i < max_address):
+            if wb.cyc_i and regsel:
                 lwb_sel.next = True
             else:
                 lwb_sel.next = False
@@ -169,35 +217,28 @@ class Wishbone(MemoryMapped):
             else:
                 lwb_ack.next = False
 
-        # @todo: scan the register list, if it is contiguous remove
-        #        the base and use the offset directly to access the
-        #        register list instead of the for loop
-        # if rf.contiguous:
-        #     @always_seq(rb.clk_i.posedge, reset=rb.rst_i)
-        #     def rtl_read():
-        # else:
-
         # Handle a bus read (transfer the addressed register to the
         # data bus) and generate the register read pulse (let the
         # peripheral know the register has been read).
-        # @always_seq(clock.posedge, reset=reset)
         @always_comb
         def beh_read():
             if lwb_sel and not lwb_wr and newcyc:
-                for ii in range(nregs):
-                    aa = addr_list[ii]
-                    aa = aa + base_address
-                    if wb.adr_i == aa:
-                        lwb_do.next = regs_list[ii]
-                        prd[ii].next = True
+                lwb_do.next = regs_list[regidx]
+                prd[regidx].next = True
             else:
+                # only the last read strobe needs to be cleared
                 lwb_do.next = 0
-                for ii in range(nregs):
-                    prd[ii].next = False
+                prd[rdidx].next = False
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_read_index():
+            if lwb_sel and not lwb_wr and newcyc:
+                rdidx.next = regidx
                         
         # Handle a bus write (transfer the data bus to the addressed
         # register) and generate a register write pulse (let the 
-        # peripheral know the register has been written).
+        # peripheral know the register has been written).  The
+        # read-write registers are first in the register list.
         @always(clock.posedge)
         def beh_write():
             if reset == int(reset.active):
@@ -207,18 +248,87 @@ class Wishbone(MemoryMapped):
                     if not ro:
                         regs_list[ii].next = dd
                     pwr[ii].next = False
+                wridx.next = 0
             else:
-                if lwb_wr and lwb_sel and newcyc:
-                    for ii in range(nregs):
-                        aa = addr_list[ii]
-                        aa = aa + base_address
-                        ro = rol[ii]
-                        if not ro and wb.adr_i == aa:
-                            regs_list[ii].next = wb.dat_i
-                            pwr[ii].next = True
-                else:
-                    for ii in range(nregs):
-                        pwr[ii].next = False
+                # only the last write strobe needs to be cleared
+                pwr[wridx].next = False
+                if lwb_wr and lwb_sel and newcyc and regidx < nrw:
+                    regs_list[regidx].next = wb.dat_i
+                    pwr[regidx].next = True
+                    wridx.next = regidx
+
+        # get the generators that assign the named bits
+        assign_inst = regfile.get_assigns()
+
+        return myhdl.instances()
+
+    @myhdl.block
+    def peripheral_regfile_pipelined(self, regfile, name=''):
+        """ pipelined (B4) memory-mapped wishbone peripheral interface
+
+        A request (`cyc_i` and `stb_i`) to a register in the register
+        file is accepted each clock and acked on the next clock, the
+        register file never stalls.  The address is decoded for each
+        request, the cycle type (`cti_i`, `bte_i`) is not needed,
+        an incrementing burst is a sequence of requests.
+        """
+        wb = self     # register bus
+        rf = regfile  # register file definition
+        clock, reset = wb.clk_i, wb.rst_i
+
+        base_address = regfile.base_address
+        if base_address is None:
+            base_address = 0
+
+        al, rl, rol, dl = rf.get_reglist()
+        regs_list = rl
+        pwr, prd = rf.get_strobelist()
+        nregs = len(regs_list)
+        nrw = len(rf.rwregs)
+
+        lwb_do = Signal(intbv(0)[self.data_width:])
+        lwb_ack, lwb_stall = Signal(bool(0)), Signal(bool(0))
+        wb.add_output_bus(lwb_do, lwb_ack, lwb_stall)
+
+        # the address decode, the index of the addressed register and
+        # the index of the last register read and write strobes
+        regsel = Signal(bool(0))
+        regidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        rdidx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        wridx = Signal(intbv(0, min=0, max=max(2, nregs)))
+        decode_inst = rf.get_decoder(wb.adr_i, base_address, regsel, regidx)
+
+        @always(clock.posedge)
+        def beh_pipeline():
+            if reset == int(reset.active):
+                for ii in range(nregs):
+                    ro = rol[ii]
+                    dd = dl[ii]
+                    if not ro:
+                        regs_list[ii].next = dd
+                    pwr[ii].next = False
+                    prd[ii].next = False
+                rdidx.next = 0
+                wridx.next = 0
+                lwb_ack.next = False
+                lwb_do.next = 0
+            else:
+                # only the last strobes need to be cleared
+                prd[rdidx].next = False
+                pwr[wridx].next = False
+                lwb_ack.next = False
+                lwb_do.next = 0
+                if wb.cyc_i and wb.stb_i and regsel:
+                    lwb_ack.next = True
+                    if wb.we_i:
+                        if regidx < nrw:
+                            regs_list[regidx].next = wb.dat_i
+                            pwr[regidx].next = True
+                            wridx.next = regidx
+                    else:
+                        lwb_do.next = regs_list[regidx]
+                        prd[regidx].next = True
+                        rdidx.next = regidx
 
         # get the generators that assign the named bits
         assign_inst = regfile.get_assigns()
@@ -249,6 +359,7 @@ class Wishbone(MemoryMapped):
             bb.write.next = wb.cyc_i and wb.we_i
             bb.read.next = wb.cyc_i and not wb.we_i
             bb.write_data.next = wb.dat_i
+            bb.byte_enable.next = wb.sel_i
             lwb_do.next = bb.read_data
             bb.per_addr.next = wb.adr_i[:16]
             bb.mem_addr.next = wb.adr_i[16:]
@@ -276,16 +387,20 @@ class Wishbone(MemoryMapped):
         def beh_assign():
             if bb.write or bb.read:
                 wb.cyc_i.next = True
+                wb.stb_i.next = True
                 wb.we_i.next = True if bb.write else False
             elif inprog:
                 wb.cyc_i.next = True
+                wb.stb_i.next = True
                 wb.we_i.next = True if iswrite else False
             else:
                 wb.cyc_i.next = False
+                wb.stb_i.next = False
                 wb.we_i.next = False
 
             wb.adr_i.next = concat(bb.per_addr, bb.mem_addr)
             wb.dat_i.next = bb.write_data
+            wb.sel_i.next = bb.byte_enable
             bb.read_data.next = wb.dat_o
 
         @always(clock.posedge)
@@ -304,11 +419,67 @@ class Wishbone(MemoryMapped):
         return myhdl.instances()
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    def _pipelined_cycle(self, addr, num, vals=None, incr=4):
+        """ a pipelined bus cycle, a request each clock
+
+        The requests are issued while the previous requests are acked,
+        a burst (num > 1) is an incrementing burst (`cti_i`), the
+        words read are saved to `_read_data`.
+        """
+        write = vals is not None
+        rvals = []
+        yield self.clk_i.posedge
+        self.cyc_i.next = True
+        self.we_i.next = write
+        self.bte_i.next = 0   # linear burst
+        issued, acked, to = 0, 0, 0
+        while acked < num and to < self.timeout:
+            stb = issued < num
+            if stb:
+                self.adr_i.next = addr + issued*incr
+                if write:
+                    self.dat_i.next = vals[issued]
+                if num == 1:
+                    self.cti_i.next = self.CTI_CLASSIC
+                elif issued == num-1:
+                    self.cti_i.next = self.CTI_END
+                else:
+                    self.cti_i.next = self.CTI_INCR
+            self.stb_i.next = stb
+            yield self.clk_i.posedge
+            to += 1
+            # the request is accepted if the peripheral did not stall
+            if stb and not self.stall_o:
+                issued += 1
+            if self.ack_o:
+                rvals.append(int(self.dat_o))
+                acked += 1
+                to = 0
+        self._timedout = to >= self.timeout
+        self.cyc_i.next = False
+        self.stb_i.next = False
+        self.we_i.next = False
+        self.cti_i.next = self.CTI_CLASSIC
+        if not write:
+            # a timeout, the words not acked are read as 0
+            rvals += [0] * (num - len(rvals))
+            self._read_data = rvals if num > 1 else rvals[0]
+
     def writetrans(self, addr, val):
         """ write accessor for testbenches
         Not convertible.
         """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            yield self._tlm_trans(reg, addr, val)
+            return
+
         self._start_transaction(write=True, address=addr, data=val)
+        if self.pipelined:
+            yield self._pipelined_cycle(addr, 1, [val])
+            self._end_transaction()
+            return
+
         # toggle the signals for the bus transaction
         yield self.clk_i.posedge
         self.adr_i.next = addr
@@ -321,6 +492,7 @@ class Wishbone(MemoryMapped):
         while not self.ack_o and to < self.timeout:
             yield self.clk_i.posedge
             to += 1
+        self._timedout = to >= self.timeout
         self.we_i.next = False
         self.cyc_i.next = False
         self.stb_i.next = False
@@ -330,7 +502,17 @@ class Wishbone(MemoryMapped):
     def readtrans(self, addr):
         """ read accessor for testbenches
         """
+        reg = self._tlm_register(addr)
+        if reg is not None:
+            yield self._tlm_trans(reg, addr)
+            return
+
         self._start_transaction(write=False, address=addr)
+        if self.pipelined:
+            yield self._pipelined_cycle(addr, 1)
+            self._end_transaction()
+            return
+
         yield self.clk_i.posedge
         self.adr_i.next = addr
         self.cyc_i.next = True
@@ -339,10 +521,43 @@ class Wishbone(MemoryMapped):
         while not self.ack_o and to < self.timeout:
             yield self.clk_i.posedge
             to += 1
+        self._timedout = to >= self.timeout
         self.cyc_i.next = False
         self.stb_i.next = False
         self._end_transaction(self.dat_o)
 
+    def writeburst(self, addr, vals, incr=4):
+        """ incrementing burst write accessor for testbenches
+
+        In the pipelined mode a word is written each clock, otherwise
+        the burst is a sequence of single writes.
+        """
+        self._start_transaction(write=True, address=addr, data=vals)
+        if self.pipelined:
+            yield self._pipelined_cycle(addr, len(vals), vals, incr)
+        else:
+            for ii, val in enumerate(vals):
+                yield self.writetrans(addr + ii*incr, val)
+        self._end_transaction()
+
+    def readburst(self, addr, num, incr=4):
+        """ incrementing burst read accessor for testbenches
+
+        The words read are returned by `get_read_data` (list).
+        """
+        self._start_transaction(write=False, address=addr)
+        if self.pipelined:
+            yield self._pipelined_cycle(addr, num, incr=incr)
+            if num == 1:
+                self._read_data = [self._read_data]
+        else:
+            rvals = []
+            for ii in range(num):
+                yield self.readtrans(addr + ii*incr)
+                rvals.append(self.get_read_data())
+            self._read_data = rvals
+        self._end_transaction()
+
     def acktrans(self, data=None):
         """ acknowledge accessor for testbenches
         :param data:
@@ -3,6 +3,9 @@
 # See the licence file in the top directory
 #
 
+from itertools import repeat
+from random import Random
+
 import myhdl
 from myhdl import Signal, intbv, always_comb
 from ..clock import Clock
@@ -20,18 +23,51 @@ def _add_bus(fb, name=''):
     _fb_list[name] = fb
 
 
+def _stream_pattern(pattern, seed=None):
+    """ the enables of a stream transactor, one per clock cycle
+
+    The `pattern` is None (always enabled), a float, the probability
+    the transactor is enabled in a clock cycle, or an iterable of
+    bools (e.g. `itertools.cycle([1, 1, 0])`).
+    """
+    if pattern is None:
+        return repeat(True)
+    elif isinstance(pattern, float):
+        rng = Random(seed)
+        return (rng.random() < pattern for _ in repeat(None))
+    else:
+        return iter(pattern)
+
+
+_end = object()
+
+
 class FIFOBus(Streamers):
-    def __init__(self, width=8):
+    def __init__(self, width=8, level_width=16):
         """ A FIFO interface
         This interface encapsulates the signals required to interface
         to a FIFO.  This object also contains the configuration
         information of a FIFO: word width and the FIFO size (depth).
 
-        Arguments:
-            size (int): The depth of the FIFO, the maximum number of
-                elements a FIFO can hold.
+        The `write_last` and `read_last` mark the last word of a
+        packet (frame), `rollback` drops a partially written packet,
+        these are used by the packet FIFO (`fifo_packet`) and ignored
+        by the other FIFOs.
+
+        The `almost_full` flag is set when the FIFO has
+        `almost_full_level` or fewer vacant slots and the
+        `almost_empty` flag is set when the FIFO has
+        `almost_empty_level` or fewer words.  The levels are inputs to
+        the FIFO, they can be constant or programmed (e.g. from a
+        register), by default the flags are set one word from full
+        and one word from empty.  The flags let a producer or a
+        consumer move a burst of words without checking the full or
+        empty each word.
 
+        Arguments:
             width (int): The width of the elements in the FIFO.
+            level_width (int): The width of the almost full and
+                almost empty levels.
         """
         self.name = "fifobus{0}".format(_fb_num)
 
@@ -52,8 +88,21 @@ class FIFOBus(Streamers):
         self.empty = Signal(bool(1))                # fifo empty
         self.full = Signal(bool(0))                 # fifo full
 
-        # The FIFO instance will attached the FIFO count
+        # packet (frame) boundaries
+        self.write_last = Signal(bool(0))           # last word written
+        self.read_last = Signal(bool(0))            # last word read
+        self.rollback = Signal(bool(0))             # drop partial packet
+
+        # almost full and almost empty flags and thresholds
+        self.almost_full = Signal(bool(0))
+        self.almost_empty = Signal(bool(1))
+        self.almost_full_level = Signal(intbv(1)[level_width:])
+        self.almost_empty_level = Signal(intbv(1)[level_width:])
+
+        # The FIFO instance will attached the FIFO count, the number
+        # of words in the FIFO, the packet FIFO the packet count
         self.count = None
+        self.packet_count = None
 
         self.width = width
 
@@ -95,6 +144,109 @@ class FIFOBus(Streamers):
             data = int(self.read_data)
         self._end_transaction(data)
 
+    def write_stream(self, data, pattern=None, last=False, clock=None,
+                     seed=None, timeout=4000):
+        """ Write a stream of words to the FIFO
+
+        This generator writes all the words in `data` (an iterable,
+        e.g. a list, bytearray or NumPy array), a word each clock
+        cycle the FIFO is not full and the `pattern` enables the
+        write.  The bus is driven on the falling edge of the clock,
+        the flags are settled, the FIFO captures the word on the
+        next rising edge.
+
+        Arguments:
+            data (iterable): the words to write
+            pattern: the write enable (back-pressure) pattern, see
+                `_stream_pattern`, by default a word each clock.
+            last (bool): set `write_last` with the last word, the
+                words are a packet.
+            clock (Clock): defaults to the bus `write_clock`
+            seed (int): the random pattern seed
+            timeout (int): clock cycles without a write, the FIFO
+                is stuck full.
+
+        Usage::
+
+            yield fifobus.write_stream(range(64), pattern=0.5)
+        """
+        clock = self.write_clock if clock is None else clock
+        enables = _stream_pattern(pattern, seed)
+        write, write_data, full = self.write, self.write_data, self.full
+        write_last = self.write_last
+
+        words = iter(data)
+        word, following = next(words, _end), next(words, _end)
+        stall = 0
+        while word is not _end:
+            yield clock.negedge
+            if not full and next(enables):
+                write.next = True
+                write_data.next = int(word)
+                if last:
+                    write_last.next = following is _end
+                word, following = following, next(words, _end)
+                stall = 0
+            else:
+                write.next = False
+                stall += 1
+                if stall == timeout:
+                    raise TimeoutError
+        yield clock.negedge
+        write.next = False
+        write_last.next = False
+
+    def read_stream(self, buf, num=None, pattern=None, clock=None,
+                    seed=None, timeout=4000):
+        """ Read a stream of words from the FIFO
+
+        This generator reads `num` words into the preallocated buffer
+        `buf` (a list, bytearray or NumPy array), a word each clock
+        cycle the FIFO is not empty and the `pattern` enables the
+        read.  The read is driven on the falling edge of the clock and
+        the word is captured, with the `read_valid`, on the rising
+        edge (two resumes per word), a "read acknowledge" FIFO is
+        expected.
+
+        Arguments:
+            buf: the buffer the words are written to
+            num (int): the number of words to read, defaults to the
+                length of the buffer.
+            pattern: the read enable (back-pressure) pattern, see
+                `_stream_pattern`, by default a word each clock.
+            clock (Clock): defaults to the bus `read_clock`
+            seed (int): the random pattern seed
+            timeout (int): clock cycles without a read, the FIFO is
+                stuck empty.
+
+        Usage::
+
+            buf = bytearray(64)
+            yield fifobus.read_stream(buf, pattern=0.5)
+        """
+        clock = self.read_clock if clock is None else clock
+        enables = _stream_pattern(pattern, seed)
+        read, read_data = self.read, self.read_data
+        read_valid, empty = self.read_valid, self.empty
+        num = len(buf) if num is None else num
+        assert num <= len(buf)
+
+        ii, stall = 0, 0
+        while ii < num:
+            yield clock.negedge
+            read.next = not empty and next(enables)
+            yield clock.posedge
+            if read_valid:
+                buf[ii] = int(read_data)
+                ii += 1
+                stall = 0
+            else:
+                stall += 1
+                if stall == timeout:
+                    raise TimeoutError
+        yield clock.negedge
+        read.next = False
+
     @myhdl.block
     def assign_read_write_paths(self, readpath, writepath):
         """
@@ -127,12 +279,19 @@ class FIFOBus(Streamers):
             # write, from self perspective, self will be writing
             writepath.write.next = self.write
             writepath.write_data.next = self.write_data
+            writepath.write_last.next = self.write_last
+            writepath.rollback.next = self.rollback
+            writepath.almost_full_level.next = self.almost_full_level
             self.full.next = writepath.full
+            self.almost_full.next = writepath.almost_full
 
             # read, from self perspective, self will be reading
             readpath.read.next = self.read
             self.read_data.next = readpath.read_data
             self.read_valid.next = readpath.read_valid
+            self.read_last.next = readpath.read_last
+            readpath.almost_empty_level.next = self.almost_empty_level
             self.empty.next = readpath.empty
+            self.almost_empty.next = readpath.almost_empty
 
         return beh_assign
@@ -1,6 +1,6 @@
 
 from __future__ import absolute_import
 
-from .command_packet import CommandPacket
+from .command_packet import CommandPacket, CommandPipeline
 from .keep import keep_port_names
 from .extract import extract_freq
@@ -1,31 +1,75 @@
-
 import struct
 from myhdl import now, delay
 
 # packet definition constants
-PACKET_LENGTH = 12
+PACKET_LENGTH = 12        # single word packet
+HEADER_LENGTH = 8
 DATA_OFFSET = 8
+MAX_DATA_LENGTH = 256     # max block read/write in bytes
+MAX_WORDS = MAX_DATA_LENGTH // 4
 
 
 class CommandPacket(object):
-    def __init__(self, rnw=True, address=0, vals=None):
-        """ """
+    def __init__(self, rnw=True, address=0, vals=None, length=None,
+                 tag=None):
+        """ A command_bridge command packet
+
+        Arguments:
+            rnw (bool): read command if True else write command
+            address (int): the start (byte) address, a block read or
+                write increments the address by 4 for each word.
+            vals (list): the 32-bit words to write
+            length (int): the number of words to read, defaults to
+                one word (or the number of `vals`).
+            tag (int): the packet sequence number (byte 7), only used
+                with a tagged `command_bridge`, defaults to 0xCA.
+
+        A block read command packet is the header only, a single word
+        read command packet is the header followed by 4 (ignored) data
+        bytes, the original 12 byte packet.  A write command packet is
+        the header followed by the write data.  The response
+        to both is the header followed by the words read (a write is
+        read back).  A block read or write is up to 64 words.
+        """
         assert isinstance(vals, (type(None), list))
-        self.rawbytes = bytearray([0 for _ in range(PACKET_LENGTH)])
+        if length is None:
+            length = 1 if rnw or vals is None else len(vals)
+        if not rnw:
+            assert vals is not None and len(vals) == length
+        assert 0 < length <= MAX_WORDS, "invalid length {}".format(length)
+        self.rnw = rnw
+        self.length = length
+        self.vals = vals
+        self.read_values = []
+
+        self.rawbytes = bytearray([0 for _ in range(HEADER_LENGTH)])
         self.rawbytes[0] = 0xDE
         self.rawbytes[1] = 1 if rnw else 2
         self.rawbytes[2:6] = struct.pack(">L", address)
-        self.rawbytes[6] = 4   # only support single read/write
-        self.rawbytes[7] = 0xCA
+        self.rawbytes[6] = (4 * length) % MAX_DATA_LENGTH
+        self.rawbytes[7] = 0xCA if tag is None else tag
 
-        # @todo: support variable packets, block read/writes
-        if vals is not None:
-            self.rawbytes[8:12] = struct.pack(">L", vals[0])
-        else:
-            self.rawbytes[8:12] = struct.pack(">L", 0xFEEDFACE)
+        if not rnw:
+            for val in vals:
+                self.rawbytes += struct.pack(">L", val)
+        elif length == 1:
+            self.rawbytes += struct.pack(">L", 0xFEEDFACE)
 
         # @todo: added checksum / CRC
 
+    @property
+    def tag(self):
+        return self.rawbytes[7]
+
+    @tag.setter
+    def tag(self, tag):
+        self.rawbytes[7] = tag
+
+    @property
+    def response_length(self):
+        """ the number of bytes in the response packet """
+        return HEADER_LENGTH + 4 * self.length
+
     @staticmethod
     def pkt2str(pkt):
         assert isinstance(pkt, bytearray)
@@ -42,29 +86,52 @@ class CommandPacket(object):
         return msg
 
     def check_response(self, pkt, rvals=None, evals=None):
+        """ check the response packet header and extract the words read
+
+        Arguments:
+            pkt (bytearray): the response packet
+            rvals (list): the words read are appended to this list
+            evals (list): the expected words
+        """
         assert pkt[0] == 0xDE, self.dump("invalid start byte", pkt)
         assert pkt[1] == self.rawbytes[1], self.dump("invalid command", pkt)
         assert pkt[2:6] == self.rawbytes[2:6], self.dump("invalid address", pkt)
-        assert pkt[7] == 0xCA, self.dump("invalid byte 7", pkt)
-        if rvals is not None and evals is not None:
-            for ii, ev in enumerate(evals):
-                rval, = struct.unpack(">L", pkt[8+(ii*4):12+(ii*4)])
+        assert pkt[6] == self.rawbytes[6], self.dump("invalid length", pkt)
+        assert pkt[7] == self.rawbytes[7], self.dump("invalid tag", pkt)
+
+        nwords = (len(pkt) - HEADER_LENGTH) // 4
+        self.read_values = list(struct.unpack(
+            ">{}L".format(nwords), bytes(pkt[HEADER_LENGTH:])))
+        if evals is not None:
+            for rval, ev in zip(self.read_values, evals):
                 assert rval == ev, "{:08X} != {:08X}".format(rval, ev)
-                rvals.append(rval)
+        if rvals is not None:
+            rvals.extend(self.read_values)
 
     def put(self, fifobus):
         yield fifobus.clock.posedge
-        for byte in self.rawbytes:
+        nbytes = len(self.rawbytes)
+        for ii, byte in enumerate(self.rawbytes):
+            # a block packet can be larger than the FIFO, the full
+            # flag is updated on the clock edge.
+            yield delay(1)
+            while fifobus.full:
+                fifobus.write.next = False
+                yield fifobus.clock.posedge
+                yield delay(1)
             fifobus.write.next = True
             fifobus.write_data.next = byte
+            # the end of the packet, for the packet FIFOs
+            fifobus.write_last.next = ii == nbytes-1
             yield fifobus.clock.posedge
         fifobus.write.next = False
+        fifobus.write_last.next = False
 
     def get(self, fifobus, rvals=None, evals=None, timeout=4000):
         timeout_value = timeout
-        response_bytes = bytearray([0 for _ in range(PACKET_LENGTH)])
+        response_bytes = bytearray([0 for _ in range(self.response_length)])
         rpkt = response_bytes
-        bytestoget, ii = PACKET_LENGTH, 0
+        bytestoget, ii = self.response_length, 0
 
         while fifobus.empty and timeout > 0:
             timeout -= 1
@@ -100,3 +167,101 @@ class CommandPacket(object):
 
         # check the received packet
         self.check_response(response_bytes, rvals, evals)
+
+
+class CommandPipeline(object):
+    def __init__(self, putbus, getbus, depth=4, timeout=4000):
+        """ Keep multiple command packets in flight
+
+        The packets are sent while the responses are received, up to
+        `depth` packets are outstanding.  Each packet is assigned a
+        sequence number (tag) and the responses are matched to the
+        packets by the tag, this requires a tagged `command_bridge`.
+
+        Arguments:
+            putbus (FIFOBus): the FIFO the packets are written to
+            getbus (FIFOBus): the FIFO the responses are read from
+            depth (int): the max number of outstanding packets
+            timeout (int): clock cycles without progress
+
+        Usage::
+
+            pipe = CommandPipeline(readpath, writepath, depth=8)
+            pkts = [CommandPacket(True, addr) for addr in addrs]
+            yield pipe.transfer(pkts)
+            vals = [pkt.read_values[0] for pkt in pkts]
+        """
+        assert 0 < depth <= 256
+        self.putbus = putbus
+        self.getbus = getbus
+        self.depth = depth
+        self.timeout = timeout
+        self.next_tag = 0
+
+    def transfer(self, packets, check=True):
+        """ send the packets and receive the responses
+
+        Arguments:
+            packets (list): the CommandPackets, the packet tags are
+                assigned by the pipeline.
+            check (bool): check the write responses, the words read
+                back match the words written.
+        """
+        putbus, getbus = self.putbus, self.getbus
+        clock = putbus.clock
+        inflight = {}
+        sendq = list(packets)
+        sendbytes, sendidx = None, 0
+        rxbuf = bytearray()
+        timeout = self.timeout
+
+        yield clock.posedge
+        yield delay(1)
+        while len(sendq) > 0 or len(inflight) > 0 or sendbytes is not None:
+            # start the next packet, a new tag per packet
+            if (sendbytes is None and len(sendq) > 0 and
+                    len(inflight) < self.depth):
+                pkt = sendq.pop(0)
+                pkt.tag = self.next_tag
+                assert pkt.tag not in inflight
+                inflight[pkt.tag] = pkt
+                self.next_tag = (self.next_tag + 1) % 256
+                sendbytes, sendidx = pkt.rawbytes, 0
+
+            # send a packet byte, the loop runs just after the clock
+            # edge, the FIFO flags are current
+            if sendbytes is not None and not putbus.full:
+                putbus.write.next = True
+                putbus.write_data.next = sendbytes[sendidx]
+                sendidx += 1
+                if sendidx == len(sendbytes):
+                    sendbytes = None
+            else:
+                putbus.write.next = False
+
+            # receive a response byte
+            getbus.read.next = not getbus.empty and len(inflight) > 0
+            yield delay(1)
+            if getbus.read_valid:
+                rxbuf.append(int(getbus.read_data))
+                timeout = self.timeout
+
+            # a complete response, match the packet by the tag
+            if len(rxbuf) >= HEADER_LENGTH:
+                datalen = rxbuf[6] if rxbuf[6] != 0 else MAX_DATA_LENGTH
+                if len(rxbuf) == HEADER_LENGTH + datalen:
+                    tag = rxbuf[7]
+                    assert tag in inflight, "unexpected tag {}".format(tag)
+                    pkt = inflight.pop(tag)
+                    evals = pkt.vals if check and not pkt.rnw else None
+                    pkt.check_response(rxbuf, evals=evals)
+                    rxbuf = bytearray()
+
+            timeout -= 1
+            if timeout == 0:
+                raise TimeoutError
+            yield clock.posedge
+            yield delay(1)
+
+        putbus.write.next = False
+        getbus.read.next = False
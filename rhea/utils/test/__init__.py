@@ -8,3 +8,6 @@ from .test_utils import tb_move_generated_files
 from .test_utils import tb_args
 from .test_utils import tb_default_args
 from .test_utils import skip_long_sim_test
+
+from .sim_profile import SimProfiler
+from .regression import run_regression
@@ -0,0 +1,276 @@
+"""
+Run a collection of testbenches in parallel.
+
+The testbenches in the rhea test suite are plain `test_*` functions
+that build a bench and simulate it with `run_testbench`.  The
+regression runner finds the test functions in a set of files or
+directories and shards them across a process pool.  Each test runs
+in a fresh process in its own working directory, this isolates the
+`output/vcd` (and any other generated files) of each testbench so the
+`tb_clean_vcd` calls do not race.
+
+Usage::
+
+    python -m rhea.utils.test.regression test/ examples/ --jobs 8
+
+The results (pass/fail and the simulated time per second of each
+bench) are printed and saved to `<outdir>/results.json`.  When a
+previous results file exists the longest tests are started first.
+"""
+
+from __future__ import print_function, division
+
+import os
+import sys
+import ast
+import json
+import argparse
+import multiprocessing
+import timeit
+import traceback
+
+import pytest
+
+from . import test_utils
+
+
+def find_tests(paths):
+    """ find the test functions in a list of files and directories
+
+    The test files (`test_*.py`) are parsed, not imported, the parent
+    process never elaborates any of the testbenches.
+
+    Arguments:
+        paths (list): files and directories to search
+
+    Returns:
+        A list of (filename, test function name) tuples.
+    """
+    filenames = []
+    for path in paths:
+        if os.path.isfile(path):
+            filenames.append(path)
+            continue
+        for dirpath, dirnames, files in os.walk(path):
+            # skip the generated output and the pytest `norecursedirs`
+            dirnames[:] = sorted([dd for dd in dirnames
+                                  if not dd.startswith(('_', '.')) and
+                                  dd != 'output'])
+            for fn in sorted(files):
+                if fn.startswith('test_') and fn.endswith('.py'):
+                    filenames.append(os.path.join(dirpath, fn))
+
+    tests = []
+    for fn in filenames:
+        with open(fn) as f:
+            tree = ast.parse(f.read(), filename=fn)
+        for node in tree.body:
+            if (isinstance(node, ast.FunctionDef) and
+                    node.name.startswith('test')):
+                tests.append((os.path.abspath(fn), node.name))
+
+    return tests
+
+
+def _common_root(paths):
+    """ the deepest directory common to all the paths
+
+    `os.path.commonpath` is not available in Python 2.7 and 3.4, the
+    paths are compared component by component.
+    """
+    parts = [os.path.abspath(pp).split(os.sep) for pp in paths]
+    return os.sep.join(os.path.commonprefix(parts)) or os.sep
+
+
+def _load_module(modname, filename):
+    """ import a test file as a module """
+    try:
+        from importlib.util import spec_from_file_location, module_from_spec
+    except ImportError:
+        # Python 2.7 and 3.4
+        import imp
+        return imp.load_source(modname, filename)
+    spec = spec_from_file_location(modname, filename)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _get_skip(func, runlong=False):
+    """ check the pytest marks attached to a test function """
+    skip, xfail = None, False
+    for mark in getattr(func, 'pytestmark', []):
+        if mark.name == 'xfail':
+            xfail = True
+        elif mark.name == 'skip':
+            skip = mark.kwargs.get('reason', 'skip')
+        elif mark.name == 'skipif':
+            if runlong and mark == test_utils.skip_long_sim_test.mark:
+                continue
+            # a skipif without a condition always skips
+            if len(mark.args) == 0 or any(mark.args):
+                skip = mark.kwargs.get('reason', 'skipif')
+    return skip, xfail
+
+
+def _run_test(job):
+    """ run a single test function, executed in a worker process """
+    filename, name, workdir, runlong = job
+    result = dict(filename=filename, test=name, status='error',
+                  message='', wall_time=0., benches=[])
+
+    if not os.path.isdir(workdir):
+        os.makedirs(workdir)
+    sys.path = [os.path.abspath(pp) for pp in sys.path]
+    os.chdir(workdir)
+    # tests often import modules next to them
+    sys.path.insert(0, os.path.dirname(filename))
+    del test_utils.bench_stats[:]
+
+    tstart = timeit.default_timer()
+    try:
+        modname = "_regression_{}".format(
+            os.path.splitext(os.path.basename(filename))[0])
+        module = _load_module(modname, filename)
+        func = getattr(module, name)
+        skip, xfail = _get_skip(func, runlong)
+
+        if skip is not None:
+            result['status'], result['message'] = 'skip', skip
+        else:
+            try:
+                func()
+                result['status'] = 'xpass' if xfail else 'pass'
+            except pytest.skip.Exception as err:
+                result['status'], result['message'] = 'skip', str(err)
+            except Exception:
+                result['status'] = 'xfail' if xfail else 'fail'
+                result['message'] = traceback.format_exc()
+    except Exception:
+        result['message'] = traceback.format_exc()
+
+    result['wall_time'] = timeit.default_timer() - tstart
+    for stats in test_utils.bench_stats:
+        stats = dict(stats)
+        wt = stats['wall_time']
+        stats['sim_rate'] = stats['sim_time'] / wt if wt > 0 else 0.
+        result['benches'].append(stats)
+
+    return result
+
+
+def run_regression(paths, jobs=None, outdir='output/regression',
+                   runlong=False, verbose=True):
+    """ run all the tests found in `paths` in a process pool
+
+    Arguments:
+        paths (list): test files and directories to search
+        jobs (int): number of worker processes, defaults to the
+            number of CPUs.
+        outdir (str): each test runs in a working directory under
+            `outdir`, the results summary is saved to
+            `outdir/results.json`.
+        runlong (bool): run the tests marked with `skip_long_sim_test`
+
+    Returns:
+        A list of result dicts, one per test function.
+    """
+    outdir = os.path.abspath(outdir)
+    rootdir = _common_root(paths)
+    if os.path.isfile(rootdir):
+        rootdir = os.path.dirname(rootdir)
+    resultsfn = os.path.join(outdir, 'results.json')
+
+    jobs_list = []
+    for filename, name in find_tests(paths):
+        rel = os.path.splitext(os.path.relpath(filename, rootdir))[0]
+        workdir = os.path.join(outdir, rel, name)
+        jobs_list.append((filename, name, workdir, runlong))
+
+    # longest processing time first, use the durations from the
+    # previous run to start the long running benches first
+    if os.path.isfile(resultsfn):
+        with open(resultsfn) as f:
+            last = {(rr['filename'], rr['test']): rr['wall_time']
+                    for rr in json.load(f)}
+        jobs_list.sort(key=lambda jj: last.get(jj[:2], 0), reverse=True)
+
+    # a fresh process per test, myhdl keeps global simulator state
+    pool = multiprocessing.Pool(processes=jobs, maxtasksperchild=1)
+    results = []
+    try:
+        for result in pool.imap_unordered(_run_test, jobs_list):
+            results.append(result)
+            if verbose:
+                print("{:6s} {:8.2f}s  {}::{}".format(
+                    result['status'].upper(), result['wall_time'],
+                    os.path.relpath(result['filename'], rootdir),
+                    result['test']))
+    finally:
+        pool.close()
+        pool.join()
+
+    results.sort(key=lambda rr: (rr['filename'], rr['test']))
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    with open(resultsfn, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if verbose:
+        print_report(results)
+
+    return results
+
+
+def print_report(results):
+    """ print the failures and the per-bench simulation throughput """
+    for rr in results:
+        if rr['status'] in ('fail', 'error'):
+            print("\n{} {}::{}".format(rr['status'].upper(),
+                                       rr['filename'], rr['test']))
+            print(rr['message'])
+
+    # a test can run the same bench many times, combine the runs
+    benches = {}
+    for rr in results:
+        for bb in rr['benches']:
+            st, wt, nr = benches.get(bb['name'], (0, 0., 0))
+            benches[bb['name']] = (st+bb['sim_time'], wt+bb['wall_time'], nr+1)
+
+    if len(benches) > 0:
+        print("\n{:<36s} {:>5s} {:>14s} {:>10s} {:>14s}".format(
+            "bench", "runs", "sim time", "wall (s)", "sim time/s"))
+        for name, (st, wt, nr) in sorted(benches.items(),
+                                         key=lambda kv: -kv[1][1]):
+            rate = st / wt if wt > 0 else 0.
+            print("{:<36s} {:>5d} {:>14d} {:>10.2f} {:>14.0f}".format(
+                name, nr, st, wt, rate))
+
+    counts = {}
+    for rr in results:
+        counts[rr['status']] = counts.get(rr['status'], 0) + 1
+    print("\n" + ", ".join(["{} {}".format(vv, kk)
+                            for kk, vv in sorted(counts.items())]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="run the rhea testbenches in parallel")
+    parser.add_argument('paths', nargs='+',
+                        help="test files and directories")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of processes (default: cpu count)")
+    parser.add_argument('--outdir', default='output/regression',
+                        help="working directory for the tests")
+    parser.add_argument('--runlong', action='store_true',
+                        help="run long running tests")
+    args = parser.parse_args(argv)
+
+    results = run_regression(args.paths, jobs=args.jobs,
+                             outdir=args.outdir, runlong=args.runlong)
+    failed = [rr for rr in results if rr['status'] in ('fail', 'error')]
+    return 1 if len(failed) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Simulation profiler, count the wake-ups and the Python time of each
+generator in a myhdl simulation.
+
+The profiler wraps the generator of each instance (`@always_seq`,
+`@always_comb`, `@instance`, ...) in a block hierarchy before the
+simulation is run.  The transaction generators yielded from an
+`@instance` (e.g. `Wishbone.writetrans`) are profiled as well and
+are reported by their qualified name.
+
+Usage::
+
+    inst = bench()
+    prof = SimProfiler(inst)
+    inst.run_sim()
+    prof.report()
+    prof.save('output/prof/bench.json')
+
+The profiler is used by `run_testbench` when `args.profile` is set.
+
+Not convertible, this uses the myhdl simulator internals.
+"""
+
+from __future__ import print_function, division
+
+import os
+import json
+import timeit
+from types import GeneratorType
+
+from myhdl._block import _Block
+from myhdl._instance import _Instantiator
+
+
+_timer = timeit.default_timer
+
+
+class GeneratorStats(object):
+    __slots__ = ('name', 'wakeups', 'time')
+
+    def __init__(self, name):
+        """ The statistics for a generator in the simulation """
+        self.name = name
+        self.wakeups = 0    # the number of times the generator resumed
+        self.time = 0.      # the cumulative Python time (seconds)
+
+    def to_dict(self):
+        return dict(name=self.name, wakeups=self.wakeups, time=self.time)
+
+
+class _ProfiledGenerator(object):
+    def __init__(self, gen, stats, profiler):
+        """ Iterator the simulator waiters resume instead of the generator
+        """
+        self.gen = gen
+        self.stats = stats
+        self.profiler = profiler
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        stats = self.stats
+        tstart = _timer()
+        try:
+            clause = next(self.gen)
+        finally:
+            stats.time += _timer() - tstart
+            stats.wakeups += 1
+        # the simulator runs a yielded generator in a new waiter
+        if isinstance(clause, GeneratorType):
+            clause = self.profiler._subgen(clause)
+        return clause
+
+    next = __next__
+
+
+class SimProfiler(object):
+    def __init__(self, inst):
+        """ Profile the generators in a myhdl block hierarchy
+
+        Arguments:
+            inst (myhdl.Block): the top-level block (elaborated bench),
+                the profiler needs to be created before the simulation
+                is started.
+        """
+        assert isinstance(inst, _Block)
+        self.name = inst.name
+        self.stats = {}
+        self.sim_time = 0
+        self.wall_time = 0.
+        self._walk(inst, inst.name)
+
+    def _get_stats(self, name):
+        if name not in self.stats:
+            self.stats[name] = GeneratorStats(name)
+        return self.stats[name]
+
+    def _walk(self, blk, path):
+        for sub in blk.subs:
+            if isinstance(sub, _Block):
+                self._walk(sub, path + '.' + sub.name)
+            elif isinstance(sub, _Instantiator):
+                self._attach(sub, path + '.' + sub.name)
+
+    def _attach(self, inst, name):
+        # the waiter type is inferred from the original generator, the
+        # waiter resumes the profiled generator instead.
+        waiter = inst._waiter()(inst.gen)
+        waiter.generator = _ProfiledGenerator(inst.gen,
+                                              self._get_stats(name), self)
+        inst._waiter = lambda: (lambda gen: waiter)
+
+    def _subgen(self, gen):
+        """ profile a generator yielded by another generator """
+        stats = self._get_stats(getattr(gen, '__qualname__', gen.__name__))
+        while True:
+            tstart = _timer()
+            try:
+                clause = next(gen)
+            except StopIteration:
+                return
+            finally:
+                stats.time += _timer() - tstart
+                stats.wakeups += 1
+            if isinstance(clause, GeneratorType):
+                clause = self._subgen(clause)
+            yield clause
+
+    def get_stats(self):
+        """ the generator statistics sorted by the cumulative time """
+        return sorted(self.stats.values(), key=lambda ss: -ss.time)
+
+    def report(self, num=None):
+        """ print the generators sorted by the cumulative time """
+        stats = self.get_stats()[:num]
+        total = sum([ss.time for ss in self.stats.values()])
+        print("Simulation profile {}, {} generators, {:.3f}s".format(
+            self.name, len(self.stats), total))
+        print("  {:>10s} {:>10s} {:>10s} {:>6s}  {}".format(
+            "wake-ups", "time (s)", "us/wake", "%", "generator"))
+        for ss in stats:
+            uspw = 1e6 * ss.time / ss.wakeups if ss.wakeups > 0 else 0.
+            pct = 100. * ss.time / total if total > 0 else 0.
+            print("  {:>10d} {:>10.4f} {:>10.2f} {:>6.1f}  {}".format(
+                ss.wakeups, ss.time, uspw, pct, ss.name))
+
+    def to_dict(self):
+        return dict(name=self.name, sim_time=self.sim_time,
+                    wall_time=self.wall_time,
+                    generators=[ss.to_dict() for ss in self.get_stats()])
+
+    def save(self, filename):
+        """ save the profile as JSON """
+        dr = os.path.dirname(filename)
+        if dr != '' and not os.path.isdir(dr):
+            os.makedirs(dr)
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -4,10 +4,13 @@ import sys
 import shutil
 from glob import glob
 import argparse
+import timeit
 
 import pytest
 import myhdl
 
+from .sim_profile import SimProfiler
+
 
 skip_long_sim_test = pytest.mark.skipif(reason="long running tests")
 if hasattr(sys, '_called_from_test'):
@@ -16,6 +19,11 @@ if hasattr(sys, '_called_from_test'):
         reason="long running tests, needs --runlong option to run"
     )
 
+# simulation statistics for each testbench run (in this process), each
+# entry is a dict with the bench name, simulated time and wall time.
+# The regression runner uses these to report the simulation throughput.
+bench_stats = []
+
 
 def run_testbench(bench, timescale=None, args=None):
     """ run (simulate) a testbench
@@ -32,6 +40,8 @@ def run_testbench(bench, timescale=None, args=None):
             of 10 simulation step.
         args (Namespace): Additional configuration arguments
             .trace: enable VCD tracing
+            .profile: profile the generators, the report is printed
+                and saved to output/prof/<bench name>.json
     """
     if args is None:
         args = argparse.Namespace(trace=False)
@@ -47,7 +57,20 @@ def run_testbench(bench, timescale=None, args=None):
         myhdl.traceSignals.timescale = timescale
         inst.config_sim(trace=True)
 
+    profiler = None
+    if getattr(args, 'profile', False):
+        profiler = SimProfiler(inst)
+
+    tstart = timeit.default_timer()
     inst.run_sim()
+    wall_time = timeit.default_timer() - tstart
+    bench_stats.append(dict(name=bench.__name__, sim_time=myhdl.now(),
+                            wall_time=wall_time))
+
+    if profiler is not None:
+        profiler.sim_time, profiler.wall_time = myhdl.now(), wall_time
+        profiler.report()
+        profiler.save(os.path.join('output/prof', nm+'.json'))
     del inst
 
 
@@ -76,6 +99,8 @@ def _tb_argparser(tests=None, parser=None):
         parser = argparse.ArgumentParser()
     parser.add_argument('--trace', action='store_true')
     parser.add_argument('--convert', action='store_true')
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the simulation generators")
     if tests is not None and 'all' not in tests:
         tests += ['all']
     parser.add_argument('--test', choices=tests,
@@ -96,12 +121,14 @@ def tb_default_args(args=None):
     args namespace.  This is commonly included at the top of a testbench.
     """
     if args is None:
-        args = argparse.Namespace(trace=False, convert=False)
+        args = argparse.Namespace(trace=False, convert=False, profile=False)
     else:
         if not hasattr(args, 'trace'):
             args.trace = False
         if not hasattr(args, 'convert'):
             args.convert = False
+        if not hasattr(args, 'profile'):
+            args.profile = False
             
     return args 
 
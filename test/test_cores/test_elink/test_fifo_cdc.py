@@ -0,0 +1,80 @@
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import always, instance, StopSimulation
+
+from rhea import Clock, Reset
+from rhea.cores.elink import EMeshPacket, EMeshPacketSnapshot
+from rhea.cores.elink import fifo_cdc
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def test_fifo_cdc(args=None):
+    """ pass packets from a slow to a fast clock domain, the output
+    stalled at random.
+    """
+    args = tb_default_args(args)
+    clock_i = Clock(0, frequency=48e6)
+    clock_o = Clock(0, frequency=100e6)
+    reset = Reset(0, active=1, isasync=True)
+    epkt_i, epkt_o = EMeshPacket(), EMeshPacket()
+    rng = Random(7)
+    num = 40
+    sent, received, nwait = [], [], [0]
+
+    @myhdl.block
+    def bench_fifo_cdc():
+        tbdut = fifo_cdc(reset, clock_i, epkt_i, clock_o, epkt_o,
+                         size=8, sync_stages=3)
+        tbclki = clock_i.gen()
+        tbclko = clock_o.gen()
+
+        @always(clock_i.posedge)
+        def tbfull():
+            nwait[0] += 1 if epkt_i.wait else 0
+
+        @always(clock_o.posedge)
+        def tbcap():
+            if epkt_o.access and not epkt_o.wait:
+                received.append(EMeshPacketSnapshot(epkt_o))
+            epkt_o.wait.next = rng.random() < 0.6
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            for _ in range(5):
+                yield clock_i.posedge
+
+            for ii in range(num):
+                epkt_i.access.next = True
+                epkt_i.write.next = True
+                epkt_i.dstaddr.next = 0x8000 + ii
+                epkt_i.data.next = rng.randrange(2**32)
+                epkt_i.srcaddr.next = ii
+                # the packet is written the clock wait is not set
+                accepted = False
+                while not accepted:
+                    yield clock_i.negedge
+                    accepted = not epkt_i.wait
+                    yield clock_i.posedge
+                sent.append(EMeshPacketSnapshot(epkt_i))
+            epkt_i.access.next = False
+            assert nwait[0] > 0
+
+            for _ in range(40):
+                yield clock_i.posedge
+            assert len(received) == num
+            # the packet fields, the flow control differs
+            for pi, po in zip(sent, received):
+                assert pi.bits == po.bits
+            raise StopSimulation
+
+        return tbdut, tbclki, tbclko, tbfull, tbcap, tbstim
+
+    run_testbench(bench_fifo_cdc, args=args)
+
+
+if __name__ == '__main__':
+    test_fifo_cdc(tb_args())
@@ -0,0 +1,146 @@
+"""
+Dual-clock FIFO (fifo_async) throughput and latency benchmark.
+
+The write side writes a word every write clock the FIFO is not full,
+the read side reads a word every read clock the FIFO is not empty.
+The sustained throughput in words per write clock and the latency of
+the words through the FIFO, the time from the write clock edge the
+word is written to the read clock edge the word is read, are reported
+for each write / read clock pair and number of synchronizer stages.
+The minimum latency is the latency through the empty FIFO, the
+maximum latency includes the time the words wait in a full FIFO when
+the read clock is slower.
+
+Usage::
+
+    python fifo_cdc_benchmark.py --clocks 48:100 100:48 50:50 --stages 2 3
+
+Not convertible.
+"""
+
+from __future__ import print_function, division
+
+import sys
+import argparse
+
+import myhdl
+from myhdl import Signal, always, always_comb, instance, now, StopSimulation
+
+from rhea import Clock, Reset
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_async
+
+
+# the simulation time step is a picosecond
+TICKS_PER_NS = 1000
+
+
+def run_cdc(wfreq, rfreq, sync_stages=2, fwft=True, size=16, num=1000):
+    """ stream `num` words through a fifo_async, the clock frequencies
+    in Hz, returns a dict with the throughput and latency.
+    """
+    clock_write = Clock(0, frequency=wfreq)
+    clock_read = Clock(0, frequency=rfreq)
+    reset = Reset(0, active=1, isasync=True)
+    fbus = FIFOBus(width=32)
+    wticks = 2 * int(round(1e12 / wfreq / 2))
+    rticks = 2 * int(round(1e12 / rfreq / 2))
+    # the words written are stamped with the write time
+    stamps, latency, reads = {}, [], []
+    start = Signal(bool(0))
+    wen = Signal(bool(0))
+
+    @myhdl.block
+    def bench_fifo_cdc():
+        tbdut = fifo_async(clock_write, clock_read, fbus, reset, size=size,
+                           sync_stages=sync_stages, fwft=fwft)
+        tbclkw = clock_write.gen(hticks=wticks // 2)
+        tbclkr = clock_read.gen(hticks=rticks // 2)
+
+        @always_comb
+        def tbgate():
+            fbus.write.next = wen and not fbus.full
+            fbus.read.next = start and not fbus.empty
+
+        @always(clock_write.posedge)
+        def tbwr():
+            if fbus.write:
+                stamps[int(fbus.write_data)] = now()
+                fbus.write_data.next = fbus.write_data + 1
+                if fbus.write_data == num - 1:
+                    wen.next = False
+
+        @always(clock_read.posedge)
+        def tbrd():
+            if fbus.read_valid:
+                data = int(fbus.read_data)
+                assert data == len(reads), "{} != {}".format(data, len(reads))
+                latency.append(now() - stamps[data])
+                reads.append(now())
+
+        @instance
+        def tbstim():
+            yield reset.pulse(4*max(wticks, rticks))
+            for _ in range(sync_stages + 4):
+                yield clock_write.posedge
+            start.next = True
+            wen.next = True
+            while len(reads) < num:
+                yield clock_read.posedge
+            raise StopSimulation
+
+        return tbdut, tbclkw, tbclkr, tbgate, tbwr, tbrd, tbstim
+
+    inst = bench_fifo_cdc()
+    inst.run_sim()
+    inst.quit_sim()
+
+    # the throughput in the steady state, skip the first words
+    skip = min(2*size, num // 4)
+    elapsed = reads[-1] - reads[skip]
+    words_per_wclk = (len(reads) - skip - 1) / (elapsed / wticks)
+    return dict(wfreq=wfreq, rfreq=rfreq, sync_stages=sync_stages,
+                fwft=fwft, words_per_wclk=words_per_wclk,
+                ideal=min(1., rfreq / wfreq),
+                min_latency_ns=min(latency) / TICKS_PER_NS,
+                max_latency_ns=max(latency) / TICKS_PER_NS,
+                min_latency_wclk=min(latency) / wticks,
+                max_latency_wclk=max(latency) / wticks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="dual-clock FIFO throughput and latency benchmark")
+    parser.add_argument('--clocks', nargs='+',
+                        default=['48:100', '100:48', '50:50', '22:50',
+                                 '100:33'],
+                        help="write:read clock frequencies in MHz")
+    parser.add_argument('--stages', type=int, nargs='+', default=[2, 3],
+                        help="the number of synchronizer stages")
+    parser.add_argument('--size', type=int, default=16)
+    parser.add_argument('--num', type=int, default=1000,
+                        help="the number of words streamed")
+    parser.add_argument('--no-fwft', action='store_true',
+                        help="registered read data (not first-word-fall-"
+                             "through)")
+    args = parser.parse_args(argv)
+
+    print("{:>7s} {:>7s} {:>6s} {:>9s} {:>7s} {:>17s} {:>17s}".format(
+        "wr MHz", "rd MHz", "stages", "words/clk", "ideal",
+        "min lat ns (clk)", "max lat ns (clk)"))
+    for clocks in args.clocks:
+        wmhz, rmhz = [float(ff) for ff in clocks.split(':')]
+        for stages in args.stages:
+            res = run_cdc(wmhz*1e6, rmhz*1e6, sync_stages=stages,
+                          fwft=not args.no_fwft, size=args.size,
+                          num=args.num)
+            print("{:7.1f} {:7.1f} {:6d} {:9.3f} {:7.3f} {:10.1f} ({:4.1f})"
+                  " {:10.1f} ({:4.1f})".format(
+                      wmhz, rmhz, stages, res['words_per_wclk'],
+                      res['ideal'], res['min_latency_ns'],
+                      res['min_latency_wclk'], res['max_latency_ns'],
+                      res['max_latency_wclk']))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+FIFO memory (fifo_mem) elaboration benchmark.
+
+A `fifo_sync` (or `fifo_async`) of each depth is elaborated with the
+list-of-signals memory array and with the compact memory array
+(`compact=True`), the elaboration time, the peak RSS and the time to
+simulate a number of writes and reads are reported.  Each case runs in
+a separate process so the RSS of a case is not polluted by the
+previous cases.
+
+Usage::
+
+    python fifo_mem_benchmark.py --depth 16 256 4096 65536 1048576
+
+Not convertible.
+"""
+
+from __future__ import print_function, division
+
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_sync, fifo_async
+
+
+def run_case(depth, compact, fifo='sync', width=32, num=256):
+    """ elaborate and simulate a FIFO, in this process """
+    rss0 = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=width)
+
+    @myhdl.block
+    def bench_fifo_mem_benchmark():
+        if fifo == 'sync':
+            tbdut = fifo_sync(glbl, fbus, size=depth, compact=compact)
+        else:
+            tbdut = fifo_async(clock, clock, fbus, reset, size=depth,
+                               compact=compact)
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+            for ii in range(min(num, depth-1)):
+                fbus.write.next = True
+                fbus.write_data.next = ii
+                yield clock.posedge
+            fbus.write.next = False
+            for ii in range(8):
+                yield clock.posedge
+            fbus.read.next = True
+            for ii in range(min(num, depth-1)):
+                yield clock.posedge
+            fbus.read.next = False
+            raise StopSimulation
+
+        return tbdut, tbclk, tbstim
+
+    start = time.time()
+    inst = bench_fifo_mem_benchmark()
+    elab = time.time() - start
+    start = time.time()
+    inst.run_sim()
+    sim = time.time() - start
+    inst.quit_sim()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes (Linux)
+    return dict(depth=depth, compact=compact, fifo=fifo,
+                elaborate=elab, simulate=sim, rss_mb=rss/1024.,
+                rss_delta_mb=(rss-rss0)/1024.)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="FIFO memory elaboration and RSS benchmark")
+    parser.add_argument('--depth', type=int, nargs='+',
+                        default=[16, 256, 4096, 65536, 1048576],
+                        help="FIFO depths")
+    parser.add_argument('--fifo', default='sync', choices=('sync', 'async'))
+    parser.add_argument('--width', type=int, default=32)
+    parser.add_argument('--signals-max', type=int, default=65536,
+                        help="the max depth of the list-of-signals memory")
+    parser.add_argument('--case', nargs=2, metavar=('DEPTH', 'COMPACT'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        res = run_case(int(args.case[0]), args.case[1] == '1',
+                       args.fifo, args.width)
+        print(json.dumps(res))
+        return 0
+
+    print("{:<8s} {:>8s} {:>8s} {:>10s} {:>10s} {:>10s}".format(
+        "memory", "depth", "", "elab (s)", "sim (s)", "RSS (MB)"))
+    for depth in args.depth:
+        for compact in (False, True):
+            if not compact and depth > args.signals_max:
+                continue
+            out = subprocess.check_output(
+                [sys.executable, __file__, '--fifo', args.fifo,
+                 '--width', str(args.width),
+                 '--case', str(depth), '1' if compact else '0'])
+            res = json.loads(out.decode().strip().splitlines()[-1])
+            print("{:<8s} {:>8d} {:>8s} {:>10.3f} {:>10.3f} {:>10.1f}".format(
+                'compact' if compact else 'signals', depth, args.fifo,
+                res['elaborate'], res['simulate'], res['rss_mb']))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,7 @@
 from __future__ import division, print_function
 
 from argparse import Namespace
+from random import Random
 
 import myhdl
 from myhdl import (Signal, ResetSignal, intbv, modbv, delay, instance,
@@ -15,7 +16,8 @@ from myhdl.conversion import verify
 from rhea.system import Clock, FIFOBus, Global, Signals
 from rhea.cores.fifo import fifo_async
 
-from rhea.utils.test import run_testbench
+from rhea.system import Reset
+from rhea.utils.test import run_testbench, tb_default_args
 
 
 @myhdl.block
@@ -190,8 +192,70 @@ def test_(args=None):
     run_testbench(bench_)
 
 
+def test_fifo_async_fwft(args=None):
+    """ the first-word-fall-through read and the synchronizer stages,
+    random write and read stalls, a slow and a fast write clock.
+    """
+    args = tb_default_args(args)
+    num = 200
+
+    for wfreq, rfreq, stages in ((48e6, 100e6, 2), (100e6, 48e6, 3)):
+        reset = Reset(0, active=1, isasync=True)
+        wclk = Clock(0, frequency=wfreq)
+        rclk = Clock(0, frequency=rfreq)
+        fbus = FIFOBus(width=8)
+        start, wen, ren = Signals(bool(0), 3)
+        rng = Random(11)
+        sent, received = [0], []
+
+        @myhdl.block
+        def bench_fifo_async_fwft():
+            tbdut = fifo_async(wclk, rclk, fbus, reset, size=16,
+                               sync_stages=stages, fwft=True)
+            tbclkw = wclk.gen()
+            tbclkr = rclk.gen()
+
+            @always_comb
+            def tbgate():
+                fbus.write.next = wen and not fbus.full
+                fbus.read.next = ren and not fbus.empty
+
+            @always(wclk.posedge)
+            def tbwr():
+                if fbus.write:
+                    sent[0] += 1
+                    fbus.write_data.next = sent[0] % 256
+                wen.next = start and sent[0] < num and rng.random() < 0.8
+
+            @always(rclk.posedge)
+            def tbrd():
+                # the data is valid with the read, not the clock after
+                if fbus.read_valid:
+                    assert fbus.read_data == len(received) % 256
+                    received.append(int(fbus.read_data))
+                ren.next = start and rng.random() < 0.7
+
+            @instance
+            def tbstim():
+                yield reset.pulse(33)
+                for _ in range(stages + 2):
+                    yield wclk.posedge
+                start.next = True
+                while len(received) < num:
+                    yield rclk.posedge
+                for _ in range(20):
+                    yield rclk.posedge
+                assert len(received) == num
+                assert fbus.empty
+                raise StopSimulation
+
+            return tbdut, tbclkw, tbclkr, tbgate, tbwr, tbrd, tbstim
+
+        run_testbench(bench_fifo_async_fwft, args=args)
+
+
 @myhdl.block
-def bench_conversion_fifo_async():
+def bench_conversion_fifo_async(sync_stages=2, fwft=False):
     args = Namespace(width=8, size=32, fifosize=64, name='test')
 
     clock_write, clock_read = Signals(bool(0), 2)
@@ -199,7 +263,8 @@ def bench_conversion_fifo_async():
 
     fbus = FIFOBus(width=args.width)
     fifosize = args.fifosize
-    tbdut = fifo_async(clock_write, clock_read, fbus, reset, size=fifosize)
+    tbdut = fifo_async(clock_write, clock_read, fbus, reset, size=fifosize,
+                       sync_stages=sync_stages, fwft=fwft)
 
     @instance
     def tbclkr():
@@ -257,6 +322,8 @@ def bench_conversion_fifo_async():
 def test_fifo_async_conversion():
     inst = bench_conversion_fifo_async()
     inst.convert(hdl='Verilog', directory=None)
+    inst = bench_conversion_fifo_async(sync_stages=3, fwft=True)
+    inst.convert(hdl='Verilog', directory=None)
 
 
 def test_fifo_async_verify():
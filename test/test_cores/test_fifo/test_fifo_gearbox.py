@@ -0,0 +1,123 @@
+"""
+Test the width converting FIFO (gearbox), narrow to wide and wide to
+narrow, big and little endian.
+"""
+
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import Signal, always, always_comb, instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_gearbox
+from rhea.utils.test import (run_testbench, tb_convert, tb_args,
+                             tb_default_args,)
+
+
+def pack(words, win, wout, big_endian):
+    """ the expected words read, the written words (re)packed """
+    bits = []
+    for ww in words:
+        part = [(ww >> ii) & 1 for ii in range(win)]
+        bits += list(reversed(part)) if big_endian else part
+    out = []
+    for ii in range(0, len(bits) - wout + 1, wout):
+        part = bits[ii:ii+wout]
+        part = list(reversed(part)) if big_endian else part
+        out.append(sum([bb << jj for jj, bb in enumerate(part)]))
+    return out
+
+
+def _run_gearbox(win, wout, big_endian, args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbusw, fbusr = FIFOBus(width=win), FIFOBus(width=wout)
+    rng = Random(win + wout)
+    nwords = 16 * max(win, wout) // win
+    words = [rng.randrange(2**win) for _ in range(nwords)]
+    expected = pack(words, win, wout, big_endian)
+    sent, received, nfull = [0], [], [0]
+    start, wen, ren = [Signal(bool(0)) for _ in range(3)]
+    # the reader is slower than the writer, the FIFO fills
+    rrate = 0.1 if win < wout else 0.6
+
+    @myhdl.block
+    def bench_fifo_gearbox():
+        tbdut = fifo_gearbox(glbl, fbusw, fbusr, size=4,
+                             big_endian=big_endian)
+        tbclk = clock.gen()
+
+        @always_comb
+        def tbgate():
+            fbusw.write.next = wen and not fbusw.full
+            fbusr.read.next = ren and not fbusr.empty
+
+        @always(clock.posedge)
+        def tbwr():
+            if fbusw.write:
+                sent[0] += 1
+                if sent[0] < len(words):
+                    fbusw.write_data.next = words[sent[0]]
+            nfull[0] += 1 if fbusw.full else 0
+            wen.next = start and sent[0] < len(words)
+
+        @always(clock.posedge)
+        def tbrd():
+            if fbusr.read_valid:
+                received.append(int(fbusr.read_data))
+            ren.next = start and rng.random() < rrate
+
+        @instance
+        def tbstim():
+            fbusw.write_data.next = words[0]
+            yield reset.pulse(13)
+            yield clock.posedge
+            start.next = True
+            while len(received) < len(expected):
+                yield clock.posedge
+            for _ in range(10):
+                yield clock.posedge
+            assert received == expected
+            assert nfull[0] > 0
+            assert fbusr.empty and fbusr.count == 0
+            raise StopSimulation
+
+        return tbdut, tbclk, tbgate, tbwr, tbrd, tbstim
+
+    run_testbench(bench_fifo_gearbox, args=args)
+
+
+def test_fifo_gearbox_pack(args=None):
+    """ narrow to wide, bytes to 32-bit words """
+    _run_gearbox(8, 32, big_endian=True, args=args)
+    _run_gearbox(8, 32, big_endian=False, args=args)
+    _run_gearbox(8, 16, big_endian=True, args=args)
+
+
+def test_fifo_gearbox_unpack(args=None):
+    """ wide to narrow, 32-bit words to bytes """
+    _run_gearbox(32, 8, big_endian=True, args=args)
+    _run_gearbox(32, 8, big_endian=False, args=args)
+    _run_gearbox(16, 16, big_endian=True, args=args)
+
+
+def test_fifo_gearbox_conversion():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbusw, fbusr = FIFOBus(width=8), FIFOBus(width=32)
+    tb_convert(fifo_gearbox(glbl, fbusw, fbusr, size=16))
+    fbusw, fbusr = FIFOBus(width=32), FIFOBus(width=8)
+    tb_convert(fifo_gearbox(glbl, fbusw, fbusr, size=16, big_endian=False))
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_fifo_gearbox_pack(args)
+    test_fifo_gearbox_unpack(args)
+    test_fifo_gearbox_conversion()
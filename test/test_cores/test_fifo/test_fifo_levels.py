@@ -0,0 +1,139 @@
+"""
+Test the FIFO count (occupancy) and the almost full and almost empty
+flags of the FIFO cores.
+"""
+
+from __future__ import print_function, division
+
+import myhdl
+from myhdl import always, instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_sync, fifo_fast, fifo_async
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def _check(fbus, num, size, aflevel, aelevel):
+    assert fbus.count == num, "count {} != {}".format(int(fbus.count), num)
+    assert fbus.almost_full == (size - num <= aflevel)
+    assert fbus.almost_empty == (num <= aelevel)
+
+
+@myhdl.block
+def bench_levels(fifo, clock_write, clock_read, fbus, reset, size=16):
+    """ fill and drain the FIFO a word at a time, check the flags """
+    # the synchronized pointers take a few clocks
+    settle = 6
+
+    @always(clock_read.negedge)
+    def tbmon():
+        # each clock, a burst read on not almost empty can not find
+        # the FIFO empty
+        assert fbus.almost_empty or not fbus.empty
+
+    @instance
+    def tbstim():
+        aflevel, aelevel = 3, 2
+        fbus.almost_full_level.next = aflevel
+        fbus.almost_empty_level.next = aelevel
+        yield reset.pulse(13)
+        for _ in range(settle):
+            yield clock_write.posedge
+        _check(fbus, 0, size, aflevel, aelevel)
+
+        for ii in range(size):
+            fbus.write.next = True
+            fbus.write_data.next = ii
+            yield clock_write.posedge
+            fbus.write.next = False
+            for _ in range(settle):
+                yield clock_write.posedge
+            _check(fbus, ii+1, size, aflevel, aelevel)
+        assert fbus.full
+
+        # program the levels
+        aflevel, aelevel = 8, 12
+        fbus.almost_full_level.next = aflevel
+        fbus.almost_empty_level.next = aelevel
+        yield clock_read.posedge
+        yield clock_read.posedge
+        _check(fbus, size, size, aflevel, aelevel)
+
+        for ii in range(size):
+            fbus.read.next = True
+            yield clock_read.posedge
+            fbus.read.next = False
+            for _ in range(settle):
+                yield clock_read.posedge
+            _check(fbus, size-ii-1, size, aflevel, aelevel)
+        assert fbus.empty
+
+        # a burst written, the flags right after the writes
+        aflevel, aelevel = 3, 2
+        fbus.almost_full_level.next = aflevel
+        fbus.almost_empty_level.next = aelevel
+        for ii in range(3):
+            fbus.write.next = True
+            fbus.write_data.next = ii
+            yield clock_write.posedge
+        fbus.write.next = False
+        yield clock_write.negedge
+        assert fbus.almost_empty or not fbus.empty
+        assert fbus.count == 0 or not fbus.empty
+        for _ in range(settle):
+            yield clock_write.posedge
+        _check(fbus, 3, size, aflevel, aelevel)
+
+        print("{}: count and flags ok".format(fifo))
+        raise StopSimulation
+
+    return tbmon, tbstim
+
+
+def test_fifo_levels(args=None):
+    """ the synchronous FIFOs """
+    args = tb_default_args(args)
+    for fifo in ('fifo_sync', 'fifo_fast'):
+        clock = Clock(0, frequency=50e6)
+        reset = Reset(0, active=1, isasync=False)
+        glbl = Global(clock, reset)
+        fbus = FIFOBus(width=8)
+
+        @myhdl.block
+        def bench_fifo_levels():
+            if fifo == 'fifo_sync':
+                tbdut = fifo_sync(glbl, fbus, size=16)
+            else:
+                tbdut = fifo_fast(glbl, fbus, size=16)
+            tbclk = clock.gen()
+            tbstim = bench_levels(fifo, clock, clock, fbus, reset)
+            return tbdut, tbclk, tbstim
+
+        run_testbench(bench_fifo_levels, args=args)
+
+
+def test_fifo_async_levels(args=None):
+    """ the asynchronous FIFO, the flags in each clock domain """
+    args = tb_default_args(args)
+    clock_write = Clock(0, frequency=50e6)
+    clock_read = Clock(0, frequency=33e6)
+    reset = Reset(0, active=1, isasync=True)
+    fbus = FIFOBus(width=8)
+
+    @myhdl.block
+    def bench_fifo_async_levels():
+        tbdut = fifo_async(clock_write, clock_read, fbus, reset, size=16)
+        tbclkw = clock_write.gen()
+        tbclkr = clock_read.gen()
+        tbstim = bench_levels('fifo_async', clock_write, clock_read, fbus,
+                               reset)
+        return tbdut, tbclkw, tbclkr, tbstim
+
+    run_testbench(bench_fifo_async_levels, args=args)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_fifo_levels(args)
+    test_fifo_async_levels(args)
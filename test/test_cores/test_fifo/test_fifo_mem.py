@@ -1,5 +1,5 @@
 
-from random import randint
+from random import randint, Random
 
 import pytest
 
@@ -8,7 +8,7 @@ from myhdl import Signal, ResetSignal, intbv, modbv, always_seq
 from myhdl import instance, delay, StopSimulation
 from myhdl.conversion import analyze, verify
 
-from rhea.system import Signals
+from rhea.system import Signals, Clock
 from rhea.cores.fifo.fifo_mem import fifo_mem
 
 
@@ -119,6 +119,61 @@ def test_fifo_mem_verify_verilog():
     assert inst.verify_convert() == 0
 
 
+@myhdl.block
+def bench_fifo_mem_compact(clock_w, clock_r, nloops=400, seed=7):
+    """ the compact memory matches the list-of-signals memory """
+    rng = Random(seed)
+    w, aw = 16, 3
+    write, read = Signals(bool(0), 2)
+    write_data = Signal(intbv(0)[w:])
+    read_data, read_data_c = Signals(intbv(0)[w:], 2)
+    write_addr, read_addr = Signals(intbv(0)[aw:], 2)
+    wad, wad_c = Signals(intbv(0)[aw:], 2)
+
+    tbmem = fifo_mem(clock_w, write, write_data, write_addr,
+                     clock_r, read, read_data, read_addr, wad)
+    tbcmp = fifo_mem(clock_w, write, write_data, write_addr,
+                     clock_r, read, read_data_c, read_addr, wad_c,
+                     compact=True)
+
+    @instance
+    def tbstimw():
+        for ii in range(nloops):
+            write.next = rng.random() < 0.7
+            write_data.next = rng.randrange(2**w)
+            write_addr.next = rng.randrange(2**aw)
+            yield clock_w.posedge
+        raise StopSimulation
+
+    @instance
+    def tbstimr():
+        while True:
+            read.next = rng.random() < 0.5
+            read_addr.next = rng.randrange(2**aw-1)
+            yield clock_r.posedge
+            yield delay(1)
+            assert read_data == read_data_c
+            assert wad == wad_c
+
+    return tbmem, tbcmp, tbstimw, tbstimr
+
+
+def test_fifo_mem_compact():
+    # the same and different write and read clocks
+    for hticks_r in (5, 7):
+        clock_w, clock_r = Clock(0), Clock(0)
+
+        @myhdl.block
+        def bench():
+            tbclkw = clock_w.gen(hticks=5)
+            tbclkr = clock_r.gen(hticks=hticks_r)
+            tbdut = bench_fifo_mem_compact(clock_w, clock_r)
+            return tbclkw, tbclkr, tbdut
+
+        inst = bench()
+        inst.run_sim()
+
+
 # @pytest.mark.skip(reason="missing ghdl in travis")
 # def test_fifo_mem_verify_vhdl():
 #     verify.simulator = 'ghdl'
@@ -0,0 +1,134 @@
+"""
+Test the packet FIFO, the packets are available once complete, the
+rollback of a partial packet and the packet count.
+"""
+
+from __future__ import print_function, division
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_packet
+from rhea.utils.test import (run_testbench, tb_convert, tb_args,
+                             tb_default_args,)
+
+
+def test_fifo_packet(args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=8)
+    size = 16
+
+    @myhdl.block
+    def bench_fifo_packet():
+        tbdut = fifo_packet(glbl, fbus, size=size)
+        tbclk = clock.gen()
+
+        def write_packet(data, last=True):
+            for ii, dd in enumerate(data):
+                fbus.write.next = True
+                fbus.write_data.next = dd
+                fbus.write_last.next = last and ii == len(data)-1
+                yield clock.posedge
+            fbus.write.next = False
+            fbus.write_last.next = False
+
+        def read_packet(data):
+            yield clock.posedge
+            packet = []
+            fbus.read.next = True
+            while True:
+                yield clock.posedge
+                assert fbus.read_valid
+                packet.append(int(fbus.read_data))
+                if fbus.read_last:
+                    break
+            fbus.read.next = False
+            data.extend(packet)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+
+            # the packet is not available until the last word
+            yield write_packet([1, 2, 3, 4], last=False)
+            for _ in range(4):
+                yield clock.posedge
+            assert fbus.empty and fbus.count == 4
+            # the almost empty is from the committed words
+            assert fbus.almost_empty
+            yield write_packet([5])
+            for _ in range(3):
+                yield clock.posedge
+            assert not fbus.empty and fbus.packet_count == 1
+            assert not fbus.almost_empty
+
+            # a partial packet is dropped
+            yield write_packet([0xE0, 0xE1, 0xE2], last=False)
+            fbus.rollback.next = True
+            yield clock.posedge
+            fbus.rollback.next = False
+            yield write_packet([6, 7])
+            yield write_packet([8])
+            for _ in range(3):
+                yield clock.posedge
+            assert fbus.packet_count == 3 and fbus.count == 8
+
+            # read the packets, the last word marks the end
+            data = []
+            yield read_packet(data)
+            assert data == [1, 2, 3, 4, 5]
+            yield clock.posedge
+            assert fbus.packet_count == 2
+            data = []
+            yield read_packet(data)
+            yield read_packet(data)
+            assert data == [6, 7, 8]
+            yield clock.posedge
+            assert fbus.empty and fbus.packet_count == 0
+
+            # the FIFO fills with a partial packet, rollback
+            yield write_packet(list(range(size)), last=False)
+            yield clock.posedge
+            assert fbus.full and fbus.empty and fbus.almost_empty
+            fbus.rollback.next = True
+            yield clock.posedge
+            fbus.rollback.next = False
+            yield clock.posedge
+            assert not fbus.full and fbus.count == 0
+
+            # single word packets back to back
+            yield write_packet([0x10])
+            yield write_packet([0x11])
+            yield write_packet([0x12])
+            for _ in range(3):
+                yield clock.posedge
+            assert fbus.packet_count == 3
+            data = []
+            for _ in range(3):
+                yield read_packet(data)
+            assert data == [0x10, 0x11, 0x12]
+
+            raise StopSimulation
+
+        return tbdut, tbclk, tbstim
+
+    run_testbench(bench_fifo_packet, args=args)
+
+
+def test_fifo_packet_conversion():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=8)
+    tb_convert(fifo_packet(glbl, fbus, size=64))
+
+
+if __name__ == '__main__':
+    test_fifo_packet(tb_args())
+    test_fifo_packet_conversion()
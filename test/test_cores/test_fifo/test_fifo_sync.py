@@ -39,7 +39,8 @@ def test_fifo_sync(args=None):
     @myhdl.block
     def bench_fifo_sync():
         
-        tbdut = fifo_sync(glbl, fbus, size=args.size)
+        tbdut = fifo_sync(glbl, fbus, size=args.size,
+                          compact=getattr(args, 'compact', False))
         tbclk = clock.gen()
         
         @instance
@@ -103,6 +104,11 @@ def test_fifo_sync(args=None):
     run_testbench(bench_fifo_sync, args=args)
 
 
+def test_fifo_sync_compact():
+    """ verify the synchronous FIFO with the compact memory array """
+    test_fifo_sync(Namespace(width=8, size=16, name='test', compact=True))
+
+
 def test_fifo_sync_random():
     """Test random reads and writes at random times
     """
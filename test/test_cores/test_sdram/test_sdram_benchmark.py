@@ -0,0 +1,32 @@
+from __future__ import print_function, division
+
+import os
+import json
+
+from rhea.models.sdram.sdram_benchmark import sdram_benchmark, patterns
+
+
+def test_sdram_benchmark(args=None):
+    filename = os.path.join('output', 'sdram_bench', 'results.json')
+    summary = sdram_benchmark(num=20, filename=filename, args=args)
+
+    assert summary['violations'] == []
+    assert [rr['pattern'] for rr in summary['results']] == list(patterns)
+    for rr in summary['results']:
+        assert rr['errors'] == 0
+        assert rr['mb_per_s'] > 0
+        assert rr['writes'] + rr['reads'] == rr['accesses']
+        for lat in (rr['write_latency'], rr['read_latency']):
+            assert lat['avg'] <= lat['p99'] <= lat['max']
+
+    # every strided access opens a new row
+    strided = summary['results'][1]
+    assert strided['row_hit_rate'] == 0.
+    assert strided['sdram']['activates'] == strided['accesses']
+
+    with open(filename) as f:
+        assert json.load(f)['results'] == summary['results']
+
+
+if __name__ == '__main__':
+    test_sdram_benchmark()
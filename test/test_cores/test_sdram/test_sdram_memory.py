@@ -0,0 +1,88 @@
+from __future__ import print_function, division
+
+import os
+from random import randint
+
+import numpy as np
+import pytest
+
+from rhea.cores.sdram import SDRAMInterface
+from rhea.models.sdram import SDRAMModel, PagedMemory
+
+
+def test_paged_memory():
+    mem = PagedMemory(2**20, data_width=16, page_size=256)
+    assert mem.num_pages == 0
+    # reads do not allocate pages
+    assert mem[1000] == 0
+    assert mem.get(2**19) == 0
+    assert mem.num_pages == 0
+
+    saved = {}
+    for ii in range(100):
+        addr, data = randint(0, 2**20-1), randint(0, 2**16-1)
+        mem[addr] = data
+        saved[addr] = data
+    for addr, data in saved.items():
+        assert mem[addr] == data
+    assert mem.num_pages <= 100
+
+    # the data is truncated to the data width
+    mem[0] = 0x12345
+    assert mem[0] == 0x2345
+
+    with pytest.raises(IndexError):
+        mem[2**20] = 0
+
+
+def test_paged_memory_image():
+    mem = PagedMemory(4096, data_width=32, page_size=64)
+    image = np.arange(1000, dtype=np.uint32) * 3
+    mem.load_image(image, address=100)
+    assert mem.num_pages == 17
+    assert mem[99] == 0
+    assert mem[100] == 0
+    assert mem[1099] == 999 * 3
+    assert np.array_equal(mem.dump_image(100, 1000), image)
+    dump = mem.dump_image()
+    assert len(dump) == 4096
+    assert dump[1100] == 0 and dump[1099] == 999 * 3
+
+
+def test_sdram_model_mmap():
+    outdir = os.path.join('output', 'sdram')
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    filename = os.path.join(outdir, 'sdram_image.bin')
+    if os.path.isfile(filename):
+        os.remove(filename)
+
+    intf = SDRAMInterface()
+    sdram = SDRAMModel(intf, filename=filename)
+    bank_size = sdram.bank_size
+
+    # an image that spans the first two banks
+    image = np.arange(4096, dtype=np.uint16)
+    sdram.load_image(image, address=bank_size - 2048)
+    assert sdram.banks[0][bank_size-1] == 2047
+    assert sdram.banks[1][0] == 2048
+    sdram.banks[2][7] = 0xCAFE
+    sdram.flush()
+    assert np.array_equal(sdram.dump_image(bank_size-2048, 4096), image)
+
+    # the memory-mapped file can be inspected after the "run" and
+    # reloaded by another model
+    mm = np.memmap(filename, dtype=np.uint16, mode='r')
+    assert len(mm) == bank_size * intf.num_banks
+    assert mm[2*bank_size + 7] == 0xCAFE
+    del mm
+
+    sdram = SDRAMModel(SDRAMInterface(), filename=filename)
+    assert sdram.banks[1][2047] == 4095
+    assert sdram.banks[2][7] == 0xCAFE
+
+
+if __name__ == '__main__':
+    test_paged_memory()
+    test_paged_memory_image()
+    test_sdram_model_mmap()
@@ -0,0 +1,103 @@
+from __future__ import print_function, division
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Clock
+from rhea.cores.sdram import SDRAMInterface
+from rhea.models.sdram import SDRAMModel
+
+from rhea.utils.test import run_testbench, tb_default_args
+
+
+def test_sdram_model_burst(args=None):
+    """ burst writes and reads with a CAS latency of two """
+    args = tb_default_args(args)
+
+    clock = Clock(0, frequency=100e6)
+    intf = SDRAMInterface()
+    intf.clk = clock
+    sdram = SDRAMModel(intf)
+
+    @myhdl.block
+    def bench_sdram_model_burst():
+        tbmdl = sdram.process()
+        tbclk = clock.gen(hticks=5*1000)
+
+        @instance
+        def tbstim():
+            yield intf.load_mode(cas_latency=2, burst_length=4)
+            assert sdram.cas_latency == 2 and sdram.burst_length == 4
+
+            # the burst wraps in the 4 word boundary
+            yield intf.write([1, 2, 3, 4], row_addr=7, col_addr=10, bankid=1)
+            yield intf.read(row_addr=7, col_addr=8, bankid=1)
+            assert intf.get_read_data() == [3, 4, 1, 2]
+            assert sdram.banks[1][(7 << intf.col_width) | 11] == 2
+
+            yield intf.refresh()
+            yield intf.read(row_addr=7, col_addr=9, bankid=1)
+            assert intf.get_read_data() == [4, 1, 2, 3]
+
+            stats = sdram.get_stats()
+            assert stats['writes'] == 1 and stats['reads'] == 2
+            assert stats['activates'] == 3 and stats['precharges'] == 3
+            assert stats['row_misses'] == 3 and stats['row_hits'] == 0
+            assert stats['refreshes'] == 1
+            assert stats['refresh_cycles'] == intf.cyc_rfc
+            assert stats['data_cycles'] == 12
+            assert stats['violations'] == 0
+
+            raise StopSimulation
+
+        return tbclk, tbmdl, tbstim
+
+    run_testbench(bench_sdram_model_burst, timescale='1ps', args=args)
+
+
+def test_sdram_model_timing(args=None):
+    """ the model tracks the bank row state and the timing """
+    args = tb_default_args(args)
+
+    clock = Clock(0, frequency=100e6)
+    intf = SDRAMInterface()
+    intf.clk = clock
+    sdram = SDRAMModel(intf, strict=False)
+
+    @myhdl.block
+    def bench_sdram_model_timing():
+        tbmdl = sdram.process()
+        tbclk = clock.gen(hticks=5*1000)
+
+        @instance
+        def tbstim():
+            yield clock.posedge
+            intf.cke.next = True
+            yield intf._nop()
+            # read before tRCD, two reads to the open row
+            yield intf._activate(3)
+            yield intf._read(0)
+            yield intf._nop(intf.cyc_rcd)
+            yield intf._read(1)
+            # activate an open bank and precharge before tRAS
+            yield intf._activate(4)
+            yield intf._precharge()
+            yield intf._nop(4)
+
+            stats = sdram.get_stats()
+            assert stats['row_misses'] == 1 and stats['row_hits'] == 1
+            assert stats['violations'] == 3
+            assert 'tRCD' in sdram.violations[0]
+            assert 'is open' in sdram.violations[1]
+            assert 'tRAS' in sdram.violations[2]
+
+            raise StopSimulation
+
+        return tbclk, tbmdl, tbstim
+
+    run_testbench(bench_sdram_model_timing, timescale='1ps', args=args)
+
+
+if __name__ == '__main__':
+    test_sdram_model_burst()
+    test_sdram_model_timing()
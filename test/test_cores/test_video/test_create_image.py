@@ -1,5 +1,8 @@
 
+import os
 from random import randint
+
+from PIL import Image
 from rhea.models.video import VideoDisplay
 
 
@@ -22,5 +25,26 @@ def test_create_save():
                 disp.set_pixel(col, row, rgb, last)
                 
                 
+def test_color_depth():
+    res = (16, 8)
+    disp = VideoDisplay(resolution=res, color_depth=(5, 6, 5))
+    disp.name = 'color_depth'
+    # packed 5-6-5 pixels, full scale red, mid green and zero blue
+    for ii in range(res[0]*res[1]):
+        disp.update_next_pixel((0x1F << 11) | (0x20 << 5))
+    assert disp.update_cnt == 1
+
+    frame = disp.get_frame()
+    assert frame.shape == (res[1], res[0], 3)
+    assert tuple(frame[3, 7]) == (0x1F, 0x20, 0)
+
+    imgpath = os.path.join('output', 'color_depth_frame_1.png')
+    im = Image.open(imgpath)
+    assert im.size == res
+    assert im.getpixel((7, 3)) == (255, 130, 0)
+    im.close()
+
+
 if __name__ == '__main__':
     test_create_save()
+    test_color_depth()
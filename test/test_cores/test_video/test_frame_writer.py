@@ -0,0 +1,100 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+from PIL import Image
+from rhea.models.video import VideoDisplay, FrameWriter
+
+
+def write_frames(disp, frames):
+    res = disp.resolution
+    for rgb in frames:
+        for ii in range(res[0]*res[1]):
+            disp.update_next_pixel(rgb)
+
+
+def test_frame_writer():
+    res = (16, 8)
+    path = os.path.join('output', 'frame_writer')
+    writer = FrameWriter(name='every', path=path, every=2, on_change=True)
+    disp = VideoDisplay(resolution=res, color_depth=(8, 8, 8),
+                        frame_writer=writer)
+
+    # packed 8-8-8 pixels, frames 2 and 4 are saved but 4 is the
+    # same as 2 (skipped), frame 6 is different.
+    red, green = 0xFF << 16, 0xFF << 8
+    write_frames(disp, [red, red, green, red, green, green])
+    writer.close()
+
+    assert disp.update_cnt == 6
+    assert writer.num_written == 2
+    assert writer.num_skipped == 1
+    assert writer.filenames == [os.path.join(path, 'every_frame_2.png'),
+                                os.path.join(path, 'every_frame_6.png')]
+    im = Image.open(writer.filenames[1])
+    assert im.size == res
+    assert im.getpixel((3, 5)) == (0, 255, 0)
+    im.close()
+
+
+def test_frame_writer_container():
+    res = (16, 8)
+    path = os.path.join('output', 'frame_writer')
+    writer = FrameWriter(name='container', path=path, container='tiff')
+    disp = VideoDisplay(resolution=res, color_depth=(8, 8, 8),
+                        frame_writer=writer)
+    write_frames(disp, [0xFF << 16, 0xFF << 8, 0xFF])
+    writer.close()
+
+    assert writer.num_written == 3
+    assert writer.filenames == [os.path.join(path, 'container_frames.tiff')]
+    im = Image.open(writer.filenames[0])
+    assert im.n_frames == 3
+    im.seek(2)
+    assert im.convert('RGB').getpixel((0, 0)) == (0, 0, 255)
+    im.close()
+
+
+def test_frame_writer_color_depth():
+    path = os.path.join('output', 'frame_writer')
+    writer = FrameWriter(name='depth', path=path)
+    frame = np.zeros((8, 16, 3), dtype=np.uint32)
+    frame[:, :, 0] = 1023
+    frame[:, :, 1] = 512
+
+    # 10 bit colors are scaled to 8 bits
+    writer.put(0, frame, color_depth=(10, 10, 10))
+    # 10 bit colors are not 8 bit colors
+    with pytest.raises(ValueError):
+        writer.put(1, frame)
+    writer.close()
+
+    assert writer.num_written == 1
+    im = Image.open(writer.filenames[0])
+    assert im.getpixel((0, 0)) == (255, 128, 0)
+    im.close()
+
+
+def test_frame_writer_error():
+    """ an error saving a frame is raised, the writer does not hang """
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    # the path is under a regular file, the frames can not be saved
+    path = os.path.join(filename, 'frames')
+    writer = FrameWriter(name='error', path=path, maxsize=1)
+    frame = np.zeros((8, 16, 3), dtype=np.uint8)
+    with pytest.raises(OSError):
+        for ii in range(8):
+            writer.put(ii, frame)
+        writer.close()
+    writer.close()
+    assert writer.num_written == 0
+    os.remove(filename)
+
+
+if __name__ == '__main__':
+    test_frame_writer()
+    test_frame_writer_container()
+    test_frame_writer_color_depth()
+    test_frame_writer_error()
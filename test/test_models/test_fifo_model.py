@@ -0,0 +1,55 @@
+from __future__ import print_function
+
+import myhdl
+from myhdl import delay, instance, StopSimulation
+
+from rhea.models import FIFO
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def test_fifo_model(args=None):
+    """ the FIFO model, bulk writes and reads and the occupancy trace """
+    args = tb_default_args(args)
+    fifo = FIFO(depth=8, trace=True)
+
+    @myhdl.block
+    def bench_fifo_model():
+
+        @instance
+        def tbstim():
+            yield delay(10)
+            fifo.write(0)
+            assert fifo.write_many(range(1, 6)) == 5
+            yield delay(1)
+            assert fifo.count == 6 and not fifo.empty
+
+            # the FIFO fills, the items that do not fit are dropped
+            yield delay(10)
+            assert fifo.write_many(range(6, 12)) == 2
+            fifo.write(12)
+            yield delay(1)
+            assert fifo.full and fifo.overflows == 5
+
+            yield delay(10)
+            assert fifo.read() == 0
+            assert fifo.read_many(3) == [1, 2, 3]
+            yield delay(10)
+            assert fifo.read_many() == [4, 5, 6, 7]
+            assert fifo.read() is None
+            assert fifo.read_many(2) == []
+            yield delay(1)
+            assert fifo.empty and fifo.max_count == 8
+            raise StopSimulation
+
+        return tbstim
+
+    run_testbench(bench_fifo_model, args=args)
+
+    # the occupancy changes, the FIFO was full from 21 to 32
+    assert fifo.trace == [(10, 1), (10, 6), (21, 8), (32, 7), (32, 4),
+                          (42, 0)]
+    assert fifo.full_intervals() == [(21, 32)]
+
+
+if __name__ == '__main__':
+    test_fifo_model(tb_args())
@@ -0,0 +1,169 @@
+"""
+Register file (peripheral_regfile) simulation and synthesis benchmark.
+
+A Wishbone register file with `num` 32-bit registers is accessed with
+random reads and writes, the simulation is profiled (`SimProfiler`)
+and the wake-ups and the Python time of the register file generators
+are reported.  The register file is converted to Verilog and if yosys
+is available it is synthesized (ice40) and the LUT count is reported.
+
+Register layouts:
+    contiguous: the registers are at consecutive word addresses
+    sparse: the registers are spread over the address space
+
+Usage::
+
+    python regfile_benchmark.py --num 8 32 128
+
+Not convertible.
+"""
+
+from __future__ import print_function, division
+
+import os
+import re
+import sys
+import shutil
+import argparse
+import subprocess
+from random import Random
+
+import myhdl
+from myhdl import Signal, ResetSignal, intbv, instance, StopSimulation
+
+from rhea import Clock, Reset, Global
+from rhea.system import Register, RegisterFile, Wishbone
+from rhea.utils.test import SimProfiler
+
+
+layouts = ('contiguous', 'sparse')
+
+
+def build_regfile(num, layout, seed=7):
+    """ half read-write and half read-only registers """
+    rng = Random(seed)
+    if layout == 'contiguous':
+        addrs = [4*ii for ii in range(num)]
+    else:
+        addrs = sorted(rng.sample(range(0, 64*num), num))
+        addrs = [4*aa for aa in addrs]
+
+    regfile = RegisterFile()
+    regfile.base_address = 0
+    for ii, aa in enumerate(addrs):
+        access = 'rw' if ii < num // 2 else 'ro'
+        reg = Register('reg{}'.format(ii), 32, access, ii, aa)
+        regfile.add_register(reg)
+    return regfile
+
+
+@myhdl.block
+def regfile_top(clock, reset, adr, dat_i, dat_o, cyc, we, ack,
+                num=8, layout='contiguous', seed=7):
+    glbl = Global(clock, reset)
+    regfile = build_regfile(num, layout, seed)
+    wb = Wishbone(glbl, data_width=32, address_width=len(adr))
+    inst = wb.add(regfile, peripheral_name='bench')
+    or_inst = wb.interconnect()
+
+    @myhdl.always_comb
+    def beh_ports():
+        wb.adr_i.next = adr
+        wb.dat_i.next = dat_i
+        wb.cyc_i.next = cyc
+        wb.stb_i.next = cyc
+        wb.we_i.next = we
+        dat_o.next = wb.dat_o
+        ack.next = wb.ack_o
+
+    return inst, or_inst, beh_ports
+
+
+def simulate(num, layout, accesses=400, seed=7):
+    """ profile random register accesses """
+    rng = Random(seed)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=16)
+    regfile = build_regfile(num, layout, seed)
+    addrs = regfile.get_reglist()[0]
+
+    @myhdl.block
+    def bench_regfile_benchmark():
+        tbdut = wb.add(regfile, peripheral_name='bench')
+        tbor = wb.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(33)
+            for _ in range(accesses):
+                addr = rng.choice(addrs)
+                if rng.random() < 0.5:
+                    yield wb.writetrans(addr, rng.randrange(2**32))
+                else:
+                    yield wb.readtrans(addr)
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbstim
+
+    inst = bench_regfile_benchmark()
+    prof = SimProfiler(inst)
+    inst.run_sim()
+
+    stats = [ss for ss in prof.get_stats() if 'peripheral_regfile' in ss.name]
+    return dict(wakeups=sum([ss.wakeups for ss in stats]),
+                time=sum([ss.time for ss in stats]))
+
+
+def synthesize(num, layout, path='output/regfile_bench', seed=7):
+    """ convert the register file and count the LUTs, None if no yosys """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    name = 'regfile_{}_{}'.format(layout, num)
+    clock = Signal(bool(0))
+    reset = ResetSignal(0, active=1, isasync=False)
+    adr = Signal(intbv(0)[16:])
+    dat_i, dat_o = Signal(intbv(0)[32:]), Signal(intbv(0)[32:])
+    cyc, we, ack = [Signal(bool(0)) for _ in range(3)]
+    inst = regfile_top(clock, reset, adr, dat_i, dat_o, cyc, we, ack,
+                       num, layout, seed)
+    inst.convert(hdl='Verilog', name=name, directory=path, testbench=False)
+
+    if shutil.which('yosys') is None:
+        return None
+    vfile = os.path.join(path, name+'.v')
+    out = subprocess.check_output(
+        ['yosys', '-q', '-p', 'read_verilog {}; synth_ice40 -top {}; '
+         'tee -o /dev/stdout stat'.format(vfile, name)])
+    luts = re.search(r'SB_LUT4\s+(\d+)', out.decode())
+    return int(luts.group(1)) if luts is not None else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="register file simulation and synthesis benchmark")
+    parser.add_argument('--num', type=int, nargs='+', default=[8, 32, 128],
+                        help="number of registers")
+    parser.add_argument('--layouts', nargs='+', default=list(layouts),
+                        choices=layouts)
+    parser.add_argument('--accesses', type=int, default=400)
+    parser.add_argument('--no-synth', action='store_true',
+                        help="skip the conversion and synthesis")
+    args = parser.parse_args(argv)
+
+    print("{:<12s} {:>6s} {:>10s} {:>10s} {:>10s} {:>6s}".format(
+        "layout", "regs", "wake-ups", "time (s)", "us/wake", "LUTs"))
+    for layout in args.layouts:
+        for num in args.num:
+            sim = simulate(num, layout, args.accesses)
+            luts = None if args.no_synth else synthesize(num, layout)
+            uspw = 1e6 * sim['time'] / max(sim['wakeups'], 1)
+            print("{:<12s} {:>6d} {:>10d} {:>10.4f} {:>10.2f} {:>6s}".format(
+                layout, num, sim['wakeups'], sim['time'], uspw,
+                '-' if luts is None else str(luts)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Test the FIFOBus stream transactors, the words are streamed through
+the FIFOs with random back-pressure.
+"""
+
+from __future__ import print_function, division
+
+from itertools import cycle
+from random import Random
+
+import pytest
+
+import myhdl
+from myhdl import Signal, always, instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import FIFOBus
+from rhea.cores.fifo import fifo_sync, fifo_fast, fifo_packet, fifo_async
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def _run_stream(fifo, words, buf, wpattern=None, rpattern=None,
+                last=False, args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=8)
+    fbus.write_clock = fbus.read_clock = clock
+    done = [False]
+
+    @myhdl.block
+    def bench_fifobus_stream():
+        tbdut = fifo(glbl, fbus, size=16)
+        tbclk = clock.gen()
+
+        @instance
+        def tbwr():
+            yield reset.pulse(13)
+            # the fifo_sync is initialized after the reset
+            for _ in range(4):
+                yield clock.posedge
+            yield fbus.write_stream(words, pattern=wpattern, last=last,
+                                    seed=1)
+
+        @instance
+        def tbrd():
+            yield reset.pulse(13)
+            yield fbus.read_stream(buf, pattern=rpattern, seed=2)
+            for _ in range(4):
+                yield clock.posedge
+            assert fbus.empty
+            done[0] = True
+            raise StopSimulation
+
+        return tbdut, tbclk, tbwr, tbrd
+
+    run_testbench(bench_fifobus_stream, args=args)
+    assert done[0]
+
+
+def test_fifobus_stream(args=None):
+    rng = Random(7)
+    words = [rng.randrange(256) for _ in range(200)]
+
+    # full rate, the writer is faster than the reader, the reader is
+    # faster than the writer
+    for wpattern, rpattern in ((None, None), (None, 0.3), (0.3, None),
+                               (0.6, cycle([1, 0, 1]))):
+        buf = bytearray(len(words))
+        _run_stream(fifo_sync, words, buf, wpattern, rpattern, args=args)
+        assert list(buf) == words
+
+    buf = [0 for _ in words]
+    _run_stream(fifo_fast, words, buf, 0.5, 0.5, args=args)
+    assert buf == words
+
+
+def test_fifobus_stream_packet(args=None):
+    """ the words are a packet, available once the last is written """
+    words = list(range(1, 15))
+    buf = bytearray(len(words))
+    _run_stream(fifo_packet, words, buf, None, 0.5, last=True, args=args)
+    assert list(buf) == words
+
+
+def test_fifobus_stream_numpy(args=None):
+    np = pytest.importorskip('numpy')
+    words = np.arange(100, dtype=np.uint8)
+    buf = np.zeros(100, dtype=np.uint8)
+    _run_stream(fifo_sync, words, buf, 0.5, 0.7, args=args)
+    assert np.array_equal(buf, words)
+
+
+def test_fifobus_stream_async(args=None):
+    """ the write and read streams in different clock domains """
+    args = tb_default_args(args)
+    clock_write = Clock(0, frequency=50e6)
+    clock_read = Clock(0, frequency=33e6)
+    reset = Reset(0, active=1, isasync=True)
+    fbus = FIFOBus(width=8)
+    fbus.write_clock, fbus.read_clock = clock_write, clock_read
+    rng = Random(3)
+    words = [rng.randrange(256) for _ in range(100)]
+    buf = bytearray(len(words))
+
+    @myhdl.block
+    def bench_fifobus_stream_async():
+        tbdut = fifo_async(clock_write, clock_read, fbus, reset, size=16,
+                           fwft=True)
+        tbclkw = clock_write.gen()
+        tbclkr = clock_read.gen()
+
+        @instance
+        def tbwr():
+            yield reset.pulse(13)
+            # the synchronized resets
+            for _ in range(4):
+                yield clock_write.posedge
+            yield fbus.write_stream(words, pattern=0.7, seed=1)
+
+        @instance
+        def tbrd():
+            yield reset.pulse(13)
+            for _ in range(4):
+                yield clock_read.posedge
+            yield fbus.read_stream(buf, pattern=0.8, seed=2)
+            raise StopSimulation
+
+        return tbdut, tbclkw, tbclkr, tbwr, tbrd
+
+    run_testbench(bench_fifobus_stream_async, args=args)
+    assert list(buf) == words
+
+
+def test_fifobus_stream_ungated_read(args=None):
+    """ the reader does not gate the read with the empty """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fbus = FIFOBus(width=8)
+    fbus.write_clock = fbus.read_clock = clock
+    words = list(range(100, 112))
+    received = []
+    start = Signal(bool(0))
+
+    @myhdl.block
+    def bench_fifobus_ungated():
+        tbdut = fifo_sync(glbl, fbus, size=16)
+        tbclk = clock.gen()
+
+        @always(clock.posedge)
+        def tbrd():
+            # the read is always set, a word is read with read_valid
+            if fbus.read_valid:
+                received.append(int(fbus.read_data))
+            fbus.read.next = start
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            for _ in range(4):
+                yield clock.posedge
+            start.next = True
+            yield fbus.write_stream(words)
+            for _ in range(20):
+                yield clock.posedge
+            assert received == words
+            assert fbus.empty and fbus.count == 0
+            raise StopSimulation
+
+        return tbdut, tbclk, tbrd, tbstim
+
+    run_testbench(bench_fifobus_ungated, args=args)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_fifobus_stream(args)
+    test_fifobus_stream_packet(args)
+    test_fifobus_stream_numpy(args)
+    test_fifobus_stream_async(args)
+    test_fifobus_stream_ungated_read(args)
@@ -0,0 +1,269 @@
+"""
+Test and verify the AXI4-Lite memory-mapped bus, the register file
+peripheral, outstanding transactions and the generic bus mapping.
+"""
+
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import (Signal, ResetSignal, intbv, always_comb, instance,
+                   now, StopSimulation)
+
+from rhea import Global, Clock, Reset
+from rhea.system import Barebone, AXI4Lite, Register, RegisterFile
+from rhea.cores.memmap import controller_basic, peripheral_memory
+from rhea.utils.test import (run_testbench, tb_args, tb_default_args,
+                             tb_convert,)
+
+
+def build_regfile(nregs=8, base_address=0):
+    """ 32-bit read-write registers followed by a read-only register """
+    regfile = RegisterFile()
+    regfile.base_address = base_address
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0x10+ii, 4*ii)
+        regfile.add_register(reg)
+    reg = Register('regro', 32, 'ro', 0xA5A5A5A5, 4*nregs)
+    regfile.add_register(reg)
+    return regfile
+
+
+def test_axi4lite_regfile(args=None):
+    """ single and outstanding register reads and writes """
+    args = tb_default_args(args)
+    nregs = 8
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    regfile = build_regfile(nregs)
+    addrs = [4*ii for ii in range(nregs)]
+    hticks = 5
+
+    @myhdl.block
+    def bench_axi4lite_regfile():
+        tbdut = axi.add(regfile, peripheral_name='axi')
+        tbor = axi.interconnect()
+        tbclk = clock.gen(hticks=hticks)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+
+            # the register defaults and single transactions
+            for ii, addr in enumerate(addrs):
+                yield axi.readtrans(addr)
+                assert axi.get_read_data() == 0x10+ii
+            yield axi.readtrans(4*nregs)
+            assert axi.get_read_data() == 0xA5A5A5A5
+
+            for ii, addr in enumerate(addrs):
+                yield axi.writetrans(addr, 0xC0DE0000+ii)
+                assert axi.get_responses() == [AXI4Lite.OKAY]
+            for ii, addr in enumerate(addrs):
+                yield axi.readtrans(addr)
+                assert axi.get_read_data() == 0xC0DE0000+ii
+
+            # a read-only register is not written
+            yield axi.writetrans(4*nregs, 0)
+            assert axi.get_responses() == [AXI4Lite.SLVERR]
+            yield axi.readtrans(4*nregs)
+            assert axi.get_read_data() == 0xA5A5A5A5
+
+            # the byte write strobes
+            yield axi.writetrans(0, 0x11223344, strb=0b0101)
+            yield axi.readtrans(0)
+            assert axi.get_read_data() == 0xC0220044
+
+            # outstanding transactions, a transfer each clock
+            vals = [0x5A000000 | ii for ii in range(nregs)]
+            start = now()
+            yield axi.write_outstanding(addrs, vals, depth=4)
+            yield axi.read_outstanding(addrs, depth=4)
+            outstanding = (now() - start) // (2*hticks)
+            assert axi.get_read_data() == vals
+            assert axi.get_responses() == [AXI4Lite.OKAY]*nregs
+
+            start = now()
+            for addr, val in zip(addrs, vals):
+                yield axi.writetrans(addr, val)
+            for addr in addrs:
+                yield axi.readtrans(addr)
+            single = (now() - start) // (2*hticks)
+            print("cycles, outstanding {}, single {}".format(
+                outstanding, single))
+            assert outstanding < 2*nregs + 8
+            assert 2*outstanding < single
+
+            # no register file at the address, no response
+            axi.timeout = 20
+            yield axi.readtrans(0x8000)
+            assert axi._timedout
+            assert axi.get_read_data() == 0
+            assert axi.get_responses() == []
+
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbstim
+
+    run_testbench(bench_axi4lite_regfile, args=args)
+
+
+def test_axi4lite_channels(args=None):
+    """ concurrent reads and writes, the channels are independent """
+    args = tb_default_args(args)
+    nregs = 16
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    # two register files on the bus
+    rf0 = build_regfile(nregs)
+    rf1 = build_regfile(nregs, base_address=0x1000)
+    rng = Random(11)
+
+    @myhdl.block
+    def bench_axi4lite_channels():
+        tbdut0 = axi.add(rf0, peripheral_name='axi')
+        tbdut1 = axi.add(rf1, peripheral_name='axi')
+        tbor = axi.interconnect()
+        tbclk = clock.gen()
+        done = [False, False]
+
+        # the upper half of each register file is written
+        waddrs = [0x1000*pp + 4*ii for pp in range(2)
+                  for ii in range(nregs//2, nregs)]
+        wvals = [rng.randrange(2**32) for _ in waddrs]
+        raddrs = [0x1000*pp + 4*ii for pp in range(2)
+                  for ii in range(nregs//2)]
+        rng.shuffle(raddrs)
+
+        @instance
+        def tbwrite():
+            yield reset.pulse(13)
+            yield axi.write_outstanding(waddrs, wvals, depth=8)
+            assert all([rr == AXI4Lite.OKAY for rr in axi.get_responses()])
+            done[0] = True
+
+        @instance
+        def tbread():
+            yield reset.pulse(13)
+            yield axi.read_outstanding(raddrs, depth=8)
+            rvals = axi.get_read_data()
+            assert rvals == [0x10 + (aa & 0xFF)//4 for aa in raddrs]
+            done[1] = True
+
+        @instance
+        def tbstim():
+            while not all(done):
+                yield clock.posedge
+            for addr, val in zip(waddrs, wvals):
+                yield axi.readtrans(addr)
+                assert axi.get_read_data() == val
+            raise StopSimulation
+
+        return tbdut0, tbdut1, tbor, tbclk, tbwrite, tbread, tbstim
+
+    run_testbench(bench_axi4lite_channels, args=args)
+
+
+def test_axi4lite_generic(args=None):
+    """ a generic (Barebone) master and a generic peripheral """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    # Barebone master -> AXI4-Lite -> register file
+    bb = Barebone(glbl, data_width=32, address_width=16)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    regfile = build_regfile(4)
+    # AXI4-Lite -> generic memory peripheral
+    axim = AXI4Lite(glbl, data_width=32, address_width=16)
+
+    @myhdl.block
+    def bench_axi4lite_generic():
+        tbdut = axi.add(regfile, peripheral_name='axi')
+        tbor = axi.interconnect()
+        tbctl = controller_basic(bb, axi)
+        tbmem = peripheral_memory(axim, depth=16)
+        tbmor = axim.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+            for ii in range(4):
+                yield bb.writetrans(4*ii, 0xBEEF0000+ii)
+            for ii in range(4):
+                yield bb.readtrans(4*ii)
+                assert bb.get_read_data() == 0xBEEF0000+ii
+            assert regfile.reg2 == 0xBEEF0002
+
+            # the memory peripheral is the first peripheral (1)
+            for ii in range(16):
+                yield axim.writetrans(0x1000 | ii, ii*0x01010101)
+            for ii in range(16):
+                yield axim.readtrans(0x1000 | ii)
+                assert axim.get_read_data() == ii*0x01010101
+            raise StopSimulation
+
+        return tbdut, tbor, tbctl, tbmem, tbmor, tbclk, tbstim
+
+    run_testbench(bench_axi4lite_generic, args=args)
+
+
+@myhdl.block
+def axi4lite_top(clock, reset, awaddr, awvalid, awready, wdata, wstrb,
+                 wvalid, wready, bvalid, bready, araddr, arvalid, arready,
+                 rdata, rvalid, rready):
+    glbl = Global(clock, reset)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    regfile = build_regfile(8)
+    rf_inst = axi.add(regfile, peripheral_name='axi')
+    or_inst = axi.interconnect()
+
+    @always_comb
+    def beh_assign():
+        axi.awaddr.next = awaddr
+        axi.awvalid.next = awvalid
+        axi.wdata.next = wdata
+        axi.wstrb.next = wstrb
+        axi.wvalid.next = wvalid
+        axi.bready.next = bready
+        axi.araddr.next = araddr
+        axi.arvalid.next = arvalid
+        axi.rready.next = rready
+        awready.next = axi.awready
+        wready.next = axi.wready
+        bvalid.next = axi.bvalid
+        arready.next = axi.arready
+        rdata.next = axi.rdata
+        rvalid.next = axi.rvalid
+
+    return rf_inst, or_inst, beh_assign
+
+
+def test_axi4lite_convert():
+    clock = Signal(bool(0))
+    reset = ResetSignal(0, active=1, isasync=False)
+    awaddr, araddr = Signal(intbv(0)[16:]), Signal(intbv(0)[16:])
+    wdata, rdata = Signal(intbv(0)[32:]), Signal(intbv(0)[32:])
+    wstrb = Signal(intbv(0)[4:])
+    (awvalid, awready, wvalid, wready, bvalid, bready,
+     arvalid, arready, rvalid, rready) = [Signal(bool(0)) for _ in range(10)]
+    inst = axi4lite_top(clock, reset, awaddr, awvalid, awready, wdata, wstrb,
+                        wvalid, wready, bvalid, bready, araddr, arvalid,
+                        arready, rdata, rvalid, rready)
+    tb_convert(inst)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_axi4lite_regfile(args)
+    test_axi4lite_channels(args)
+    test_axi4lite_generic(args)
+    test_axi4lite_convert()
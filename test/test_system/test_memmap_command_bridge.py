@@ -14,13 +14,13 @@ import traceback
 
 import myhdl
 from myhdl import (Signal, intbv, always_seq, always_comb,
-                   instance, delay, StopSimulation,)
+                   instance, delay, now, StopSimulation,)
 
 from rhea import Global, Clock, Reset, Signals
 from rhea.system import Barebone, FIFOBus
 from rhea.cores.memmap import command_bridge
-from rhea.cores.fifo import fifo_fast
-from rhea.utils import CommandPacket
+from rhea.cores.fifo import fifo_fast, fifo_packet
+from rhea.utils import CommandPacket, CommandPipeline
 from rhea.utils.test import run_testbench, tb_args, tb_default_args
 
 
@@ -130,5 +130,232 @@ def test_memmap_command_bridge(args=None):
     run_testbench(bench_command_bridge, args=args)
 
 
+def test_memmap_command_bridge_block(args=None):
+    """ block (burst) reads and writes """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fifobus = FIFOBus()
+    memmap = Barebone(glbl, data_width=32, address_width=28)
+
+    fifobus.clock = clock
+
+    @myhdl.block
+    def bench_command_bridge_block():
+        tbclk = clock.gen()
+        tbdut = command_bridge(glbl, fifobus, memmap)
+
+        readpath, writepath = FIFOBus(), FIFOBus()
+        readpath.clock = writepath.clock = clock
+        tbmap = fifobus.assign_read_write_paths(readpath, writepath)
+        tbftx = fifo_fast(glbl, writepath)   # user write path
+        tbfrx = fifo_fast(glbl, readpath)    # user read path
+        tbmem = memmap_peripheral_bb(clock, reset, memmap)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(32)
+            fifobus.read.next = False
+            fifobus.write.next = False
+
+            # a max length block write and read back
+            base = 0x1000
+            vals = [randint(0, (2**32)-1) for _ in range(64)]
+            pkt = CommandPacket(False, base, vals)
+            assert len(pkt.rawbytes) == 8 + 256
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, evals=vals)
+            assert pkt.read_values == vals
+
+            pkt = CommandPacket(True, base, length=64)
+            assert len(pkt.rawbytes) == 8
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, evals=vals)
+            assert pkt.read_values == vals
+
+            # a block in the middle, the address increments by 4
+            rvals = []
+            pkt = CommandPacket(True, base + 4*10, length=17)
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, rvals)
+            assert rvals == vals[10:27]
+
+            # single word read and write packets
+            pkt = CommandPacket(False, base + 4*3, [0xCAFEF00D])
+            assert len(pkt.rawbytes) == 12
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, evals=[0xCAFEF00D])
+            vals[3] = 0xCAFEF00D
+
+            pkt = CommandPacket(True, base, length=4)
+            yield pkt.put(readpath)
+            yield pkt.get(writepath, evals=vals[:4])
+            assert pkt.read_values == vals[:4]
+
+            raise StopSimulation
+
+        return tbclk, tbdut, tbmap, tbftx, tbfrx, tbmem, tbstim
+
+    run_testbench(bench_command_bridge_block, args=args)
+
+
+def test_memmap_command_bridge_pipeline(args=None):
+    """ multiple tagged packets in flight """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fifobus = FIFOBus()
+    memmap = Barebone(glbl, data_width=32, address_width=28)
+
+    fifobus.clock = clock
+
+    @myhdl.block
+    def bench_command_bridge_pipeline():
+        tbclk = clock.gen()
+        tbdut = command_bridge(glbl, fifobus, memmap, tagged=True)
+
+        readpath, writepath = FIFOBus(), FIFOBus()
+        readpath.clock = writepath.clock = clock
+        tbmap = fifobus.assign_read_write_paths(readpath, writepath)
+        tbftx = fifo_fast(glbl, writepath)   # user write path
+        tbfrx = fifo_fast(glbl, readpath)    # user read path
+        tbmem = memmap_peripheral_bb(clock, reset, memmap)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(32)
+            fifobus.read.next = False
+            fifobus.write.next = False
+
+            num = 24
+            addrs = [4*ii for ii in range(num)]
+            vals = [randint(0, (2**32)-1) for _ in range(num)]
+            pipe = CommandPipeline(readpath, writepath, depth=6)
+
+            # single word and block writes in flight together
+            pkts = [CommandPacket(False, aa, [vv])
+                    for aa, vv in zip(addrs[:16], vals[:16])]
+            pkts += [CommandPacket(False, addrs[16], vals[16:])]
+            yield pipe.transfer(pkts)
+            assert [pkt.tag for pkt in pkts] == list(range(17))
+
+            # one packet at a time
+            start = now()
+            rvals = []
+            for aa in addrs:
+                pkt = CommandPacket(True, aa, tag=0x5A)
+                yield pkt.put(readpath)
+                yield pkt.get(writepath, rvals)
+            sequential_time = now() - start
+            assert rvals == vals
+
+            # the same reads pipelined
+            start = now()
+            pkts = [CommandPacket(True, aa) for aa in addrs]
+            yield pipe.transfer(pkts)
+            pipelined_time = now() - start
+            assert [pkt.read_values[0] for pkt in pkts] == vals
+            assert pkts[0].tag == 17
+            print("sequential {}, pipelined {}".format(
+                sequential_time, pipelined_time))
+            assert pipelined_time < sequential_time
+
+            raise StopSimulation
+
+        return tbclk, tbdut, tbmap, tbftx, tbfrx, tbmem, tbstim
+
+    run_testbench(bench_command_bridge_pipeline, args=args)
+
+
+def test_memmap_command_bridge_packets(args=None):
+    """ the packet mode, the bad packets are dropped """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    fifobus = FIFOBus()
+    memmap = Barebone(glbl, data_width=32, address_width=28)
+
+    fifobus.clock = clock
+
+    @myhdl.block
+    def bench_command_bridge_packets():
+        tbclk = clock.gen()
+        tbdut = command_bridge(glbl, fifobus, memmap, packets=True)
+
+        readpath, writepath = FIFOBus(), FIFOBus()
+        readpath.clock = writepath.clock = clock
+        tbmap = fifobus.assign_read_write_paths(readpath, writepath)
+        tbftx = fifo_packet(glbl, writepath, size=512)  # user write path
+        tbfrx = fifo_packet(glbl, readpath, size=512)   # user read path
+        tbmem = memmap_peripheral_bb(clock, reset, memmap)
+
+        def wait_response(num=1):
+            for _ in range(1000):
+                if writepath.packet_count == num:
+                    break
+                yield clock.posedge
+            assert writepath.packet_count == num
+
+        @instance
+        def tbstim():
+            yield reset.pulse(32)
+            fifobus.read.next = False
+            fifobus.write.next = False
+
+            vals = [randint(0, (2**32)-1) for _ in range(4)]
+            pkt = CommandPacket(False, 0x100, vals[:2])
+            yield pkt.put(readpath)
+            yield wait_response()
+            yield pkt.get(writepath, evals=vals[:2])
+
+            # an unexpected known byte, the write data is flushed
+            pkt = CommandPacket(False, 0x100, vals)
+            pkt.rawbytes[7] = 0x00
+            yield pkt.put(readpath)
+            # an invalid command, the header only
+            pkt = CommandPacket(True, 0x100)
+            pkt.rawbytes[1] = 3
+            yield pkt.put(readpath)
+            # a short packet
+            pkt = CommandPacket(True, 0x100)
+            pkt.rawbytes = pkt.rawbytes[:5]
+            yield pkt.put(readpath)
+
+            # a single word read, the header only or with the 4
+            # (ignored) data bytes
+            pkt = CommandPacket(True, 0x100)
+            assert len(pkt.rawbytes) == 12
+            pkt.rawbytes = pkt.rawbytes[:8]
+            yield pkt.put(readpath)
+            yield wait_response()
+            yield pkt.get(writepath, evals=vals[:1])
+            pkt = CommandPacket(True, 0x104)
+            yield pkt.put(readpath)
+            yield wait_response()
+            yield pkt.get(writepath, evals=vals[1:2])
+
+            # the next packet is not lost, the bad packets are dropped
+            pkt = CommandPacket(True, 0x100, length=4)
+            yield pkt.put(readpath)
+            yield wait_response()
+            yield pkt.get(writepath)
+            assert pkt.read_values == vals[:2] + [0, 0]
+            for _ in range(100):
+                yield clock.posedge
+            assert writepath.empty and readpath.empty
+
+            raise StopSimulation
+
+        return tbclk, tbdut, tbmap, tbftx, tbfrx, tbmem, tbstim
+
+    run_testbench(bench_command_bridge_packets, args=args)
+
+
 if __name__ == '__main__':
     test_memmap_command_bridge(tb_args())
+    test_memmap_command_bridge_block(tb_args())
+    test_memmap_command_bridge_pipeline(tb_args())
+    test_memmap_command_bridge_packets(tb_args())
@@ -0,0 +1,256 @@
+"""
+Test and verify the memory-mapped crossbar, multiple Barebone masters
+and multiple peripherals (slaves).
+"""
+
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import (Signal, ResetSignal, intbv, always_seq, always_comb,
+                   instance, now, StopSimulation)
+
+from rhea import Global, Clock, Reset
+from rhea.system import Barebone, Wishbone, Register, RegisterFile
+from rhea.cores.memmap import crossbar
+from rhea.utils.test import (run_testbench, tb_args, tb_default_args,
+                             tb_convert,)
+
+
+@myhdl.block
+def memmap_peripheral_bb(clock, reset, bb, latency=3):
+    """ Barebone peripheral memory, a transaction takes `latency` cycles,
+    the read data is valid the last cycle `done` is low.
+    """
+    assert isinstance(bb, Barebone) and latency > 1
+    mem = {}
+    count = Signal(intbv(0, min=0, max=latency+1))
+    rdnwr = Signal(bool(0))
+
+    @always_seq(clock.posedge, reset=reset)
+    def beh_peripheral():
+        addr = int(bb.mem_addr)
+        bb.read_data.next = 0
+        if bb.write or bb.read:
+            if bb.write:
+                mem[addr] = int(bb.write_data)
+            bb.done.next = False
+            rdnwr.next = bb.read
+            count.next = latency
+        elif count > 2:
+            count.next = count - 1
+        elif count == 2:
+            if rdnwr:
+                bb.read_data.next = mem.get(addr, 0)
+            count.next = 1
+        elif count == 1:
+            bb.done.next = True
+            count.next = 0
+
+    return beh_peripheral
+
+
+def build_bus(glbl, nmasters=3):
+    masters = [Barebone(glbl, data_width=32, address_width=16)
+               for _ in range(nmasters)]
+    slaves = [Barebone(glbl, data_width=32, address_width=16)
+              for _ in range(2)]
+
+    # the third peripheral is a register file, the crossbar decodes
+    # the register file base address
+    regfile = RegisterFile()
+    regfile.base_address = 0x3000
+    for ii in range(4):
+        regfile.add_register(Register('reg{}'.format(ii), 32, 'rw', 0, 4*ii))
+    wb = Wishbone(glbl, data_width=32, address_width=16)
+
+    return masters, slaves, regfile, wb
+
+
+def test_memmap_crossbar(args=None):
+    """ concurrent random transactions from three masters """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    masters, slaves, regfile, wb = build_bus(glbl)
+    # the slave index or the register file base address
+    per_addrs = (0, 1, 3)
+
+    @myhdl.block
+    def bench_crossbar():
+        tbclk = clock.gen()
+        tbper = [memmap_peripheral_bb(clock, reset, bb, latency=2+ii)
+                 for ii, bb in enumerate(slaves)]
+        tbrf = wb.add(regfile, peripheral_name='xbar')
+        tbor = wb.interconnect()
+        tbdut = crossbar(glbl, masters, slaves + [wb])
+
+        finished = [False for _ in masters]
+
+        @myhdl.block
+        def master_stim(mm, nloops=40):
+            @instance
+            def tbmaster():
+                rng = Random(mm)
+                bus, expected = masters[mm], {}
+                yield reset.pulse(13)
+                for _ in range(nloops):
+                    # the transactors drive the memory address only
+                    per = rng.choice(per_addrs)
+                    bus.per_addr.next = per
+                    if per == 3:
+                        # the masters share the register file
+                        addr = 4*mm
+                    else:
+                        addr = (mm << 8) | rng.randrange(64)
+                    if rng.random() < 0.5 or (per, addr) not in expected:
+                        data = rng.randrange(2**32)
+                        yield bus.writetrans(addr, data)
+                        expected[(per, addr)] = data
+                    else:
+                        yield bus.readtrans(addr)
+                        rd = bus.get_read_data()
+                        assert rd == expected[(per, addr)], \
+                            "M{}: {}:{:03X} {:08X} != {:08X}".format(
+                                mm, per, addr, rd, expected[(per, addr)])
+                # an address without a peripheral reads zero
+                bus.per_addr.next = 0xF
+                yield bus.readtrans(0)
+                assert bus.get_read_data() == 0
+                finished[mm] = True
+
+            return tbmaster
+
+        tbmst = [master_stim(mm) for mm in range(len(masters))]
+
+        @instance
+        def tbstim():
+            while not all(finished):
+                yield clock.posedge
+            raise StopSimulation
+
+        return tbclk, tbper, tbrf, tbor, tbdut, tbmst, tbstim
+
+    run_testbench(bench_crossbar, args=args)
+
+
+def _run_shared(arbitration, distinct, nloops=12):
+    """ the time each master completes its transactions """
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    masters = [Barebone(glbl, data_width=32, address_width=16)
+               for _ in range(3)]
+    slaves = [Barebone(glbl, data_width=32, address_width=16)
+              for _ in range(3)]
+    for bus in masters:
+        # a low priority master waits for the other masters
+        bus.timeout = 1000
+    end_time = [None for _ in masters]
+
+    @myhdl.block
+    def bench_crossbar_shared():
+        tbclk = clock.gen()
+        tbper = [memmap_peripheral_bb(clock, reset, bb) for bb in slaves]
+        tbdut = crossbar(glbl, masters, slaves, arbitration=arbitration)
+
+        @myhdl.block
+        def master_stim(mm):
+            @instance
+            def tbmaster():
+                # the slave index is the peripheral address
+                masters[mm].per_addr.next = mm if distinct else 0
+                yield reset.pulse(13)
+                yield clock.posedge
+                start = now()
+                for ii in range(nloops):
+                    yield masters[mm].writetrans(ii, ii)
+                end_time[mm] = now() - start
+
+            return tbmaster
+
+        tbmst = [master_stim(mm) for mm in range(len(masters))]
+
+        @instance
+        def tbstim():
+            while None in end_time:
+                yield clock.posedge
+            raise StopSimulation
+
+        return tbclk, tbper, tbdut, tbmst, tbstim
+
+    run_testbench(bench_crossbar_shared)
+    return end_time
+
+
+def test_memmap_crossbar_arbitration():
+    """ concurrent and shared slave access, round-robin and priority """
+    distinct = _run_shared('round_robin', True)
+    shared = _run_shared('round_robin', False)
+    priority = _run_shared('priority', False)
+    print("distinct {}, round-robin {}, priority {}".format(
+        distinct, shared, priority))
+
+    # different slaves are accessed concurrently
+    assert max(distinct) * 2 < max(shared)
+    # round-robin, the masters complete at about the same time
+    assert max(shared) - min(shared) < max(shared) // 4
+    # priority, master 0 completes first and is not slowed down
+    assert priority[0] < priority[1] < priority[2]
+    assert priority[0] <= distinct[0] * 2
+
+
+@myhdl.block
+def crossbar_top(clock, reset, write, read, addr, wdata, rdata, done):
+    """ two masters with the same inputs, two Barebone peripherals
+    looped back and a register file.
+    """
+    glbl = Global(clock, reset)
+    masters, slaves, regfile, wb = build_bus(glbl, nmasters=2)
+    rf_inst = wb.add(regfile, peripheral_name='xbar')
+    or_inst = wb.interconnect()
+    xbar_inst = crossbar(glbl, masters, slaves + [wb])
+    m0, m1 = masters
+    s0, s1 = slaves
+
+    @always_comb
+    def beh_assign():
+        m0.write.next = write
+        m0.read.next = read
+        m1.write.next = write
+        m1.read.next = read
+        m0.per_addr.next = addr[16:12]
+        m0.mem_addr.next = addr[12:0]
+        m1.per_addr.next = addr[16:12]
+        m1.mem_addr.next = addr[12:0]
+        m0.write_data.next = wdata
+        m1.write_data.next = wdata
+        rdata.next = m0.read_data | m1.read_data
+        done.next = m0.done and m1.done
+
+    @always_comb
+    def beh_loopback():
+        s0.read_data.next = s0.write_data
+        s0.done.next = not (s0.write or s0.read)
+        s1.read_data.next = s1.write_data
+        s1.done.next = not (s1.write or s1.read)
+
+    return rf_inst, or_inst, xbar_inst, beh_assign, beh_loopback
+
+
+def test_memmap_crossbar_convert():
+    clock = Signal(bool(0))
+    reset = ResetSignal(0, active=1, isasync=False)
+    write, read, done = [Signal(bool(0)) for _ in range(3)]
+    addr = Signal(intbv(0)[16:])
+    wdata, rdata = [Signal(intbv(0)[32:]) for _ in range(2)]
+    inst = crossbar_top(clock, reset, write, read, addr, wdata, rdata, done)
+    tb_convert(inst)
+
+
+if __name__ == '__main__':
+    test_memmap_crossbar(args=tb_args())
+    test_memmap_crossbar_arbitration()
+    test_memmap_crossbar_convert()
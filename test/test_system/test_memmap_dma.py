@@ -0,0 +1,368 @@
+"""
+Test and verify the DMA core, transfers between a FIFOBus stream and
+the memory on a memory-mapped bus, scatter-gather descriptor lists and
+the achieved throughput (words/cycle).
+"""
+
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import (Signal, ResetSignal, intbv, always_seq, always_comb,
+                   instance, now, StopSimulation)
+
+from rhea import Global, Clock, Reset
+from rhea.system import Barebone, Wishbone, FIFOBus, Register, RegisterFile
+from rhea.cores.memmap import dma, peripheral_memory
+from rhea.cores.fifo import fifo_fast, fifo_sync
+from rhea.utils.test import (run_testbench, tb_args, tb_default_args,
+                             tb_convert,)
+
+# the register offsets, see `dma_regfile`
+CONTROL, STATUS, ADDRESS, LENGTH, STRIDE, DESC, COUNT = range(0, 0x1C, 4)
+START, TO_FIFO, SG, IRQ_EN = 1, 2, 4, 8
+BUSY, DONE, ERROR = 1, 2, 4
+
+
+@myhdl.block
+def stream_paths(glbl, fifobus, readpath, writepath, rxsize=128, txsize=8):
+    """ the DMA read path (FIFO to memory) and write path FIFOs """
+    tbmap = fifobus.assign_read_write_paths(readpath, writepath)
+    tbfrx = fifo_sync(glbl, readpath, size=rxsize)
+    tbftx = fifo_fast(glbl, writepath, size=txsize)
+    return tbmap, tbfrx, tbftx
+
+
+def dma_stim(regbus, irq, base, clock):
+    """ the DMA register access, the stimulus generators """
+    def regwrite(offset, val):
+        yield regbus.writetrans(base + offset, val)
+
+    def regread(offset):
+        yield regbus.readtrans(base + offset)
+
+    def run(control, cycles, **regs):
+        """ configure and start a transfer, wait for the interrupt """
+        for name, offset in (('address', ADDRESS), ('length', LENGTH),
+                             ('stride', STRIDE), ('desc', DESC)):
+            if name in regs:
+                yield regwrite(offset, regs[name])
+        start = now()
+        yield regwrite(CONTROL, control | START | IRQ_EN)
+        while not irq:
+            yield clock.posedge
+        cycles.append((now() - start) // (2*5))
+
+    return regwrite, regread, run
+
+
+def test_memmap_dma(args=None):
+    """ FIFO to memory, memory to FIFO and scatter-gather transfers
+    with a Barebone memory (peripheral_memory)
+    """
+    args = tb_default_args(args)
+    nwords = 64
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=32)
+    membus = Barebone(glbl, data_width=32, address_width=16)
+    fifobus = FIFOBus(width=32)
+    readpath, writepath = FIFOBus(width=32), FIFOBus(width=32)
+    irq = Signal(bool(0))
+    rng = Random(15)
+    vals = [rng.randrange(2**32) for _ in range(nwords)]
+    base = 0x400
+    # the memory is the first peripheral (1), word addressed
+    mbase = 0x1000
+
+    @myhdl.block
+    def bench_dma():
+        tbclk = clock.gen(hticks=5)
+        tbdut = dma(glbl, regbus, fifobus, membus, irq,
+                    base_address=base, addr_step=1)
+        tbrbor = regbus.interconnect()
+        tbmem = peripheral_memory(membus, depth=256)
+        tbpth = stream_paths(glbl, fifobus, readpath, writepath)
+
+        regwrite, regread, run = dma_stim(regbus, irq, base, clock)
+        received = []
+        consume = Signal(bool(0))
+
+        @always_comb
+        def tbconsume():
+            writepath.read.next = consume and not writepath.empty
+
+        @always_seq(clock.posedge, reset=reset)
+        def tbrecv():
+            if writepath.read_valid:
+                received.append(int(writepath.read_data))
+
+        def produce(words):
+            for ww in words:
+                assert not readpath.full
+                readpath.write.next = True
+                readpath.write_data.next = ww
+                yield clock.posedge
+            readpath.write.next = False
+            yield clock.posedge
+
+        def check_done(count, error=0):
+            yield regread(STATUS)
+            assert regbus.get_read_data() == DONE | error
+            yield regread(COUNT)
+            assert regbus.get_read_data() == count
+
+        @instance
+        def tbstim():
+            cycles = []
+            yield reset.pulse(13)
+            yield clock.posedge
+            consume.next = True
+
+            # FIFO to memory, the stream is written to the FIFO
+            yield produce(vals)
+            yield run(0, cycles, address=mbase, length=nwords, stride=1)
+            yield check_done(nwords)
+            assert not readpath.read_valid and readpath.empty
+
+            # memory to FIFO
+            yield run(TO_FIFO, cycles, address=mbase)
+            yield check_done(nwords)
+            yield clock.posedge
+            assert received == vals
+
+            # writing the control clears the status and the interrupt
+            yield regwrite(CONTROL, IRQ_EN)
+            yield regread(STATUS)
+            assert regbus.get_read_data() == 0 and not irq
+
+            # the consumer stalls, the DMA waits for space in the FIFO
+            del received[:]
+            consume.next = False
+            yield regwrite(LENGTH, 16)
+            yield regwrite(CONTROL, TO_FIFO | START)
+            for _ in range(200):
+                yield clock.posedge
+            yield regread(STATUS)
+            assert regbus.get_read_data() == BUSY
+            consume.next = True
+            yield regread(STATUS)
+            while regbus.get_read_data() != DONE:
+                yield regread(STATUS)
+            yield clock.posedge
+            assert received == vals[:16]
+
+            # the descriptors are written to the memory with a FIFO to
+            # memory transfer, two descriptors (address, length, stride,
+            # next) and a zero length descriptor.
+            desc = [mbase, 8, 2, mbase+0x84,
+                    mbase+1, 4, 4, mbase+0x88,
+                    mbase, 0, 1, 0]
+            yield produce(desc)
+            yield run(0, cycles, address=mbase+0x80, length=len(desc))
+
+            del received[:]
+            yield run(TO_FIFO | SG, cycles, desc=mbase+0x80)
+            yield check_done(12)
+            yield clock.posedge
+            assert received == vals[0:16:2] + vals[1:16:4]
+
+            # scatter-gather FIFO to memory, the memory is read back
+            desc = [mbase+0x40, 4, 1, mbase+0x8C,
+                    mbase+0xC0, 2, 3, 0]
+            yield produce(desc)
+            yield run(0, cycles, address=mbase+0x88, length=len(desc),
+                      stride=1)
+            yield produce(vals[:6])
+            yield run(SG, cycles, desc=mbase+0x88)
+            yield check_done(6)
+            del received[:]
+            yield run(TO_FIFO, cycles, address=mbase+0x40, length=4)
+            yield run(TO_FIFO, cycles, address=mbase+0xC0, length=2,
+                      stride=3)
+            yield clock.posedge
+            assert received == vals[:6]
+
+            # the throughput, the FIFO to memory transfers are bursts
+            wr, rd = nwords / cycles[0], nwords / cycles[1]
+            print("words/cycle, FIFO to memory {:.2f}, "
+                  "memory to FIFO {:.2f}".format(wr, rd))
+            assert wr > 0.7
+            assert rd > 0.3
+
+            raise StopSimulation
+
+        return tbclk, tbdut, tbrbor, tbmem, tbpth, tbconsume, tbrecv, tbstim
+
+    run_testbench(bench_dma, args=args)
+
+
+def test_memmap_dma_wishbone(args=None):
+    """ transfers to a register file on a Wishbone memory bus """
+    args = tb_default_args(args)
+    nregs = 8
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=32)
+    membus = Wishbone(glbl, data_width=32, address_width=16)
+    fifobus = FIFOBus(width=32)
+    readpath, writepath = FIFOBus(width=32), FIFOBus(width=32)
+    irq = Signal(bool(0))
+    regfile = RegisterFile()
+    regfile.base_address = 0x1000
+    for ii in range(nregs):
+        regfile.add_register(Register('reg{}'.format(ii), 32, 'rw', 0, 4*ii))
+    vals = [0xD0A00000 + ii for ii in range(nregs)]
+    base = 0x400
+
+    @myhdl.block
+    def bench_dma_wishbone():
+        tbclk = clock.gen(hticks=5)
+        tbdut = dma(glbl, regbus, fifobus, membus, irq, base_address=base)
+        tbrbor = regbus.interconnect()
+        tbrf = membus.add(regfile, peripheral_name='mem')
+        tbmbor = membus.interconnect()
+        tbpth = stream_paths(glbl, fifobus, readpath, writepath,
+                             txsize=16)
+
+        regwrite, regread, run = dma_stim(regbus, irq, base, clock)
+        received = []
+
+        @always_comb
+        def tbconsume():
+            writepath.read.next = not writepath.empty
+
+        @always_seq(clock.posedge, reset=reset)
+        def tbrecv():
+            if writepath.read_valid:
+                received.append(int(writepath.read_data))
+
+        @instance
+        def tbstim():
+            cycles = []
+            yield reset.pulse(13)
+            yield clock.posedge
+            for ww in vals:
+                readpath.write.next = True
+                readpath.write_data.next = ww
+                yield clock.posedge
+            readpath.write.next = False
+
+            # FIFO to the register file and back, the default stride
+            yield run(0, cycles, address=0x1000, length=nregs)
+            assert [int(getattr(regfile, 'reg{}'.format(ii)))
+                    for ii in range(nregs)] == vals
+            yield run(TO_FIFO, cycles)
+            yield clock.posedge
+            assert received == vals
+            print("words/cycle, FIFO to memory {:.2f}, "
+                  "memory to FIFO {:.2f}".format(nregs / cycles[0],
+                                                 nregs / cycles[1]))
+            raise StopSimulation
+
+        return (tbclk, tbdut, tbrbor, tbrf, tbmbor, tbpth, tbconsume,
+                tbrecv, tbstim)
+
+    run_testbench(bench_dma_wishbone, args=args)
+
+
+def test_memmap_dma_timeout(args=None):
+    """ the memory does not complete the bus cycle """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=32)
+    membus = Barebone(glbl, data_width=32, address_width=16)
+    fifobus = FIFOBus(width=32)
+    readpath, writepath = FIFOBus(width=32), FIFOBus(width=32)
+    irq = Signal(bool(0))
+    base = 0x400
+
+    @myhdl.block
+    def bench_dma_timeout():
+        tbclk = clock.gen(hticks=5)
+        tbdut = dma(glbl, regbus, fifobus, membus, irq, base_address=base,
+                    timeout=32)
+        tbrbor = regbus.interconnect()
+        tbpth = stream_paths(glbl, fifobus, readpath, writepath)
+
+        regwrite, regread, run = dma_stim(regbus, irq, base, clock)
+
+        @always_seq(clock.posedge, reset=reset)
+        def tbhang():
+            if membus.write or membus.read:
+                membus.done.next = False
+
+        @instance
+        def tbstim():
+            cycles = []
+            yield reset.pulse(13)
+            yield clock.posedge
+            yield run(TO_FIFO, cycles, address=0x1000, length=4)
+            assert 32 < cycles[0] < 64
+            yield regread(STATUS)
+            assert regbus.get_read_data() == DONE | ERROR
+            yield regread(COUNT)
+            assert regbus.get_read_data() == 0
+            raise StopSimulation
+
+        return tbclk, tbdut, tbrbor, tbpth, tbhang, tbstim
+
+    run_testbench(bench_dma_timeout, args=args)
+
+
+@myhdl.block
+def dma_top(clock, reset, cyc, we, adr, dat_i, dat_o, ack, wr, wdata, full,
+            rd, rdata, empty, irq):
+    """ the DMA with a Wishbone register bus and a Barebone memory """
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, data_width=32, address_width=32)
+    membus = Barebone(glbl, data_width=32, address_width=16)
+    fifobus = FIFOBus(width=32)
+    dma_inst = dma(glbl, regbus, fifobus, membus, irq, base_address=0x400,
+                   addr_step=1)
+    or_inst = regbus.interconnect()
+    mem_inst = peripheral_memory(membus, depth=64)
+
+    @always_comb
+    def beh_assign():
+        regbus.cyc_i.next = cyc
+        regbus.stb_i.next = cyc
+        regbus.we_i.next = we
+        regbus.adr_i.next = adr
+        regbus.dat_i.next = dat_i
+        dat_o.next = regbus.dat_o
+        ack.next = regbus.ack_o
+        wr.next = fifobus.write
+        wdata.next = fifobus.write_data
+        fifobus.full.next = full
+        rd.next = fifobus.read
+        fifobus.read_data.next = rdata
+        fifobus.empty.next = empty
+        fifobus.read_valid.next = fifobus.read and not empty
+
+    return dma_inst, or_inst, mem_inst, beh_assign
+
+
+def test_memmap_dma_convert():
+    clock = Signal(bool(0))
+    reset = ResetSignal(0, active=1, isasync=False)
+    cyc, we, ack, wr, full, rd, empty, irq = [Signal(bool(0))
+                                              for _ in range(8)]
+    adr = Signal(intbv(0)[32:])
+    dat_i, dat_o, wdata, rdata = [Signal(intbv(0)[32:]) for _ in range(4)]
+    inst = dma_top(clock, reset, cyc, we, adr, dat_i, dat_o, ack, wr, wdata,
+                   full, rd, rdata, empty, irq)
+    tb_convert(inst)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_memmap_dma(args)
+    test_memmap_dma_wishbone(args)
+    test_memmap_dma_timeout(args)
+    test_memmap_dma_convert()
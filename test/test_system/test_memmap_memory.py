@@ -0,0 +1,191 @@
+"""
+Test and verify the memory peripheral (peripheral_memory), the byte
+enables, the memory width and the second (Barebone) port.
+"""
+
+from __future__ import print_function, division
+
+from random import Random
+
+import myhdl
+from myhdl import (Signal, ResetSignal, intbv, always_comb, instance,
+                   StopSimulation)
+
+from rhea import Global, Clock, Reset
+from rhea.system import Barebone, Wishbone, AXI4Lite
+from rhea.cores.memmap import peripheral_memory
+from rhea.utils.test import (run_testbench, tb_args, tb_default_args,
+                             tb_convert,)
+
+
+def test_memory_dual_port(args=None):
+    """ a large memory on the Wishbone bus and the second port """
+    args = tb_default_args(args)
+    depth = 1024
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    port = Barebone(glbl, data_width=32, address_width=16)
+    rng = Random(16)
+    # the memory is the first peripheral, word addresses
+    per = 0x10000
+
+    @myhdl.block
+    def bench_memory_dual_port():
+        tbdut = peripheral_memory(wb, depth=depth, port=port)
+        tbor = wb.interconnect()
+        tbclk = clock.gen()
+        done, finished = [False, False], [False, False]
+        addrs = rng.sample(range(depth), 40)
+        vals = [rng.randrange(2**32) for _ in addrs]
+
+        @instance
+        def tbbus():
+            yield reset.pulse(13)
+            # the bus writes the first half, the port the second half
+            for addr, val in zip(addrs[:20], vals[:20]):
+                yield wb.writetrans(per | addr, val)
+            done[0] = True
+            while not done[1]:
+                yield clock.posedge
+            for addr, val in zip(addrs, vals):
+                yield wb.readtrans(per | addr)
+                assert wb.get_read_data() == val
+            finished[0] = True
+
+        @instance
+        def tbport():
+            yield reset.pulse(13)
+            yield clock.posedge
+            for addr, val in zip(addrs[20:], vals[20:]):
+                yield port.writetrans(addr, val)
+            done[1] = True
+            while not done[0]:
+                yield clock.posedge
+            for addr, val in zip(addrs, vals):
+                yield port.readtrans(addr)
+                assert port.get_read_data() == val
+            finished[1] = True
+
+        @instance
+        def tbstim():
+            # both ports read all the words
+            while not all(finished):
+                yield clock.posedge
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbbus, tbport, tbstim
+
+    run_testbench(bench_memory_dual_port, args=args)
+
+
+def test_memory_byte_enable(args=None):
+    """ byte writes from the Wishbone, AXI4-Lite and Barebone buses """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    bb = Barebone(glbl, data_width=32, address_width=16)
+    # a 12-bit memory, two byte lanes
+    bb12 = Barebone(glbl, data_width=16, address_width=16)
+
+    @myhdl.block
+    def bench_memory_byte_enable():
+        tbmwb = peripheral_memory(wb, depth=64)
+        tbwbor = wb.interconnect()
+        tbmaxi = peripheral_memory(axi, depth=64)
+        tbaxior = axi.interconnect()
+        tbmbb = peripheral_memory(bb, depth=64)
+        tbm12 = peripheral_memory(bb12, depth=64, width=12)
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+
+            yield wb.writetrans(0x10003, 0x11223344)
+            wb.sel_i.next = 0b1010
+            yield wb.writetrans(0x10003, 0xAABBCCDD)
+            wb.sel_i.next = 0b1111
+            yield wb.readtrans(0x10003)
+            assert wb.get_read_data() == 0xAA22CC44
+
+            yield axi.writetrans(0x1003, 0x11223344)
+            yield axi.writetrans(0x1003, 0xAABBCCDD, strb=0b0001)
+            yield axi.readtrans(0x1003)
+            assert axi.get_read_data() == 0x112233DD
+
+            bb.per_addr.next = 1
+            bb12.per_addr.next = 1
+            yield bb.writetrans(3, 0x11223344)
+            yield bb.writetrans(3, 0xAABBCCDD, byte_enable=0b1100)
+            yield bb.readtrans(3)
+            assert bb.get_read_data() == 0xAABB3344
+
+            yield bb12.writetrans(5, 0xFFFF)
+            yield bb12.readtrans(5)
+            assert bb12.get_read_data() == 0x0FFF
+            yield bb12.writetrans(5, 0x0123, byte_enable=0b10)
+            yield bb12.readtrans(5)
+            assert bb12.get_read_data() == 0x01FF
+            raise StopSimulation
+
+        return (tbmwb, tbwbor, tbmaxi, tbaxior, tbmbb, tbm12, tbclk,
+                tbstim)
+
+    run_testbench(bench_memory_byte_enable, args=args)
+
+
+@myhdl.block
+def memory_top(clock, reset, cyc, we, sel, adr, dat_i, dat_o, ack,
+               write, read, addr, write_data, read_data, done):
+    """ a Wishbone memory with the second port """
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    port = Barebone(glbl, data_width=32, address_width=16)
+    mem_inst = peripheral_memory(wb, depth=512, port=port)
+    or_inst = wb.interconnect()
+
+    @always_comb
+    def beh_assign():
+        wb.cyc_i.next = cyc
+        wb.stb_i.next = cyc
+        wb.we_i.next = we
+        wb.sel_i.next = sel
+        wb.adr_i.next = adr
+        wb.dat_i.next = dat_i
+        dat_o.next = wb.dat_o
+        ack.next = wb.ack_o
+        port.write.next = write
+        port.read.next = read
+        port.mem_addr.next = addr
+        port.write_data.next = write_data
+        read_data.next = port.read_data
+        done.next = port.done
+
+    return mem_inst, or_inst, beh_assign
+
+
+def test_memory_convert():
+    clock = Signal(bool(0))
+    reset = ResetSignal(0, active=1, isasync=False)
+    cyc, we, ack, write, read, done = [Signal(bool(0)) for _ in range(6)]
+    sel = Signal(intbv(0)[4:])
+    adr = Signal(intbv(0)[32:])
+    addr = Signal(intbv(0)[12:])
+    dat_i, dat_o, write_data, read_data = [Signal(intbv(0)[32:])
+                                           for _ in range(4)]
+    inst = memory_top(clock, reset, cyc, we, sel, adr, dat_i, dat_o, ack,
+                      write, read, addr, write_data, read_data, done)
+    tb_convert(inst)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_memory_dual_port(args)
+    test_memory_byte_enable(args)
+    test_memory_convert()
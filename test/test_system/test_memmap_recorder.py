@@ -0,0 +1,131 @@
+"""
+Test the bus transaction recorder, the transaction log, the
+peripheral statistics, the bus utilization and the binary trace.
+"""
+
+from __future__ import print_function, division
+
+import os
+
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import (Wishbone, AXI4Lite, Barebone, Register,
+                         RegisterFile, TransactionRecorder)
+from rhea.cores.memmap import peripheral_memory
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def build_regfile(base_address, nregs=4):
+    regfile = RegisterFile()
+    regfile.base_address = base_address
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0, 4*ii)
+        regfile.add_register(reg)
+    return regfile
+
+
+def test_memmap_recorder(args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    bb = Barebone(glbl, data_width=32, address_width=16)
+    bb.timeout = 20
+
+    gpio = build_regfile(0x100)
+    timer = build_regfile(0x100)
+    recorder = TransactionRecorder(clock, depth=16)
+    recorder.attach(wb, name='cpu')
+    recorder.attach(axi, name='dbg')
+    recorder.attach(bb, name='hang')
+    # the memory is the second Wishbone peripheral, word addresses
+    recorder.add_region('mem', 0x10000, 0x20000)
+
+    @myhdl.block
+    def bench_recorder():
+        tbgpio = wb.add(gpio, peripheral_name='gpio')
+        tbmem = peripheral_memory(wb, depth=64)
+        tbwbor = wb.interconnect()
+        tbtmr = axi.add(timer, peripheral_name='timer')
+        tbaxior = axi.interconnect()
+        tbclk = clock.gen()
+        tbrec = recorder.process()
+
+        # a peripheral that never completes a transaction
+        @instance
+        def tbhang():
+            while not bb.write:
+                yield bb.write.posedge
+            bb.done.next = False
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+            recorder.clear()
+
+            for ii in range(4):
+                yield wb.writetrans(0x100 + 4*ii, ii)
+            yield wb.readtrans(0x108)
+            assert wb.get_read_data() == 2
+            for ii in range(8):
+                yield wb.writetrans(0x10000 + ii, 0x55 + ii)
+            yield wb.readtrans(0x10003)
+            yield axi.writetrans(0x104, 0xAA)
+            yield axi.readtrans(0x104)
+            assert axi.get_read_data() == 0xAA
+            yield bb.writetrans(0x20, 0x11)
+            for _ in range(10):
+                yield clock.posedge
+            raise StopSimulation
+
+        return (tbgpio, tbmem, tbwbor, tbtmr, tbaxior, tbclk, tbrec,
+                tbhang, tbstim)
+
+    run_testbench(bench_recorder, args=args)
+    recorder.report()
+
+    # the log is a ring buffer, the statistics include all
+    assert recorder.num_transactions == 17
+    assert len(recorder.log) == 16
+    first, last = recorder.log[0], recorder.log[-1]
+    assert first.master == 'cpu' and first.peripheral == 'GPIO_000'
+    assert first.address == 0x104 and first.data == 1 and first.write
+    assert last.master == 'hang' and last.timeout
+    assert last.latency >= bb.timeout
+    assert recorder.log[-2].data == 0xAA and not recorder.log[-2].write
+    assert recorder.log[-2].peripheral == 'TIMER_000'
+
+    stats = recorder.stats()
+    assert stats['GPIO_000']['writes'] == 4
+    assert stats['GPIO_000']['reads'] == 1
+    assert stats['mem']['writes'] == 8 and stats['mem']['reads'] == 1
+    assert stats['TIMER_000']['writes'] == 1
+    assert stats[None]['timeouts'] == 1
+    for st in stats.values():
+        assert sum(st['latency'].values()) == st['reads'] + st['writes']
+        assert st['mean_latency'] > 0
+
+    util = recorder.utilization()
+    assert 0.5 < util <= 1.
+    assert recorder.utilization('cpu') < util
+    assert (recorder.utilization('cpu') + recorder.utilization('dbg') +
+            recorder.utilization('hang')) <= 1.
+
+    # the binary trace
+    if not os.path.isdir('output'):
+        os.makedirs('output')
+    filename = os.path.join('output', 'memmap_recorder.bin')
+    recorder.dump(filename)
+    log = TransactionRecorder.load(filename)
+    assert len(log) == len(recorder.log)
+    for tr, ld in zip(recorder.log, log):
+        assert tr._replace(peripheral=None) == ld
+
+
+if __name__ == '__main__':
+    test_memmap_recorder(tb_args())
@@ -0,0 +1,185 @@
+"""
+Test the transaction-level (TLM) mode of the memory-mapped bus
+transactors, the registers are accessed directly and the register
+strobes are pulsed.
+"""
+
+from __future__ import print_function, division
+
+import myhdl
+from myhdl import Signal, intbv, always_seq, instance, now, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import Wishbone, AXI4Lite, AvalonMM, Register, RegisterFile
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def build_regfile(nregs=4):
+    regfile = RegisterFile()
+    regfile.base_address = 0x100
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 32, 'rw', 0x10+ii, 4*ii)
+        regfile.add_register(reg)
+    reg = Register('status', 32, 'ro', 0, 4*nregs)
+    reg.add_namedbits('count', slice(32, 0), "write strobe count")
+    regfile.add_register(reg)
+    return regfile
+
+
+def _run_tlm(bus, args=None, bus_cycles=True):
+    """ configure the registers in the TLM mode, verify with bus cycles """
+    args = tb_default_args(args)
+    nregs = 4
+    clock, reset = bus.clock, bus.reset
+    regfile = build_regfile(nregs)
+    addrs = [0x100 + 4*ii for ii in range(nregs)]
+    hticks = 5
+
+    @myhdl.block
+    def bench_tlm():
+        tbdut = bus.add(regfile, peripheral_name='tlm')
+        tbor = bus.interconnect()
+        tbclk = clock.gen(hticks=hticks)
+        count = Signal(intbv(0)[32:])
+        reads = Signal(intbv(0)[32:])
+
+        # the peripheral counts the register write and read strobes
+        @always_seq(clock.posedge, reset=reset)
+        def tbper():
+            wr, rd = 0, 0
+            for ii in range(nregs):
+                reg = getattr(regfile, 'reg{}'.format(ii))
+                wr += int(reg.wr)
+                rd += int(reg.rd)
+            count.next = count + wr
+            reads.next = reads + rd
+            regfile.count.next = count + wr
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+
+            # the TLM writes, a clock or two each
+            bus.tlm = True
+            start = now()
+            for ii, addr in enumerate(addrs):
+                yield bus.writetrans(addr, 0xA0000000 + ii)
+            tlm = (now() - start) // (2*hticks)
+            assert tlm <= 2*nregs
+            for ii, addr in enumerate(addrs):
+                yield bus.readtrans(addr)
+                assert bus.get_read_data() == 0xA0000000 + ii
+            yield clock.posedge
+            assert count == nregs and reads == nregs
+            yield bus.readtrans(0x100 + 4*nregs)
+            assert bus.get_read_data() == nregs
+
+            # a read-only register is not written
+            yield bus.writetrans(0x100 + 4*nregs, 0)
+            yield bus.readtrans(0x100 + 4*nregs)
+            assert bus.get_read_data() == nregs
+
+            if not bus_cycles:
+                raise StopSimulation
+
+            # the bus cycles read the registers written
+            bus.tlm = False
+            start = now()
+            for ii, addr in enumerate(addrs):
+                yield bus.readtrans(addr)
+                assert bus.get_read_data() == 0xA0000000 + ii
+            cycles = (now() - start) // (2*hticks)
+            print("{}: {} clocks TLM writes, {} clocks bus reads".format(
+                bus.name, tlm, cycles))
+            assert tlm < cycles
+            for ii, addr in enumerate(addrs):
+                yield bus.writetrans(addr, 0xB0000000 + ii)
+            yield clock.posedge
+            assert count == 2*nregs
+            for ii in range(nregs):
+                assert getattr(regfile, 'reg{}'.format(ii)) == 0xB0000000+ii
+
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbper, tbstim
+
+    run_testbench(bench_tlm, args=args)
+    return bus
+
+
+def test_tlm_wishbone(args=None):
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    _run_tlm(Wishbone(glbl, data_width=32, address_width=16), args)
+    _run_tlm(Wishbone(glbl, data_width=32, address_width=16,
+                      pipelined=True), args)
+
+
+def test_tlm_axi4lite(args=None):
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    _run_tlm(AXI4Lite(glbl, data_width=32, address_width=16), args)
+
+
+def test_tlm_axi4lite_strobes(args=None):
+    """ the write strobes and the write responses in the TLM mode """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    axi = AXI4Lite(glbl, data_width=32, address_width=16)
+    regfile = build_regfile()
+
+    @myhdl.block
+    def bench_tlm_strobes():
+        tbdut = axi.add(regfile, peripheral_name='tlm')
+        tbor = axi.interconnect()
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+            axi.tlm = True
+            yield axi.writetrans(0x100, 0x11223344)
+            assert axi.get_responses() == [axi.OKAY]
+            yield axi.writetrans(0x100, 0xAABBCCDD, strb=0b0101)
+            yield axi.readtrans(0x100)
+            assert axi.get_read_data() == 0x11BB33DD
+
+            # the read-only register responds with a slave error
+            yield axi.writetrans(0x110, 0x55)
+            assert axi.get_responses() == [axi.SLVERR]
+
+            # the same strobes with the bus cycles
+            axi.tlm = False
+            yield axi.writetrans(0x104, 0x11223344)
+            yield axi.writetrans(0x104, 0xAABBCCDD, strb=0b0101)
+            yield axi.readtrans(0x104)
+            assert axi.get_read_data() == 0x11BB33DD
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbstim
+
+    run_testbench(bench_tlm_strobes, args=args)
+
+
+def test_tlm_avalon(args=None):
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    # the Avalon read transactor does not wait for the read data,
+    # only the TLM transactions are tested
+    _run_tlm(AvalonMM(glbl, data_width=32, address_width=16), args,
+             bus_cycles=False)
+
+
+if __name__ == '__main__':
+    args = tb_args()
+    test_tlm_wishbone(args)
+    test_tlm_axi4lite(args)
+    test_tlm_axi4lite_strobes(args)
+    test_tlm_avalon(args)
@@ -7,7 +7,7 @@ import traceback
 
 import myhdl
 from myhdl import Signal, ResetSignal, intbv, modbv, always, always_comb
-from myhdl import instance, delay, StopSimulation
+from myhdl import instance, delay, now, StopSimulation
 
 from rhea import Clock, Reset, Global
 from rhea.system import Register, RegisterFile
@@ -116,12 +116,47 @@ def memmap_peripheral_bits(glbl, regbus, mon):
     return regfile_inst, beh_roregs
 
 
+def create_regfile_contiguous(nregs=16):
+    """ read-write registers followed by two read-only registers """
+    regfile = RegisterFile()
+    regfile.base_address = 0
+    for ii in range(nregs):
+        reg = Register('reg{}'.format(ii), 8, 'rw', ii)
+        regfile.add_register(reg)
+    for ii in range(2):
+        reg = Register('regro{}'.format(ii), 8, 'ro', 0xA0+ii)
+        regfile.add_register(reg)
+    return regfile
+
+
 def test_register_def():
     regfile = create_regfile()
     assert len(regfile._rwregs) == 4
     assert len(regfile._roregs) == 2
 
 
+def test_register_decode():
+    for rf in (create_regfile(), create_regfile_contiguous()):
+        addrs, regs, rol, dl = rf.get_reglist()
+        lo, shift, contiguous, bits, table, offsets = rf.get_decode()
+        nregs = len(regs)
+
+        def lookup(addr):
+            off = (addr - lo) >> shift
+            key = sum([((off >> bb) & 1) << ii for ii, bb in enumerate(bits)])
+            idx = table[key]
+            return idx if idx < nregs and offsets[idx] == addr - lo else None
+
+        assert shift == 2
+        for ii, aa in enumerate(addrs):
+            assert lookup(aa) == ii
+            if aa + 4 not in addrs:
+                assert lookup(aa + 4) is None
+
+    assert not create_regfile().contiguous
+    assert create_regfile_contiguous().contiguous
+
+
 def test_register_file(args=None):
     global regfile
     args = tb_default_args(args)
@@ -232,6 +267,128 @@ def test_register_file_bits():
     run_testbench(bench_regfile_bits)
 
 
+def test_register_file_contiguous(args=None):
+    """ indexed access to a contiguous register file """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl)
+    regfile = create_regfile_contiguous()
+
+    @myhdl.block
+    def bench_regfile_contiguous():
+        tbdut = regbus.add(regfile, peripheral_name='test3')
+        tbor = regbus.interconnect()
+        tbclk = clock.gen(hticks=5)
+        addrs, regs, rol, dl = regfile.get_reglist()
+        prw, prd = regfile.get_strobelist()
+        nstrobes = {'rd': 0, 'wr': 0}
+
+        @always(clock.posedge)
+        def tbmon():
+            # the strobes are one clock cycle for each access
+            nstrobes['rd'] += sum([int(rd) for rd in prd])
+            nstrobes['wr'] += sum([int(wr) for wr in prw])
+
+        @instance
+        def tbstim():
+            yield reset.pulse(111)
+            yield clock.posedge
+
+            regdef = regfile.get_regdef()
+            for name, reg in regdef.items():
+                yield regbus.readtrans(reg.addr)
+                assert regbus.get_read_data() == reg.default
+
+            wvals = {}
+            for name, reg in regdef.items():
+                wvals[name] = randint(0, 255)
+                yield regbus.writetrans(reg.addr, wvals[name])
+                if reg.access == 'rw':
+                    assert getattr(regfile, name) == wvals[name]
+                    assert getattr(regfile, name).wr == False
+
+            for name, reg in regdef.items():
+                yield regbus.readtrans(reg.addr)
+                expected = wvals[name] if reg.access == 'rw' else reg.default
+                assert regbus.get_read_data() == expected
+
+            # no register at the address
+            yield regbus.readtrans(max(addrs) + 4)
+            assert regbus.get_read_data() == 0
+
+            assert nstrobes['rd'] == 2*len(regs)
+            assert nstrobes['wr'] == len(regfile.rwregs)
+
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbmon, tbstim
+
+    run_testbench(bench_regfile_contiguous, args=args)
+
+
+def test_register_file_pipelined(args=None):
+    """ pipelined (B4) single accesses and bursts, a word per clock """
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    regbus = Wishbone(glbl, pipelined=True)
+    regfile = create_regfile_contiguous()
+
+    @myhdl.block
+    def bench_regfile_pipelined():
+        tbdut = regbus.add(regfile, peripheral_name='test4')
+        tbor = regbus.interconnect()
+        hticks = 5
+        tbclk = clock.gen(hticks=hticks)
+        addrs, regs, rol, dl = regfile.get_reglist()
+        nrw = len(regfile.rwregs)
+
+        @instance
+        def tbstim():
+            yield reset.pulse(111)
+            yield clock.posedge
+
+            # single accesses
+            yield regbus.readtrans(addrs[nrw])
+            assert regbus.get_read_data() == dl[nrw]
+            yield regbus.writetrans(addrs[1], 0x5A)
+            yield regbus.readtrans(addrs[1])
+            assert regbus.get_read_data() == 0x5A
+
+            # a word is written each clock
+            wvals = [randint(0, 255) for _ in range(nrw)]
+            start = now()
+            yield regbus.writeburst(addrs[0], wvals)
+            ncycles = (now() - start) // (2*hticks)
+            assert ncycles <= nrw + 3, "{} cycles".format(ncycles)
+            assert [int(rr) for rr in regs[:nrw]] == wvals
+
+            start = now()
+            yield regbus.readburst(addrs[0], len(regs))
+            ncycles = (now() - start) // (2*hticks)
+            assert ncycles <= len(regs) + 3, "{} cycles".format(ncycles)
+            assert regbus.get_read_data() == wvals + list(dl[nrw:])
+
+            # no peripheral at the address, no ack, the reads time out
+            # and the words are read as 0
+            regbus.timeout = 20
+            yield regbus.readtrans(0x100)
+            assert regbus._timedout
+            assert regbus.get_read_data() == 0
+            yield regbus.readburst(0x100, 3)
+            assert regbus._timedout
+            assert regbus.get_read_data() == [0, 0, 0]
+
+            raise StopSimulation
+
+        return tbdut, tbor, tbclk, tbstim
+
+    run_testbench(bench_regfile_pipelined, args=args)
+
+
 def test_convert():
     clock = Signal(bool(0))
     reset = ResetSignal(0, active=0, isasync=True)
@@ -246,6 +403,9 @@ if __name__ == '__main__':
     args = tb_args()
 
     test_register_def()
+    test_register_decode()
     test_register_file(args)
     test_register_file_bits()
+    test_register_file_contiguous(args)
+    test_register_file_pipelined(args)
     test_convert()
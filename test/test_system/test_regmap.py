@@ -0,0 +1,175 @@
+"""
+Test the register map artifacts (JSON, C header and Python client)
+generated from the register files on a memory-mapped bus.
+"""
+
+from __future__ import print_function, division
+
+import os
+import json
+import shutil
+import subprocess
+import importlib.util
+
+import pytest
+import myhdl
+from myhdl import instance, StopSimulation
+
+from rhea import Global, Clock, Reset
+from rhea.system import Register, RegisterFile, Wishbone
+from rhea.system import get_regmap, export_regmap
+from rhea.utils.test import run_testbench, tb_args, tb_default_args
+
+
+def build_regfiles():
+    """ a register file with named bits and a second register file
+    with an automatically assigned base address
+    """
+    rf0 = RegisterFile()
+    rf0.base_address = 0x100
+    reg = Register('control', 32, 'rw', 0x0105, 0x00)
+    reg.add_namedbits('enable', 0)
+    reg.add_namedbits('mode', slice(4, 1))
+    reg.add_namedbits('divisor', slice(16, 8))
+    rf0.add_register(reg)
+    rf0.add_register(Register('data', 32, 'rw', 0xDA7A, 0x04))
+    reg = Register('status', 32, 'ro', 0x0A, 0x10)
+    reg.add_namedbits('busy', 1)
+    rf0.add_register(reg)
+
+    rf1 = RegisterFile()
+    for ii in range(3):
+        rf1.add_register(Register('reg{}'.format(ii), 32, 'rw', ii))
+    return rf0, rf1
+
+
+def _import_client(filename):
+    spec = importlib.util.spec_from_file_location('regmap_client', filename)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_regmap(args=None):
+    args = tb_default_args(args)
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    wb = Wishbone(glbl, data_width=32, address_width=32)
+    rf0, rf1 = build_regfiles()
+
+    @myhdl.block
+    def bench_regmap():
+        tbdut0 = wb.add(rf0, peripheral_name='uart')
+        tbdut1 = wb.add(rf1, peripheral_name='uart')
+        tbor = wb.interconnect()
+        tbclk = clock.gen()
+
+        # the register map and the generated client
+        regmap = get_regmap(wb, 'testsys')
+        files = export_regmap(wb, 'output/regmap', 'testsys')
+        client = _import_client(files[2]).TestsysRegs
+
+        @instance
+        def tbstim():
+            yield reset.pulse(13)
+            yield clock.posedge
+
+            # the generated addresses access the registers
+            for per in regmap['peripherals']:
+                for reg in per['registers']:
+                    name = "{}_{}".format(per['name'], reg['name']).upper()
+                    addr = getattr(client, name)
+                    assert addr == reg['address']
+                    yield wb.readtrans(addr)
+                    assert wb.get_read_data() == reg['default']
+
+            yield wb.writetrans(client.UART_000_CONTROL, 0x00002A0B)
+            assert rf0.control == 0x2A0B
+            assert rf0.divisor == 0x2A and rf0.mode == 5
+            raise StopSimulation
+
+        return tbdut0, tbdut1, tbor, tbclk, tbstim
+
+    run_testbench(bench_regmap, args=args)
+
+    regmap = get_regmap(wb, 'testsys')
+    uart0, uart1 = regmap['peripherals']
+    assert uart0['name'] == 'UART_000' and uart1['name'] == 'UART_001'
+    assert uart0['base_address'] == 0x100
+    assert uart1['base_address'] == 0x100 + 0x100000
+    assert [rr['address'] for rr in uart0['registers']] == [
+        0x100, 0x104, 0x110]
+    assert [rr['address'] for rr in uart1['registers']] == [
+        0x100100, 0x100104, 0x100108]
+    control = uart0['registers'][0]
+    assert [(bb['name'], bb['mask'], bb['shift']) for bb in control['bits']] \
+        == [('enable', 0x1, 0), ('mode', 0xE, 1), ('divisor', 0xFF00, 8)]
+
+    # the JSON is the register map
+    with open('output/regmap/testsys_regmap.json') as f:
+        assert json.load(f) == regmap
+
+
+def test_regmap_python_client():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    wb = Wishbone(Global(clock, reset), data_width=32, address_width=32)
+    rf0, rf1 = build_regfiles()
+    wb.add(rf0, peripheral_name='uart')
+    files = export_regmap(wb, 'output/regmap', 'clientsys')
+    client = _import_client(files[2]).ClientsysRegs
+
+    mem = {0x100: 0x0105, 0x104: 0xDA7A}
+    counts = dict(read=0, write=0)
+
+    def read_many(addrs):
+        counts['read'] += 1
+        return [mem[addr] for addr in addrs]
+
+    def write_many(addrs, vals):
+        counts['write'] += 1
+        mem.update(dict(zip(addrs, vals)))
+
+    regs = client(mem.get, mem.__setitem__, read_many, write_many)
+    assert regs.read_bits(regs.UART_000_CONTROL_MODE) == 2
+    assert regs.UART_000_CONTROL_DIVISOR == (0x100, 0xFF00, 8)
+
+    # one read and one write for the named bits in the register
+    regs.modify([(regs.UART_000_CONTROL_ENABLE, 0),
+                 (regs.UART_000_CONTROL_MODE, 7),
+                 (regs.UART_000_CONTROL_DIVISOR, 0x12)])
+    assert mem[0x100] == 0x120E
+    assert counts == dict(read=1, write=1)
+    regs.write_bits(regs.UART_000_CONTROL_ENABLE, 1)
+    assert mem[0x100] == 0x120F and mem[0x104] == 0xDA7A
+
+
+@pytest.mark.skipif(shutil.which('gcc') is None, reason="no C compiler")
+def test_regmap_c_header():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    wb = Wishbone(Global(clock, reset), data_width=32, address_width=32)
+    rf0, rf1 = build_regfiles()
+    wb.add(rf0, peripheral_name='uart')
+    files = export_regmap(wb, 'output/regmap', 'csys')
+
+    cfile = os.path.join('output/regmap', 'csys_check.c')
+    with open(cfile, 'w') as f:
+        f.write("\n".join([
+            '#include "csys_regmap.h"',
+            '_Static_assert(CSYS_UART_000_STATUS_ADDR == 0x110, "addr");',
+            '_Static_assert(CSYS_UART_000_CONTROL_DIVISOR_MASK == 0xFF00, '
+            '"mask");',
+            '_Static_assert(CSYS_GET(0x2A0B, CSYS_UART_000_CONTROL_DIVISOR)'
+            ' == 0x2A, "get");',
+            '_Static_assert(CSYS_SET(0x0105, CSYS_UART_000_CONTROL_MODE, 7)'
+            ' == 0x010F, "set");', '']))
+    subprocess.check_call(['gcc', '-fsyntax-only', '-Wall', '-Werror',
+                           '-I', 'output/regmap', cfile])
+
+
+if __name__ == '__main__':
+    test_regmap(tb_args())
+    test_regmap_python_client()
+    test_regmap_c_header()
@@ -0,0 +1,101 @@
+from __future__ import print_function, division
+
+import os
+import shutil
+import tempfile
+
+from rhea.utils.test import run_regression
+from rhea.utils.test.regression import find_tests, _common_root
+
+
+# a small test file, the regression runner needs a file on disk
+# with `test_*` functions that run benches with `run_testbench`.
+_test_file = '''
+import pytest
+import myhdl
+from myhdl import instance, StopSimulation
+from rhea.system import Clock, Reset, Global
+from rhea.utils.test import run_testbench, tb_clean_vcd
+
+def _run(name):
+    clock = Clock(0, frequency=50e6)
+
+    @myhdl.block
+    def bench():
+        tbclk = clock.gen()
+
+        @instance
+        def tbstim():
+            for ii in range(100):
+                yield clock.posedge
+            raise StopSimulation
+
+        return tbclk, tbstim
+
+    bench.__name__ = name
+    run_testbench(bench)
+
+def test_pass_one():
+    _run('bench_one')
+
+def test_pass_two():
+    _run('bench_two')
+
+def test_fail():
+    assert False
+
+@pytest.mark.skip(reason="skip me")
+def test_skip():
+    assert False
+
+@pytest.mark.xfail()
+def test_xfail():
+    assert False
+'''
+
+
+def test_regression():
+    tmpdir = tempfile.mkdtemp()
+    testdir = os.path.join(tmpdir, 'tests')
+    os.makedirs(testdir)
+    with open(os.path.join(testdir, 'test_example.py'), 'w') as f:
+        f.write(_test_file)
+
+    tests = find_tests([testdir])
+    assert len(tests) == 5
+
+    outdir = os.path.join(tmpdir, 'regression')
+    results = run_regression([testdir], jobs=2, outdir=outdir)
+    status = {rr['test']: rr['status'] for rr in results}
+    assert status == dict(test_pass_one='pass', test_pass_two='pass',
+                          test_fail='fail', test_skip='skip',
+                          test_xfail='xfail')
+
+    # each bench has its own isolated output directory
+    for name in ('one', 'two'):
+        rr = [rr for rr in results if rr['test'] == 'test_pass_'+name][0]
+        assert len(rr['benches']) == 1
+        stats = rr['benches'][0]
+        assert stats['name'] == 'bench_'+name
+        assert stats['sim_time'] > 0 and stats['sim_rate'] > 0
+        vcddir = os.path.join(outdir, 'test_example', rr['test'],
+                              'output', 'vcd')
+        assert os.path.isdir(vcddir)
+
+    assert os.path.isfile(os.path.join(outdir, 'results.json'))
+    shutil.rmtree(tmpdir)
+
+
+def test_common_root():
+    root = os.path.abspath('tests')
+    paths = [os.path.join('tests', 'fifo', 'test_fifo.py'),
+             os.path.join('tests', 'fifo_async'), 'tests']
+    assert _common_root(paths) == root
+    # the paths are compared by components, not characters
+    paths = [os.path.join('tests', 'fifo'), os.path.join('tests', 'fi')]
+    assert _common_root(paths) == root
+
+
+if __name__ == '__main__':
+    test_regression()
+    test_common_root()
@@ -0,0 +1,58 @@
+
+from __future__ import print_function, division
+
+import os
+import json
+from argparse import Namespace
+
+import myhdl
+from myhdl import Signal, intbv, always_seq, instance, StopSimulation
+
+from rhea.system import Clock, Reset, Global
+from rhea.utils.test import run_testbench, tb_default_args
+
+
+def test_sim_profile():
+    clock = Clock(0, frequency=50e6)
+    reset = Reset(0, active=1, isasync=False)
+    glbl = Global(clock, reset)
+    count = Signal(intbv(0)[8:])
+
+    def transaction(num):
+        for ii in range(num):
+            yield clock.posedge
+
+    @myhdl.block
+    def bench_sim_profile():
+        tbclk = clock.gen()
+
+        @always_seq(clock.posedge, reset=reset)
+        def beh_count():
+            count.next = count + 1
+
+        @instance
+        def tbstim():
+            yield reset.pulse(10)
+            for ii in range(10):
+                yield transaction(5)
+            raise StopSimulation
+
+        return tbclk, beh_count, tbstim
+
+    args = tb_default_args(Namespace(profile=True))
+    run_testbench(bench_sim_profile, args=args)
+
+    with open(os.path.join('output/prof', 'bench_sim_profile.json')) as f:
+        prof = json.load(f)
+
+    assert prof['sim_time'] > 0
+    gens = {gg['name'].split('.')[-1]: gg for gg in prof['generators']}
+    assert 'beh_count' in gens and 'tbstim' in gens
+    assert gens['beh_count']['wakeups'] > 50
+    # the generators yielded by the stimulus are profiled
+    assert 'transaction' in gens
+    assert gens['transaction']['wakeups'] == 10 * 6
+
+
+if __name__ == '__main__':
+    test_sim_profile()